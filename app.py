@@ -3,13 +3,15 @@ Blockchain-Based Voting System
 Main Application File
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import TooManyRequests
 from datetime import datetime, timedelta
 import hashlib
 import json
 import os
 import secrets
+import tempfile
 import time
 from functools import wraps
 import re
@@ -24,21 +26,50 @@ from utils.security import (
     SecurityManager, 
     encrypt_vote, 
     decrypt_vote, 
-    generate_digital_signature,
-    verify_signature,
-    hash_password,
-    verify_password
+    hash_password
 )
 from utils.voter_management import VoterManager
+from utils.credential_pool import CredentialVerifier, CredentialQueueFull
+from utils.vote_signing import VoteSigner, SignatureAuditor
+from utils.voter_storage import SQLiteVoterStorage
+from utils.search_index import MIN_QUERY_LENGTH
+from utils.token_store import SQLiteTokenStore
 from utils.analytics import AnalyticsEngine
 from utils.fraud_detection import FraudDetector
+from utils.live_updates import EventBroadcaster, TallyCoalescer
+from utils.report_jobs import ReportJobManager
+from utils.rate_limiter import RateLimiter, RateLimitPolicy
+from utils.shared_table import SharedTable, RemoteTable
 
 # Initialize components
 blockchain = Blockchain()
-security_manager = SecurityManager()
-voter_manager = VoterManager()
-analytics_engine = AnalyticsEngine()
-fraud_detector = FraudDetector()
+security_manager = SecurityManager(log_dir=os.environ.get('SECURITY_LOG_DIR', 'logs'))
+credential_verifier = CredentialVerifier()
+voter_storage = SQLiteVoterStorage(os.environ.get('VOTER_DB_PATH', 'voters.db'))
+voter_manager = VoterManager(
+    voter_storage,
+    credential_verifier=credential_verifier,
+    # OTPs live in the voter database so any worker can verify one another worker sent
+    otp_store=SQLiteTokenStore(voter_storage, ttl=300, max_attempts=5)
+)
+# The voter search index is built in the background rather than by the first search
+voter_manager.start_search_index()
+# Registered-voter counts are seeded from storage now and reloaded as it changes
+analytics_engine = AnalyticsEngine(voter_manager)
+analytics_engine.current_cube()
+# Rate-limit buckets and block flags shared by every worker on this host, or served over a socket
+if os.environ.get('SHARED_STATE_SOCKET'):
+    shared_table = RemoteTable(os.environ['SHARED_STATE_SOCKET'])
+else:
+    shared_table = SharedTable(os.environ.get(
+        'SHARED_STATE_PATH', os.path.join(tempfile.gettempdir(), 'securevote', 'shared_state.tbl')))
+fraud_detector = FraudDetector(block_table=shared_table)
+event_broadcaster = EventBroadcaster()
+# Tally deltas go out summed once a second, never one per vote
+tally_coalescer = TallyCoalescer(event_broadcaster, interval=1.0)
+report_jobs = ReportJobManager()
+vote_signer = VoteSigner(key_path=os.environ.get('VOTE_SIGNING_KEY_PATH', 'keys/vote_signing.pem'))
+signature_auditor = SignatureAuditor({vote_signer.key_id: vote_signer.public_key})
 
 # Election configuration
 ELECTION_CONFIG = {
@@ -50,9 +81,17 @@ ELECTION_CONFIG = {
     'election_id': ''
 }
 
-# Rate limiting storage
-request_counts = {}
-blocked_ips = set()
+# Rate limiting: per-client token buckets, with tighter budgets on credential and voting routes
+rate_limiter = RateLimiter(
+    policies={
+        '/login': RateLimitPolicy('login', per_minute=10, burst=5, methods=['POST']),
+        '/admin/login': RateLimitPolicy('admin_login', per_minute=10, burst=5, methods=['POST']),
+        '/verify-otp': RateLimitPolicy('verify_otp', per_minute=10, burst=5),
+        '/cast-vote': RateLimitPolicy('cast_vote', per_minute=6, burst=3)
+    },
+    default_policy=RateLimitPolicy('default', per_minute=100),
+    limiter=shared_table
+)
 
 # Admin management storage
 ADMIN_USERS = {
@@ -90,33 +129,26 @@ def super_admin_required(f):
     return decorated_function
 
 # Rate limiting and DDoS protection
-def rate_limit_check(ip_address):
-    """Check if IP is rate limited"""
-    current_time = time.time()
-    
-    # Clean old entries
-    if ip_address in request_counts:
-        request_counts[ip_address] = [
-            timestamp for timestamp in request_counts[ip_address]
-            if current_time - timestamp < 60
-        ]
-    
-    # Check if IP is blocked
-    if ip_address in blocked_ips:
-        return False
-    
-    # Initialize or update request count
-    if ip_address not in request_counts:
-        request_counts[ip_address] = []
-    
-    request_counts[ip_address].append(current_time)
-    
-    # Block if too many requests (100 per minute)
-    if len(request_counts[ip_address]) > 100:
-        blocked_ips.add(ip_address)
-        return False
-    
-    return True
+@app.before_request
+def apply_rate_limits():
+    """Reject requests over their route's rate limit with 429 and Retry-After"""
+    if request.endpoint == 'static':
+        return None
+    
+    allowed, retry_after = rate_limiter.check(request.path, request.method, request.remote_addr)
+    if not allowed:
+        raise TooManyRequests(retry_after=retry_after)
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    """Return the request thread's SQLite connection to the pool"""
+    voter_manager.storage.release()
+
+def login_busy_response():
+    """503 with Retry-After when the credential verification queue is full"""
+    response = jsonify({'success': False, 'message': 'Server busy, please try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 # Routes
 @app.route('/')
@@ -137,7 +169,10 @@ def login():
     biometric = data.get('biometric')
     
     # Verify voter credentials
-    voter = voter_manager.verify_voter(voter_id, password, otp, biometric)
+    try:
+        voter = voter_manager.verify_voter(voter_id, password, otp, biometric)
+    except CredentialQueueFull:
+        return login_busy_response()
     
     if voter:
         session['voter_id'] = voter_id
@@ -173,6 +208,8 @@ def register():
     result = voter_manager.register_voter(data)
     
     if result['success']:
+        event_broadcaster.publish('voters', {'pending': 1})
+        
         # Send OTP for verification
         otp = voter_manager.send_otp(data['phone'])
         return jsonify({
@@ -195,6 +232,16 @@ def verify_otp():
     else:
         return jsonify({'success': False, 'message': 'Invalid OTP'}), 401
 
+@app.route('/voter-qr', methods=['GET'])
+@login_required
+def voter_qr():
+    """QR payload for the logged-in voter, generated on first request"""
+    qr_code = voter_manager.get_voter_qr(session.get('voter_id'))
+    if not qr_code:
+        return jsonify({'success': False, 'message': 'Voter not found'}), 404
+    
+    return jsonify({'success': True, 'qr_code': qr_code})
+
 @app.route('/voting', methods=['GET'])
 @login_required
 def voting_page():
@@ -254,35 +301,50 @@ def cast_vote():
     if not candidate_id:
         return jsonify({'success': False, 'message': 'প্রার্থী নির্বাচন করুন'}), 400
     
-    # Encrypt vote
-    encrypted_vote = encrypt_vote(candidate_id)
+    # Claim the voted flag atomically so concurrent requests cannot both pass
+    if not voter_manager.mark_as_voted(voter_id):
+        security_manager.log_activity(voter_id, 'vote_cast', 'duplicate_attempt')
+        return jsonify({
+            'success': False, 
+            'message': 'আপনি ইতিমধ্যে ভোট দিয়েছেন। একজন ভোটার শুধুমাত্র একবার ভোট দিতে পারবেন।'
+        }), 403
     
-    # Generate digital signature
-    signature = generate_digital_signature(voter_id, candidate_id)
+    # Encrypt vote
+    encrypted_vote = encrypt_vote(candidate_id, ELECTION_CONFIG['election_id'])
     
     # Create vote record with timestamp
     vote_timestamp = datetime.now().isoformat()
     vote_data = {
         'voter_id_hash': voter_id_hash,
         'encrypted_vote': encrypted_vote,
-        'signature': signature,
         'timestamp': vote_timestamp,
         'ip_address_hash': hashlib.sha256(request.remote_addr.encode()).hexdigest(),
         'candidate_id': candidate_id  # For analytics (encrypted separately)
     }
     
+    # Sign the canonical record; chain audits verify it with the public key
+    vote_signer.sign_vote(vote_data)
+    
     # Add to blockchain (permanent record)
     block = blockchain.add_vote(vote_data)
     
-    # Mark voter as voted (immediate flag)
-    voter_manager.mark_as_voted(voter_id)
-    
     # Log activity
     security_manager.log_activity(voter_id, 'vote_cast', 'success', 
                                   f'Block: {block.hash}, Candidate: {candidate_id}')
     
     # Analytics
-    analytics_engine.record_vote(voter_id, candidate_id, datetime.now())
+    analytics_engine.record_vote(voter_id, candidate_id, datetime.now(),
+                                 voter_manager.get_voter_demographics(voter_id))
+    
+    # Push to live subscribers
+    event_broadcaster.publish('new_block', {
+        'index': block.index,
+        'hash': block.hash,
+        'previous_hash': block.previous_hash,
+        'timestamp': block.timestamp,
+        'votes_count': len(block.votes)
+    })
+    tally_coalescer.add(candidate_id, block.index)
     
     return jsonify({
         'success': True,
@@ -334,15 +396,34 @@ def results():
 @app.route('/api/results', methods=['GET'])
 def api_results():
     """API endpoint for real-time results"""
+    # A vote's block is on the chain before its tally event is published, so an event
+    # cursor cannot tell which deltas the snapshot counts; its block height can
     results = analytics_engine.get_live_results(blockchain)
     
     return jsonify({
         'success': True,
         'results': results,
         'total_votes': results['total_votes'],
+        'block_height': results['block_height'],
+        'cursor': event_broadcaster.last_event_id,
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/stream', methods=['GET'])
+def api_stream():
+    """Server-Sent Events stream of tally deltas and new blocks"""
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        cursor = int(cursor) if cursor is not None else None
+    except ValueError:
+        cursor = None
+    
+    return Response(
+        stream_with_context(event_broadcaster.subscribe(cursor)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/blockchain-explorer', methods=['GET'])
 def blockchain_explorer():
     """Public blockchain explorer"""
@@ -382,6 +463,49 @@ def api_analytics():
         'analytics': analytics_data
     })
 
+@app.route('/api/projections', methods=['GET'])
+def api_projections():
+    """Get projected final results with confidence intervals"""
+    method = request.args.get('method', 'analytic')
+    if method not in ('analytic', 'bootstrap'):
+        return jsonify({'success': False, 'message': 'Invalid method'}), 400
+    
+    try:
+        confidence = float(request.args.get('confidence', 0.95))
+    except ValueError:
+        confidence = 0.95
+    if not 0 < confidence < 1:
+        return jsonify({'success': False, 'message': 'Invalid confidence level'}), 400
+    
+    total_expected = voter_manager.get_voter_statistics()['total_registered']
+    projection = analytics_engine.predict_final_results(blockchain, total_expected, confidence, method)
+    
+    if 'error' in projection:
+        return jsonify({'success': False, 'message': projection['error']}), 400
+    
+    return jsonify({
+        'success': True,
+        'projection': projection
+    })
+
+@app.route('/api/analytics/cube', methods=['GET'])
+def api_analytics_cube():
+    """Slice or roll up votes by region, age group, gender, candidate and hour"""
+    group_by = [d for d in request.args.get('group_by', '').split(',') if d]
+    filters = {key: value for key, value in request.args.items() if key != 'group_by'}
+    
+    try:
+        rows = analytics_engine.get_cube_slice(group_by, filters)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'group_by': group_by,
+        'filters': filters,
+        'rows': rows
+    })
+
 @app.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
     """Admin login"""
@@ -397,7 +521,15 @@ def admin_login():
     if username in ADMIN_USERS:
         admin = ADMIN_USERS[username]
         
-        if verify_password(password, admin['password']) and mfa_code == admin['mfa_code']:
+        try:
+            password_ok, upgraded_hash = credential_verifier.verify(password, admin['password'])
+        except CredentialQueueFull:
+            return login_busy_response()
+        
+        if password_ok and upgraded_hash:
+            admin['password'] = upgraded_hash
+        
+        if password_ok and mfa_code == admin['mfa_code']:
             session['admin'] = True
             session['admin_user'] = username
             session['is_super_admin'] = admin.get('is_super_admin', False)
@@ -446,6 +578,7 @@ def manage_election():
         ELECTION_CONFIG['countdown_locked'] = True  # Lock countdown after start
         
         security_manager.log_activity(session.get('admin_user'), 'election_started', 'success')
+        event_broadcaster.publish('election', {'is_active': True})
         
         return jsonify({'success': True, 'message': 'Election started', 'countdown_locked': True})
     
@@ -454,6 +587,7 @@ def manage_election():
         ELECTION_CONFIG['countdown_locked'] = False
         
         security_manager.log_activity(session.get('admin_user'), 'election_stopped', 'success')
+        event_broadcaster.publish('election', {'is_active': False})
         
         return jsonify({'success': True, 'message': 'Election stopped'})
     
@@ -483,12 +617,54 @@ def manage_election():
 @app.route('/admin/voters', methods=['GET'])
 @admin_required
 def manage_voters():
-    """Manage voter registrations"""
-    voters = voter_manager.get_all_voters()
-    return jsonify({
-        'success': True,
-        'voters': voters
-    })
+    """Keyset-paginated voter listing with server-side sort and filters"""
+    args = request.args
+    filters = {}
+    
+    for flag in ('active', 'has_voted'):
+        if flag in args:
+            if args[flag] not in ('true', 'false'):
+                return jsonify({'success': False, 'message': f'{flag} must be true or false'}), 400
+            filters[flag] = args[flag] == 'true'
+    if args.get('region'):
+        filters['region'] = args['region']
+    
+    try:
+        limit = min(max(int(args.get('limit', 50)), 1), 200)
+        page = voter_manager.list_voters(
+            status=args.get('status', 'approved'),
+            sort=args.get('sort', 'registration_date'),
+            order=args.get('order', 'asc'),
+            cursor=args.get('cursor'),
+            limit=limit,
+            filters=filters
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({'success': True, **page})
+
+@app.route('/admin/search-voters', methods=['GET'])
+@admin_required
+def search_voters():
+    """Ranked, paginated voter search by name, email or voter ID"""
+    query = request.args.get('q', '').strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        return jsonify({
+            'success': False,
+            'message': f'Search needs at least {MIN_QUERY_LENGTH} characters'
+        }), 400
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid limit or offset'}), 400
+    
+    active_only = request.args.get('active_only') == 'true'
+    result = voter_manager.search_voters(query, limit, offset, active_only)
+    
+    return jsonify({'success': True, **result})
 
 @app.route('/admin/approve-voter', methods=['POST'])
 @admin_required
@@ -498,17 +674,111 @@ def approve_voter():
     voter_id = data.get('voter_id')
     
     result = voter_manager.approve_voter(voter_id)
+    if result['success']:
+        event_broadcaster.publish('voters', {'approved': 1})
+    return jsonify(result)
+
+@app.route('/admin/approve-voters', methods=['POST'])
+@admin_required
+def approve_voters():
+    """Approve many voter registrations by ID list or by filter"""
+    data = request.json or {}
+    voter_ids = data.get('voter_ids')
+    filters = data.get('filters')
+    approve_all = data.get('all') is True
+    
+    if voter_ids is not None and (not isinstance(voter_ids, list)
+                                  or not all(isinstance(voter_id, str) for voter_id in voter_ids)):
+        return jsonify({'success': False, 'message': 'voter_ids must be a list of strings'}), 400
+    if filters is not None and (not isinstance(filters, dict)
+                                or not all(isinstance(value, str) for value in filters.values())):
+        return jsonify({'success': False, 'message': 'filters must be an object of strings'}), 400
+    
+    result = voter_manager.approve_voters(voter_ids, filters, approve_all)
+    if not result['success']:
+        return jsonify(result), 400
+    
+    if result['approved_count']:
+        event_broadcaster.publish('voters', {'approved': result['approved_count']})
+    
+    security_manager.log_activity(session.get('admin_user'), 'voters_approved', 'success',
+                                  f"Approved {result['approved_count']} voters")
+    
     return jsonify(result)
 
 @app.route('/admin/security-logs', methods=['GET'])
 @admin_required
 def security_logs():
-    """View security logs"""
-    logs = security_manager.get_logs()
-    return jsonify({
-        'success': True,
-        'logs': logs
-    })
+    """Query security logs by user, action, status and time range with cursor pagination"""
+    args = request.args
+    filters = {field: args[field] for field in ('user_id', 'action', 'status') if args.get(field)}
+    
+    try:
+        limit = min(max(int(args.get('limit', 100)), 1), 1000)
+        cursor = int(args['cursor']) if args.get('cursor') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid limit or cursor'}), 400
+    
+    try:
+        result = security_manager.query_logs(
+            filters,
+            start=args.get('start') or None,
+            end=args.get('end') or None,
+            cursor=cursor,
+            limit=limit,
+            count_only=args.get('count_only') == 'true'
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({'success': True, **result})
+
+@app.route('/admin/reports', methods=['GET', 'POST'])
+@admin_required
+def election_reports():
+    """Submit a background election report job or list existing jobs"""
+    if request.method == 'GET':
+        return jsonify({
+            'success': True,
+            'jobs': report_jobs.list_jobs()
+        })
+    
+    tip = blockchain.get_latest_block().hash
+    job = report_jobs.submit(
+        tip,
+        lambda: analytics_engine.generate_election_report(blockchain, voter_manager)
+    )
+    
+    security_manager.log_activity(session.get('admin_user'), 'report_requested', 'success',
+                                  f"Job: {job['job_id']}")
+    
+    return jsonify({'success': True, 'job': job}), 202
+
+@app.route('/admin/reports/<job_id>', methods=['GET'])
+@admin_required
+def election_report_status(job_id):
+    """Poll the status of a report job"""
+    job = report_jobs.get_status(job_id)
+    
+    if not job:
+        return jsonify({'success': False, 'message': 'Report job not found'}), 404
+    
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/admin/reports/<job_id>/download', methods=['GET'])
+@admin_required
+def download_election_report(job_id):
+    """Download a completed report artifact"""
+    report = report_jobs.get_artifact(job_id)
+    
+    if report is None:
+        return jsonify({'success': False, 'message': 'Report not ready'}), 404
+    
+    return Response(
+        report,
+        mimetype='application/json',
+        headers={'Content-Disposition': f'attachment; filename=election_report_{job_id}.json'}
+    )
 
 @app.route('/admin/promote-to-admin', methods=['POST'])
 @super_admin_required
@@ -521,15 +791,14 @@ def promote_to_admin():
         return jsonify({'success': False, 'message': 'Voter ID required'}), 400
     
     # Check if voter exists
-    if voter_id not in voter_manager.voters:
+    voter = voter_manager.get_voter(voter_id)
+    if not voter:
         return jsonify({'success': False, 'message': 'Voter not found'}), 404
     
     # Check if already admin
     if voter_id in ADMIN_USERS:
         return jsonify({'success': False, 'message': 'Already an admin'}), 400
     
-    voter = voter_manager.voters[voter_id]
-    
     # Create admin account
     admin_username = data.get('admin_username', voter_id)
     admin_password = data.get('admin_password', secrets.token_hex(8))
@@ -621,8 +890,9 @@ def voting_stats():
     blockchain_stats = blockchain.get_blockchain_stats()
     
     # Additional stats
-    total_votes = len(analytics_engine.vote_records)
-    unique_voters = len(set(record['voter_id'] for record in analytics_engine.vote_records))
+    total_votes = len(analytics_engine.vote_store)
+    # Each voter can be marked as voted once, so the maintained counter is the unique voter count
+    unique_voters = voter_stats['voted_count']
     
     return jsonify({
         'success': True,
@@ -631,12 +901,53 @@ def voting_stats():
             'blockchain_stats': blockchain_stats,
             'total_votes': total_votes,
             'unique_voters': unique_voters,
+            'credential_queue': credential_verifier.get_stats(),
+            'rate_limits': rate_limiter.get_stats(),
             'duplicate_attempts': total_votes - unique_voters if total_votes > unique_voters else 0,
             'election_active': ELECTION_CONFIG['is_active'],
             'countdown_locked': ELECTION_CONFIG.get('countdown_locked', False)
         }
     })
 
+@app.route('/admin/voting-stats/check', methods=['POST'])
+@admin_required
+def check_voting_stats():
+    """Recompute maintained statistics counters and repair any drift"""
+    voter_check = voter_manager.check_statistics()
+    
+    # The voted flags persist across restarts but this process's chain does not, and other
+    # workers keep chains of their own; so every voter on the chain must be marked as voted,
+    # while marked voters missing from it are expected
+    vote_check = voter_manager.check_votes_recorded(
+        vote['voter_id_hash'] for vote in blockchain.get_all_votes()
+    )
+    
+    security_manager.log_activity(session.get('admin_user'), 'stats_checked', 'success')
+    
+    return jsonify({
+        'success': True,
+        'consistent': voter_check['consistent'] and not vote_check['unmarked_voters'],
+        'voter_stats': voter_check,
+        'votes': vote_check
+    })
+
+@app.route('/admin/audit-signatures', methods=['POST'])
+@admin_required
+def audit_signatures():
+    """Verify vote signatures on blocks not covered by an earlier audit"""
+    audit = signature_auditor.audit(blockchain.chain)
+
+    security_manager.log_activity(session.get('admin_user'), 'signatures_audited',
+                                  'success' if audit['valid'] else 'failed',
+                                  f"Checked {audit['checked_blocks']} blocks")
+
+    return jsonify({
+        'success': True,
+        'chain_valid': blockchain.is_chain_valid(),
+        'signature_key': vote_signer.key_id,
+        'audit': audit
+    })
+
 @app.route('/logout')
 def logout():
     """Logout voter or admin"""
@@ -650,7 +961,12 @@ def logout():
 @app.errorhandler(429)
 def rate_limit_error(e):
     """Handle rate limit errors"""
-    return jsonify({'error': 'Too many requests. Please try again later.'}), 429
+    message = 'Too many requests. Please try again later.'
+    response = jsonify({'success': False, 'error': message, 'message': message})
+    retry_after = getattr(e, 'retry_after', None)
+    if retry_after:
+        response.headers['Retry-After'] = str(retry_after)
+    return response, 429
 
 @app.errorhandler(500)
 def internal_error(e):
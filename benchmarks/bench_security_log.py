@@ -0,0 +1,103 @@
+"""
+Security Log Benchmark
+Per-call overhead of log_activity with the ring buffer and file sink against the unbounded list,
+and of SecurityManager.log_activity, which also counts the event in the per-user anomaly windows
+
+Usage: python -m benchmarks.bench_security_log [num_calls]
+"""
+
+import os
+import secrets
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from utils.security import SecurityManager
+from utils.security_log import SecurityLog
+
+
+class ListLog:
+    """The previous design: unbounded list with a random hex ID per entry"""
+
+    def __init__(self):
+        self.activity_log = []
+
+    def log_activity(self, user_id, action, status, details=''):
+        self.activity_log.append({
+            'timestamp': datetime.now().isoformat(),
+            'user_id': user_id,
+            'action': action,
+            'status': status,
+            'details': details,
+            'ip_address': '',
+            'log_id': secrets.token_hex(16)
+        })
+
+
+class RingLog:
+    """The same entry appended to a SecurityLog, without the anomaly windows"""
+
+    def __init__(self, log_dir=None):
+        self.activity_log = SecurityLog(log_dir=log_dir)
+
+    def log_activity(self, user_id, action, status, details=''):
+        self.activity_log.append({
+            'timestamp': datetime.now().isoformat(),
+            'user_id': user_id,
+            'action': action,
+            'status': status,
+            'details': details,
+            'ip_address': ''
+        })
+
+
+def drain(label, log):
+    """Time closing the sink, which waits for the writer to catch up, and print what it wrote"""
+    start = time.perf_counter()
+    log.close()
+    elapsed = time.perf_counter() - start
+    stats = log.get_stats()
+    print(f"  {label:<30} {elapsed * 1000:8,.1f} ms"
+          f"  ({stats['written']:,} written, {stats['dropped']:,} dropped, {stats['rotations']} rotations)")
+
+
+def per_call(label, num_calls, log):
+    """Time each log_activity call and print mean, p99 and worst-case cost"""
+    timings = []
+    clock = time.perf_counter_ns
+    for i in range(num_calls):
+        start = clock()
+        log.log_activity(f'V{i % 5000:06d}', 'login', 'success')
+        timings.append(clock() - start)
+
+    timings.sort()
+    mean = sum(timings) / num_calls
+    p99 = timings[int(num_calls * 0.99)]
+    print(f"  {label:<30} {mean:8,.0f} ns mean {p99:8,.0f} ns p99 {timings[-1] / 1000:8,.0f} us max")
+
+
+def main():
+    # Default burst fits the sink's pending queue, so nothing is dropped
+    num_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    print(f"{num_calls:,} log_activity calls:")
+    per_call('list + token_hex (before)', num_calls, ListLog())
+    per_call('ring only', num_calls, RingLog())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ring = RingLog(log_dir=os.path.join(tmp, 'ring'))
+        per_call('ring + file sink', num_calls, ring)
+        drain('sink drain after last call', ring.activity_log)
+
+        manager = SecurityManager(log_dir=os.path.join(tmp, 'manager'))
+        per_call('SecurityManager + file sink', num_calls, manager)
+        drain('sink drain after last call', manager.activity_log)
+
+        compressed = SecurityManager(log_dir=os.path.join(tmp, 'gz'), compress_logs=True)
+        per_call('SecurityManager + gzip sink', num_calls, compressed)
+        drain('sink drain after last call', compressed.activity_log)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Shared Table Benchmark
+Per-check latency of the process-local limiter, the mmap shared table and the socket-served table,
+plus a cross-process check that a shared burst is never exceeded
+
+Usage: python -m benchmarks.bench_shared_table [num_checks]
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from utils.rate_limiter import TokenBucketLimiter
+from utils.shared_table import SharedTable, RemoteTable, serve
+
+
+def latency(label, limiter, num_checks, num_clients=10_000):
+    """Time acquire calls spread over num_clients keys and print mean and p99"""
+    keys = [f'default:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}' for i in range(num_clients)]
+    samples = []
+    for i in range(num_checks):
+        key = keys[i % num_clients]
+        start = time.perf_counter()
+        limiter.acquire(key, 100 / 60, 100)
+        samples.append(time.perf_counter() - start)
+
+    samples.sort()
+    mean = sum(samples) / len(samples) * 1e6
+    p99 = samples[int(len(samples) * 0.99)] * 1e6
+    print(f"  {label:<28} mean {mean:8.2f} us   p99 {p99:8.2f} us")
+
+
+def hammer(path, attempts):
+    """Worker: try to take tokens from one shared key that never refills"""
+    table = SharedTable(path)
+    return sum(1 for _ in range(attempts) if table.acquire('login:203.0.113.7', 1e-9, 100)[0])
+
+
+def main():
+    num_checks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        table_path = os.path.join(tmp, 'shared_state.tbl')
+        socket_path = os.path.join(tmp, 'shared_state.sock')
+
+        print(f"{num_checks:,} checks over 10,000 client keys")
+        latency('process-local buckets', TokenBucketLimiter(), num_checks)
+        latency('mmap shared table', SharedTable(table_path), num_checks)
+
+        server = multiprocessing.Process(target=serve, args=(socket_path, table_path), daemon=True)
+        server.start()
+        while not os.path.exists(socket_path):
+            time.sleep(0.01)
+        latency('socket-served table', RemoteTable(socket_path), num_checks // 10)
+        server.terminate()
+
+        workers = 4
+        with multiprocessing.Pool(workers) as pool:
+            allowed = sum(pool.starmap(hammer, [(table_path, 1000)] * workers))
+        print(f"  {workers} processes x 1,000 attempts on one key with burst 100: {allowed} allowed")
+
+
+if __name__ == '__main__':
+    main()
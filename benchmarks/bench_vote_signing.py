@@ -0,0 +1,61 @@
+"""
+Vote Signing Benchmark
+Ed25519 signing and verification throughput, serial and through the batched chain audit
+
+Usage: python -m benchmarks.bench_vote_signing [num_votes]
+"""
+
+import hashlib
+import sys
+import time
+
+from blockchain.blockchain_core import Block
+from utils.vote_signing import VoteSigner, SignatureAuditor, verify_with_key
+
+
+def rate(label, count, func):
+    """Run func and print operations per second"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {count / elapsed:14,.0f} sigs/s  ({elapsed * 1000:,.1f} ms)")
+    return result
+
+
+def main():
+    num_votes = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    signer = VoteSigner()
+    votes = [{
+        'voter_id_hash': hashlib.sha256(f'BD{i:010d}'.encode()).hexdigest(),
+        'encrypted_vote': 'gAAAAA' + 'x' * 100,
+        'timestamp': '2026-01-01T08:00:00.000000',
+        'ip_address_hash': hashlib.sha256(f'10.0.{i % 256}.{i % 100}'.encode()).hexdigest(),
+        'candidate_id': f'C{i % 8}'
+    } for i in range(num_votes)]
+
+    print(f"{num_votes:,} votes")
+    rate('sign', num_votes, lambda: [signer.sign_vote(vote) for vote in votes])
+    rate('verify (serial)', num_votes,
+         lambda: [verify_with_key(signer.public_key, vote, vote['signature']) for vote in votes])
+
+    # One vote per block, as Blockchain.add_vote builds them; hashing only, no mining
+    chain = [Block(0, [], 'genesis', '0')]
+    for vote in votes:
+        chain.append(Block(len(chain), [vote], vote['timestamp'], chain[-1].hash))
+
+    for workers in (1, 4):
+        auditor = SignatureAuditor({signer.key_id: signer.public_key}, max_workers=workers)
+        result = rate(f'audit ({workers} worker{"s" if workers > 1 else ""})', num_votes,
+                      lambda: auditor.audit(chain))
+        assert result['valid'], result['failures']
+
+        start = time.perf_counter()
+        result = auditor.audit(chain)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"  {'re-audit (cached ranges)':<34} {elapsed:14,.2f} ms  "
+              f"({result['skipped_blocks']:,} blocks skipped)")
+        auditor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Vote Store Benchmark
+Compares the columnar NumPy vote store against a list-of-dicts scan
+
+Usage: python -m benchmarks.bench_vote_store [num_votes]
+"""
+
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from utils.vote_store import ColumnarVoteStore
+
+CANDIDATES = ['C1', 'C2', 'C3', 'C4']
+REGIONS = ['Dhaka', 'Chattogram', 'Khulna', 'Rajshahi', 'Sylhet', 'Barishal', 'Rangpur', 'Mymensingh']
+GENDERS = ['male', 'female', 'other']
+AGE_GROUPS = ['18-24', '25-34', '35-44', '45-54', '55-64', '65+']
+
+
+def timed(label, func, repeat=3):
+    """Run a function several times and print the best wall-clock time"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<36} {best * 1000:10.2f} ms")
+    return best
+
+
+def build_fixtures(num_votes):
+    """Build the same synthetic votes in both representations"""
+    rng = np.random.default_rng(42)
+    start = datetime(2026, 1, 1, 8, 0)
+    seconds = np.sort(rng.integers(0, 10 * 3600, num_votes))
+
+    candidate_codes = rng.integers(0, len(CANDIDATES), num_votes)
+    region_codes = rng.integers(0, len(REGIONS), num_votes)
+    gender_codes = rng.integers(0, len(GENDERS), num_votes)
+    age_codes = rng.integers(0, len(AGE_GROUPS), num_votes)
+
+    records = [
+        {
+            'voter_id': f'V{i}',
+            'candidate_id': CANDIDATES[candidate_codes[i]],
+            'timestamp': (start + timedelta(seconds=int(seconds[i]))).isoformat(),
+            'region': REGIONS[region_codes[i]],
+            'gender': GENDERS[gender_codes[i]],
+            'age_group': AGE_GROUPS[age_codes[i]]
+        }
+        for i in range(num_votes)
+    ]
+
+    # Fill columns directly; append() cost is measured separately below
+    store = ColumnarVoteStore(initial_capacity=num_votes)
+    for dimension, labels in (('candidate', CANDIDATES), ('region', REGIONS),
+                              ('gender', GENDERS), ('age_group', AGE_GROUPS)):
+        for label in labels:
+            store.codebooks[dimension].encode(label)
+    base = int((start - datetime(1970, 1, 1)).total_seconds())
+    store.columns['timestamp'][:num_votes] = base + seconds
+    store.columns['voter_key'][:num_votes] = np.arange(num_votes)
+    store.columns['candidate'][:num_votes] = candidate_codes
+    store.columns['region'][:num_votes] = region_codes
+    store.columns['gender'][:num_votes] = gender_codes
+    store.columns['age_group'][:num_votes] = age_codes
+    store.size = num_votes
+
+    return records, store
+
+
+def list_candidate_time_series(records):
+    """Per-candidate hourly counts over the list of dicts"""
+    series = Counter()
+    for record in records:
+        hour = datetime.fromisoformat(record['timestamp']).strftime('%Y-%m-%d %H')
+        series[(record['candidate_id'], hour)] += 1
+    return series
+
+
+def main():
+    num_votes = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Building {num_votes:,} synthetic votes...")
+    records, store = build_fixtures(num_votes)
+
+    print("List of dicts:")
+    list_times = [
+        timed('turnout (unique voters)', lambda: len(set(r['voter_id'] for r in records)), 1),
+        timed('candidate hourly time series', lambda: list_candidate_time_series(records), 1),
+        timed('regional breakdown', lambda: Counter(r['region'] for r in records), 1),
+        timed('region x candidate crosstab',
+              lambda: Counter((r['region'], r['candidate_id']) for r in records), 1)
+    ]
+
+    print("Columnar store:")
+    store_times = [
+        timed('turnout (unique voters)', store.recount_unique_voters),
+        timed('candidate hourly time series', store.candidate_time_series),
+        timed('regional breakdown', lambda: store.breakdown('region')),
+        timed('region x candidate crosstab', lambda: store.crosstab('region', 'candidate'))
+    ]
+
+    print("Speedup:")
+    for label, list_time, store_time in zip(
+            ['turnout', 'time series', 'breakdown', 'crosstab'], list_times, store_times):
+        print(f"  {label:<36} {list_time / store_time:10.1f}x")
+
+    append_store = ColumnarVoteStore()
+    now = datetime.now()
+    appends = min(num_votes, 100_000)
+    start = time.perf_counter()
+    for i in range(appends):
+        append_store.append(f'V{i}', CANDIDATES[i % 4], now, {'region': REGIONS[i % 8]})
+    elapsed = time.perf_counter() - start
+    print(f"Append throughput: {appends / elapsed:,.0f} votes/s")
+
+
+if __name__ == '__main__':
+    main()
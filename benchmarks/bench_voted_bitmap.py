@@ -0,0 +1,87 @@
+"""
+Voted Bitmap Benchmark
+Size and speed of SQLite voted flags as a bitmap over voter ordinals against a table of voted IDs,
+with the in-memory set of IDs for reference
+
+Usage: python -m benchmarks.bench_voted_bitmap [num_voters]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from utils.voter_management import build_voter_record
+from utils.voter_storage import SQLiteVoterStorage
+
+
+def rate(label, count, func):
+    """Run func and print operations per second"""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {count / elapsed:12,.0f} ops/s")
+
+
+def table_bytes(conn, *names):
+    """Bytes of database pages used by tables and their indexes"""
+    placeholders = ', '.join('?' * len(names))
+    return conn.execute(
+        f'SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN ({placeholders}) '
+        f"OR name IN (SELECT name FROM sqlite_master WHERE tbl_name IN ({placeholders}) AND type = 'index')",
+        names + names
+    ).fetchone()[0]
+
+
+def voter_record(voter_id):
+    voter_data = {'voter_id': voter_id, 'name': 'Voter', 'email': f'{voter_id}@example.org',
+                  'phone': '+8801700000000', 'national_id': voter_id}
+    return dict(build_voter_record(voter_data, 'hash'), approved=True)
+
+
+def set_bytes(voted):
+    """Approximate heap size of a set of strings, including the strings"""
+    return sys.getsizeof(voted) + sum(sys.getsizeof(voter_id) for voter_id in voted)
+
+
+def main():
+    num_voters = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    ids = [f'BD{i:010d}' for i in range(num_voters)]
+    # Half the roll votes
+    voted_ids = ids[::2]
+    missing_ids = ids[1::2]
+    print(f"{num_voters:,} voters, {len(voted_ids):,} voted")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteVoterStorage(os.path.join(tmp, 'voters.db'))
+        for start in range(0, num_voters, 10_000):
+            storage.add_many([voter_record(voter_id) for voter_id in ids[start:start + 10_000]])
+        conn = storage.connection()
+
+        print("SQLite table of voted IDs (previous layout):")
+        conn.execute('CREATE TABLE voted_ids (voter_id TEXT PRIMARY KEY, voted_at TEXT NOT NULL) '
+                     'WITHOUT ROWID')
+        insert = ('INSERT INTO voted_ids (voter_id, voted_at) VALUES (?, ?) '
+                  'ON CONFLICT(voter_id) DO NOTHING')
+        rate('mark voted', len(voted_ids),
+             lambda: [conn.execute(insert, (v, datetime.now().isoformat())).rowcount for v in voted_ids])
+        lookup = 'SELECT 1 FROM voted_ids WHERE voter_id = ?'
+        rate('has_voted (miss)', len(missing_ids),
+             lambda: [conn.execute(lookup, (v,)).fetchone() for v in missing_ids])
+        print(f"  {'size':<28} {table_bytes(conn, 'voted_ids') / 2**20:12,.1f} MiB")
+
+        print("SQLite bitmap over voter ordinals:")
+        rate('mark voted', len(voted_ids), lambda: [storage.mark_as_voted(v) for v in voted_ids])
+        rate('has_voted (miss)', len(missing_ids), lambda: [storage.has_voted(v) for v in missing_ids])
+        rate('count voted (popcount)', 1, storage.count_voted)
+        print(f"  {'size':<28} {table_bytes(conn, 'voted_words') / 2**20:12,.1f} MiB")
+        print(f"  {'duplicates accepted':<28} {sum(storage.mark_as_voted(v) for v in voted_ids):12,}")
+        storage.close()
+
+    print("In-memory set of voted IDs:")
+    print(f"  {'size':<28} {set_bytes(set(voted_ids)) / 2**20:12,.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
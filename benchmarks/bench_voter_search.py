@@ -0,0 +1,82 @@
+"""
+Voter Search Benchmark
+Trigram index search latency against the linear substring scan
+
+Usage: python -m benchmarks.bench_voter_search [num_voters]
+"""
+
+import random
+import sys
+import time
+
+from utils.search_index import TrigramIndex
+
+FIRST_NAMES = ['Rahim', 'Karim', 'Fatema', 'Ayesha', 'Nusrat', 'Tanvir', 'Sabbir', 'Farhana',
+               'Mahmud', 'Shirin', 'Rakib', 'Sumaiya', 'Imran', 'Jannat', 'Arif', 'Tania']
+LAST_NAMES = ['Hossain', 'Rahman', 'Islam', 'Ahmed', 'Akter', 'Chowdhury', 'Khan', 'Begum',
+              'Uddin', 'Sarkar', 'Miah', 'Talukder', 'Sheikh', 'Bhuiyan', 'Mondal', 'Das']
+DOMAINS = ['gmail.com', 'yahoo.com', 'outlook.com', 'mail.gov.bd']
+
+
+def make_voters(num_voters, seed=7):
+    rng = random.Random(seed)
+    for i in range(num_voters):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {
+            'voter_id': f'BD{i:010d}',
+            'name': f'{first} {last}',
+            'email': f'{first.lower()}.{last.lower()}{rng.randrange(100000)}@{rng.choice(DOMAINS)}'
+        }
+
+
+def linear_search(voters, query, limit):
+    query = query.lower()
+    results = []
+    for voter in voters:
+        if (query in voter['name'].lower() or query in voter['email'].lower()
+                or query in voter['voter_id'].lower()):
+            results.append(voter['voter_id'])
+    return results[:limit]
+
+
+def measure(func, repeat=5):
+    """Median latency of func in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return sorted(times)[len(times) // 2]
+
+
+def main():
+    num_voters = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    voters = list(make_voters(num_voters))
+
+    index = TrigramIndex()
+    start = time.perf_counter()
+    for voter in voters:
+        index.add(voter)
+    elapsed = time.perf_counter() - start
+    print(f"Indexed {num_voters:,} voters in {elapsed:.1f}s ({num_voters / elapsed:,.0f} voters/s), "
+          f"{len(index.postings):,} trigrams")
+
+    queries = [
+        ('exact voter ID', f'BD{num_voters // 2:010d}'),
+        ('ID prefix', f'BD{num_voters // 3:010d}'[:9]),
+        ('rare email fragment', voters[num_voters // 4]['email'].split('@')[0]),
+        ('full name', 'Nusrat Chowdhury'),
+        ('common fragment', 'gmail')
+    ]
+
+    print(f"{'query':<22} {'index ms':>10} {'scan ms':>10} {'matches':>10}")
+    for label, query in queries:
+        result = index.search(query, limit=20)
+        index_ms = measure(lambda: index.search(query, limit=20))
+        scan_ms = measure(lambda: linear_search(voters, query, 20), repeat=1)
+        total = f"{result['total']}{'+' if result['truncated'] else ''}"
+        print(f"{label:<22} {index_ms:10.2f} {scan_ms:10.1f} {total:>10}")
+
+
+if __name__ == '__main__':
+    main()
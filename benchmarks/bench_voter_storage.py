@@ -0,0 +1,73 @@
+"""
+Voter Storage Benchmark
+Registration, login and vote-marking throughput for the memory and SQLite backends
+
+Usage: python -m benchmarks.bench_voter_storage [num_voters]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import security
+from utils.voter_management import VoterManager
+from utils.voter_storage import MemoryVoterStorage, SQLiteVoterStorage
+
+# Measure storage, not the password KDF: use minimal scrypt cost for this run
+security.PASSWORD_HASH_PARAMS = {'n': 2, 'r': 1, 'p': 1}
+
+
+def rate(label, count, func):
+    """Run func and print operations per second"""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {count / elapsed:12,.0f} ops/s")
+
+
+def voter_data(i):
+    return {
+        'voter_id': f'V{i:09d}',
+        'name': f'Voter {i}',
+        'email': f'voter{i}@example.com',
+        'phone': f'+8801{i:09d}',
+        'password': 'correct horse',
+        'national_id': f'NID{i:012d}'
+    }
+
+
+def run(label, manager, num_voters, threads=8):
+    print(f"{label}:")
+    ids = [f'V{i:09d}' for i in range(num_voters)]
+
+    rate('register', num_voters,
+         lambda: [manager.register_voter(voter_data(i)) for i in range(num_voters)])
+    rate('approve', num_voters, lambda: [manager.approve_voter(v) for v in ids])
+    rate('login', num_voters, lambda: [manager.verify_voter(v, 'correct horse') for v in ids])
+    rate('mark voted', num_voters, lambda: [manager.mark_as_voted(v) for v in ids])
+    rate('has_voted', num_voters, lambda: [manager.has_voted(v) for v in ids])
+
+    # Every voter marked again from several threads: all must be rejected
+    with ThreadPoolExecutor(threads) as pool:
+        start = time.perf_counter()
+        duplicates = sum(pool.map(manager.mark_as_voted, ids))
+        elapsed = time.perf_counter() - start
+    print(f"  {'mark voted (%d threads)' % threads:<28} {num_voters / elapsed:12,.0f} ops/s"
+          f"  ({duplicates} duplicates accepted)")
+
+
+def main():
+    num_voters = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+
+    run('Memory', VoterManager(MemoryVoterStorage()), num_voters)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteVoterStorage(os.path.join(tmp, 'voters.db'))
+        run('SQLite (WAL)', VoterManager(storage), num_voters)
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
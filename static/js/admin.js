@@ -7,11 +7,30 @@ let countdownLocked = false;
 // Initialize Dashboard
 document.addEventListener('DOMContentLoaded', () => {
     loadDashboardData();
-    loadVoters();
     loadAdmins();
-    setInterval(loadDashboardData, 10000); // Refresh every 10 seconds
+    
+    // Push updates from the event stream, polling every 10 seconds only as a fallback
+    window.SecureVote.subscribeLiveUpdates({
+        new_block: scheduleDashboardRefresh,
+        election: scheduleDashboardRefresh,
+        voters: scheduleDashboardRefresh,
+        tally: () => {
+            if (currentSection === 'results') loadResults();
+        }
+    }, loadDashboardData);
 });
 
+// Coalesce bursts of events into a single stats reload
+let dashboardRefreshTimer = null;
+
+function scheduleDashboardRefresh() {
+    if (dashboardRefreshTimer) return;
+    dashboardRefreshTimer = setTimeout(() => {
+        dashboardRefreshTimer = null;
+        loadDashboardData();
+    }, 1000);
+}
+
 // Section Navigation
 function showSection(sectionName) {
     // Hide all sections
@@ -213,43 +232,111 @@ async function stopElection() {
     }
 }
 
-// Load Voters
-async function loadVoters() {
+// Load Voters, one keyset page at a time
+let votersNextCursor = null;
+
+function voterListParams() {
+    const params = new URLSearchParams({
+        status: document.getElementById('voterStatusFilter').value,
+        sort: document.getElementById('voterSort').value,
+        limit: 50
+    });
+    const active = document.getElementById('voterActiveFilter').value;
+    const voted = document.getElementById('voterVotedFilter').value;
+    if (active) params.set('active', active);
+    if (voted) params.set('has_voted', voted);
+    return params;
+}
+
+async function loadVoters(append = false) {
+    const params = voterListParams();
+    if (append && votersNextCursor) params.set('cursor', votersNextCursor);
+    
     try {
-        const response = await fetch('/admin/voters');
+        const response = await fetch(`/admin/voters?${params}`);
         const data = await response.json();
         
         if (data.success) {
-            const tbody = document.getElementById('votersTableBody');
-            tbody.innerHTML = '';
-            
-            data.voters.forEach(voter => {
-                const tr = document.createElement('tr');
-                tr.innerHTML = `
-                    <td>${voter.voter_id}</td>
-                    <td>${voter.name}</td>
-                    <td>${voter.email}</td>
-                    <td><span class="status-badge ${voter.approved ? 'status-approved' : 'status-pending'}">
-                        ${voter.approved ? 'Approved' : 'Pending'}
-                    </span></td>
-                    <td>${voter.has_voted ? '✓ Yes' : '✗ No'}</td>
-                    <td>
-                        ${!voter.approved ? 
-                            `<button class="action-btn btn-approve" onclick="approveVoter('${voter.voter_id}')">Approve</button>` 
-                            : ''}
-                        ${voter.active ? 
-                            `<button class="action-btn btn-reject" onclick="deactivateVoter('${voter.voter_id}')">Deactivate</button>` 
-                            : `<button class="action-btn btn-approve" onclick="reactivateVoter('${voter.voter_id}')">Reactivate</button>`}
-                    </td>
-                `;
-                tbody.appendChild(tr);
-            });
+            renderVoterRows(data.voters, append);
+            votersNextCursor = data.next_cursor;
+            document.getElementById('loadMoreVoters').style.display = data.has_more ? '' : 'none';
         }
     } catch (error) {
         console.error('Failed to load voters:', error);
     }
 }
 
+function renderVoterRows(voters, append = false) {
+    const tbody = document.getElementById('votersTableBody');
+    if (!append) tbody.innerHTML = '';
+    
+    voters.forEach(voter => {
+        const tr = document.createElement('tr');
+        tr.innerHTML = `
+            <td>${voter.voter_id}</td>
+            <td>${voter.name}</td>
+            <td>${voter.email}</td>
+            <td><span class="status-badge ${voter.approved ? 'status-approved' : 'status-pending'}">
+                ${voter.approved ? 'Approved' : 'Pending'}
+            </span></td>
+            <td>${voter.has_voted ? '✓ Yes' : '✗ No'}</td>
+            <td>
+                ${!voter.approved ? 
+                    `<button class="action-btn btn-approve" onclick="approveVoter('${voter.voter_id}')">Approve</button>` 
+                    : ''}
+                ${!voter.approved ? '' : voter.active ? 
+                    `<button class="action-btn btn-reject" onclick="deactivateVoter('${voter.voter_id}')">Deactivate</button>` 
+                    : `<button class="action-btn btn-approve" onclick="reactivateVoter('${voter.voter_id}')">Reactivate</button>`}
+            </td>
+        `;
+        tbody.appendChild(tr);
+    });
+}
+
+// Search Voters
+let voterSearchTimer = null;
+const MIN_SEARCH_LENGTH = 3;
+
+async function searchVoters(query) {
+    if (!query.trim()) {
+        loadVoters();
+        return;
+    }
+    
+    // The server rejects shorter queries, which would otherwise scan every voter
+    if (query.trim().length < MIN_SEARCH_LENGTH) return;
+    
+    try {
+        const response = await fetch(`/admin/search-voters?q=${encodeURIComponent(query)}&limit=50`);
+        const data = await response.json();
+        
+        if (data.success) {
+            // Search only covers approved voters
+            renderVoterRows(data.results.map(voter => ({ ...voter, approved: true })));
+            document.getElementById('loadMoreVoters').style.display = 'none';
+        }
+    } catch (error) {
+        console.error('Failed to search voters:', error);
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const searchInput = document.getElementById('voterSearch');
+    if (!searchInput) return;
+    
+    searchInput.addEventListener('input', () => {
+        clearTimeout(voterSearchTimer);
+        voterSearchTimer = setTimeout(() => searchVoters(searchInput.value), 250);
+    });
+    
+    ['voterStatusFilter', 'voterActiveFilter', 'voterVotedFilter', 'voterSort'].forEach(id => {
+        document.getElementById(id).addEventListener('change', () => {
+            searchInput.value = '';
+            loadVoters();
+        });
+    });
+});
+
 // Approve Voter
 async function approveVoter(voterId) {
     try {
@@ -275,6 +362,46 @@ async function approveVoter(voterId) {
     }
 }
 
+// Approve Pending Voters in Bulk
+async function approvePendingVoters() {
+    const filters = {};
+    const region = document.getElementById('bulkApproveRegion').value.trim();
+    const from = document.getElementById('bulkApproveFrom').value;
+    const to = document.getElementById('bulkApproveTo').value;
+    
+    if (region) filters.region = region;
+    if (from) filters.registered_after = from;
+    if (to) filters.registered_before = to + 'T23:59:59.999999';
+    
+    const approveAll = Object.keys(filters).length === 0;
+    const scope = approveAll ? 'ALL pending voters' : 'matching pending voters';
+    if (!confirm(`Approve ${scope}?`)) {
+        return;
+    }
+    
+    try {
+        const response = await fetch('/admin/approve-voters', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(approveAll ? { all: true } : { filters: filters })
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            window.SecureVote.showAlert(`${data.approved_count} voters approved`, 'success');
+            loadVoters();
+            loadDashboardData();
+        } else {
+            window.SecureVote.showAlert(data.message || 'Failed to approve voters', 'error');
+        }
+    } catch (error) {
+        window.SecureVote.showAlert('An error occurred', 'error');
+    }
+}
+
 // Load Admins
 async function loadAdmins() {
     try {
@@ -312,7 +439,8 @@ async function loadAdmins() {
 // Load Voters for Promotion
 async function loadVotersForPromotion() {
     try {
-        const response = await fetch('/admin/voters');
+        // Only active approved voters can be promoted; the first page by name fills the picker
+        const response = await fetch('/admin/voters?status=approved&active=true&sort=name&limit=200');
         const data = await response.json();
         
         if (data.success) {
@@ -320,12 +448,10 @@ async function loadVotersForPromotion() {
             select.innerHTML = '<option value="">Choose a voter...</option>';
             
             data.voters.forEach(voter => {
-                if (voter.approved && voter.active) {
-                    const option = document.createElement('option');
-                    option.value = voter.voter_id;
-                    option.textContent = `${voter.name} (${voter.voter_id})`;
-                    select.appendChild(option);
-                }
+                const option = document.createElement('option');
+                option.value = voter.voter_id;
+                option.textContent = `${voter.name} (${voter.voter_id})`;
+                select.appendChild(option);
             });
         }
     } catch (error) {
@@ -415,15 +541,22 @@ async function removeAdmin(username) {
 
 // Refresh Security Logs
 async function refreshLogs() {
+    const params = new URLSearchParams({ limit: 50 });
+    ['user_id', 'action', 'status'].forEach(field => {
+        const value = document.getElementById(`logFilter_${field}`).value.trim();
+        if (value) params.set(field, value);
+    });
+    
     try {
-        const response = await fetch('/admin/security-logs');
+        const response = await fetch(`/admin/security-logs?${params}`);
         const data = await response.json();
         
         if (data.success) {
             const tbody = document.getElementById('securityLogsBody');
             tbody.innerHTML = '';
             
-            data.logs.slice(-50).reverse().forEach(log => {
+            // Newest first from the server
+            data.logs.forEach(log => {
                 const tr = document.createElement('tr');
                 tr.innerHTML = `
                     <td>${new Date(log.timestamp).toLocaleString()}</td>
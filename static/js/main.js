@@ -115,19 +115,95 @@ function startElectionTimer(endTime) {
     setInterval(updateTimer, 1000);
 }
 
+// Live Update Stream (Server-Sent Events with polling fallback)
+function subscribeLiveUpdates(handlers, fallbackPoll, pollInterval = 10000) {
+    let pollTimer = null;
+    
+    function startPolling() {
+        if (pollTimer) return;
+        fallbackPoll();
+        pollTimer = setInterval(fallbackPoll, pollInterval);
+    }
+    
+    function stopPolling() {
+        if (!pollTimer) return;
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+    
+    if (!window.EventSource) {
+        startPolling();
+        return null;
+    }
+    
+    // EventSource resends Last-Event-ID on reconnect, so missed events are replayed
+    const source = new EventSource('/api/stream');
+    
+    source.addEventListener('hello', stopPolling);
+    source.addEventListener('resync', () => fallbackPoll());
+    source.onerror = startPolling;
+    
+    Object.entries(handlers).forEach(([eventType, handler]) => {
+        source.addEventListener(eventType, (event) => {
+            handler(JSON.parse(event.data), Number(event.lastEventId));
+        });
+    });
+    
+    return source;
+}
+
 // Live Results Updates
 function startLiveResults() {
+    let currentResults = null;
+    let snapshotHeight = 0;
+    
     async function updateResults() {
         try {
             const data = await apiRequest('/api/results');
+            currentResults = data.results;
+            snapshotHeight = data.block_height || 0;
             updateResultsDisplay(data);
         } catch (error) {
             console.error('Failed to update results:', error);
         }
     }
     
+    function applyTally(delta, eventId) {
+        // Deltas for blocks the snapshot already counts are skipped; one that the snapshot
+        // counts only part of cannot be split, so the snapshot is refetched instead
+        if (!currentResults || delta.block_index < snapshotHeight) return;
+        if (delta.first_block_index < snapshotHeight) {
+            updateResults();
+            return;
+        }
+        
+        Object.entries(delta.deltas).forEach(([candidateId, count]) => {
+            let entry = currentResults.results.find(r => r.candidate_id === candidateId);
+            if (!entry) {
+                entry = { candidate_id: candidateId, votes: 0, percentage: 0 };
+                currentResults.results.push(entry);
+            }
+            entry.votes += count;
+        });
+        
+        currentResults.total_votes += delta.total_votes_delta;
+        currentResults.results.forEach(r => {
+            r.percentage = currentResults.total_votes > 0
+                ? Math.round(r.votes / currentResults.total_votes * 10000) / 100
+                : 0;
+        });
+        currentResults.results.sort((a, b) => b.votes - a.votes);
+        
+        updateResultsDisplay({
+            success: true,
+            results: currentResults,
+            total_votes: currentResults.total_votes,
+            cursor: eventId
+        });
+    }
+    
     updateResults();
-    setInterval(updateResults, 10000); // Update every 10 seconds
+    return subscribeLiveUpdates({ tally: applyTally }, updateResults);
 }
 
 function updateResultsDisplay(data) {
@@ -209,6 +285,7 @@ window.SecureVote = {
     formatHash,
     startElectionTimer,
     startLiveResults,
+    subscribeLiveUpdates,
     loadBlockchain,
     toggleDarkMode
 };
@@ -0,0 +1,63 @@
+"""
+Fraud Detection Tests
+Sketch-backed FraudDetector rules must not flag honest voters at election-scale volume
+"""
+
+from utils.analytics import FraudDetector
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_detector(clock, **kwargs):
+    detector = FraudDetector(**kwargs)
+    for sketch in (detector.ip_votes, detector.voter_attempts):
+        sketch.clock = clock
+        sketch.rotated_at = clock()
+    detector.recent_attempts.clock = clock
+    return detector
+
+
+def ip_for(i):
+    return f'{10 + (i >> 24)}.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}'
+
+
+def test_distinct_voters_at_scale_are_never_flagged():
+    clock = FakeClock()
+    detector = make_detector(clock)
+    votes_per_second = 1000
+
+    flagged = 0
+    for i in range(3_000_000):
+        clock.now = i / votes_per_second
+        flagged += detector.detect_suspicious_activity(f'V{i}', ip_for(i))
+
+    assert flagged == 0
+    # Past about a million votes in the window the IP sketch cannot count precisely enough
+    assert detector.get_sketch_stats()['ip_rule_suspended']
+
+
+def test_repeats_are_still_flagged_at_normal_volume():
+    clock = FakeClock()
+    detector = make_detector(clock)
+
+    for i in range(10_000):
+        clock.now = i / 100
+        assert not detector.detect_suspicious_activity(f'V{i}', ip_for(i))
+
+    # Spaced out so only the per-IP limit can trip
+    for i in range(detector.max_votes_per_ip):
+        clock.now += 60
+        assert not detector.detect_suspicious_activity(f'shared-{i}', '203.0.113.7')
+    clock.now += 60
+    assert detector.detect_suspicious_activity('shared-last', '203.0.113.7')
+
+    assert not detector.detect_suspicious_activity('retry', '198.51.100.1')
+    clock.now += 1
+    assert detector.detect_suspicious_activity('retry', '198.51.100.2')
+    assert detector.suspicious_activities[-1]['reasons'] == ['Rapid successive voting attempts']
@@ -0,0 +1,48 @@
+"""
+Key Manager Tests
+Private keys skip RSA validation only when they are the ones this code generated
+"""
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from utils.key_manager import load_or_create_private_key, read_private_key
+
+
+def generate():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def inconsistent_pem():
+    """A PEM whose private exponent does not match its modulus"""
+    numbers = generate().private_numbers()
+    broken = rsa.RSAPrivateNumbers(numbers.p, numbers.q, numbers.d + 2, numbers.dmp1, numbers.dmq1,
+                                   numbers.iqmp, numbers.public_numbers)
+    return broken.private_key(unsafe_skip_rsa_key_validation=True).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+
+
+def test_generated_key_is_reloaded(tmp_path):
+    key_path = str(tmp_path / 'signing.pem')
+    private_key = load_or_create_private_key(key_path, generate)
+
+    assert (tmp_path / 'signing.pem.sha256').exists()
+    assert read_private_key(key_path).private_numbers() == private_key.private_numbers()
+
+
+def test_supplied_key_is_validated(tmp_path):
+    key_path = tmp_path / 'signing.pem'
+    key_path.write_bytes(inconsistent_pem())
+
+    with pytest.raises(ValueError):
+        read_private_key(str(key_path))
+
+
+def test_replaced_key_is_validated(tmp_path):
+    key_path = tmp_path / 'signing.pem'
+    load_or_create_private_key(str(key_path), generate)
+    key_path.write_bytes(inconsistent_pem())
+
+    with pytest.raises(ValueError):
+        load_or_create_private_key(str(key_path), generate)
@@ -0,0 +1,32 @@
+"""
+Live Update Tests
+Tally deltas reach subscribers summed per interval rather than one event per vote
+"""
+
+from utils.live_updates import EventBroadcaster, TallyCoalescer
+
+
+def test_votes_in_an_interval_share_one_event():
+    broadcaster = EventBroadcaster()
+    coalescer = TallyCoalescer(broadcaster, interval=3600)
+    try:
+        for block_index, candidate_id in [(3, 'A'), (2, 'B'), (4, 'A')]:
+            coalescer.add(candidate_id, block_index)
+        event_id = coalescer.flush()
+        assert coalescer.flush() is None
+    finally:
+        coalescer.close()
+
+    events = broadcaster.events_since(0)
+    assert [event['id'] for event in events] == [event_id]
+    assert events[0]['data'] == {'deltas': {'A': 2, 'B': 1}, 'total_votes_delta': 3,
+                                 'first_block_index': 2, 'block_index': 4}
+
+
+def test_close_publishes_pending_votes():
+    broadcaster = EventBroadcaster()
+    coalescer = TallyCoalescer(broadcaster, interval=3600)
+    coalescer.add('A', 1)
+    coalescer.close()
+
+    assert broadcaster.events_since(0)[0]['data']['total_votes_delta'] == 1
@@ -0,0 +1,48 @@
+"""
+Projection Tests
+Cached projections follow the vote store, and bootstrap memory is bounded by a strata cap
+"""
+
+from datetime import datetime, timedelta
+
+from utils.projection import MAX_BOOTSTRAP_STRATA, ProjectionEngine
+from utils.vote_store import ColumnarVoteStore
+
+START = datetime(2026, 1, 1)
+
+
+def store_with_votes(count, regions=64, minutes_per_hour=60):
+    store = ColumnarVoteStore()
+    store.append_many(
+        (f'V{i}', f'C{i % 4}', START + timedelta(minutes=i * 60 // minutes_per_hour),
+         {'region': f'R{i % regions}'})
+        for i in range(count)
+    )
+    return store
+
+
+def test_cache_follows_the_store_not_the_tip():
+    store = store_with_votes(500)
+    engine = ProjectionEngine(store, seed=1)
+
+    # The chain tip moves before the vote reaches the store, so one tip sees two vote counts
+    before = engine.project('tip', 10_000)
+    store.append('late', 'C0', START, {'region': 'R0'})
+    after = engine.project('tip', 10_000)
+
+    assert before['sample_size'] == 500
+    assert after['sample_size'] == 501
+    assert after['convergence']['max_shift_since_previous_sample'] is not None
+
+
+def test_bootstrap_strata_are_capped():
+    # 64 regions x ~400 hourly buckets would be ~25,000 strata
+    store = store_with_votes(25_000, minutes_per_hour=1)
+    engine = ProjectionEngine(store, bootstrap_samples=200, seed=1)
+
+    analytic = engine.project('tip', 100_000)
+    bootstrap = engine.project('tip', 100_000, method='bootstrap')
+
+    assert analytic['convergence']['strata'] > MAX_BOOTSTRAP_STRATA
+    assert bootstrap['convergence']['strata'] <= MAX_BOOTSTRAP_STRATA
+    assert len(bootstrap['predictions']) == 4
@@ -0,0 +1,78 @@
+"""
+Registration Count Tests
+Turnout denominators follow voter storage through imports, approvals, deactivations and restarts
+"""
+
+import sqlite3
+
+import pytest
+
+from utils.analytics import AnalyticsEngine
+from utils.voter_management import VoterManager, build_voter_record
+from utils.voter_storage import MemoryVoterStorage, SQLiteVoterStorage
+
+
+def voter_data(i, region='Dhaka', gender='female'):
+    return {'voter_id': f'V{i}', 'name': f'Voter {i}', 'email': f'voter{i}@example.org',
+            'phone': f'0170000{i:04d}', 'password': 'Passw0rd!', 'national_id': f'NID{i}',
+            'region': region, 'gender': gender, 'date_of_birth': '1990-01-01'}
+
+
+def registered(engine, **filters):
+    return engine.current_cube().registrations.total(filters)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def storage(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryVoterStorage()
+    return SQLiteVoterStorage(str(tmp_path / 'voters.db'))
+
+
+def test_counts_follow_every_approval_path(storage):
+    manager = VoterManager(storage=storage)
+    engine = AnalyticsEngine(manager)
+
+    # Imported already approved, as voter_import --approve does from another process
+    storage.add_many([build_voter_record(voter_data(i), 'hash', approved=True) for i in range(3)])
+    assert registered(engine) == 3
+
+    manager.register_voter(voter_data(10, region='Sylhet'))
+    manager.register_voter(voter_data(11, region='Sylhet', gender='male'))
+    assert registered(engine) == 3
+
+    manager.approve_voter('V10')
+    manager.approve_voters(filters={'region': 'Sylhet'})
+    assert registered(engine, region='Sylhet') == 2
+    assert registered(engine, gender='male') == 1
+
+    manager.deactivate_voter('V0')
+    assert registered(engine, region='Dhaka') == 2
+    manager.reactivate_voter('V0')
+    assert registered(engine, region='Dhaka') == 3
+    assert registered(engine, age_group='unknown') == 0
+
+
+def test_counts_are_seeded_at_startup(tmp_path):
+    path = str(tmp_path / 'voters.db')
+    storage = SQLiteVoterStorage(path)
+    storage.add_many([build_voter_record(voter_data(i), 'hash', approved=True) for i in range(4)])
+    storage.update_voter('V3', {'active': False})
+    storage.close()
+
+    engine = AnalyticsEngine(VoterManager(storage=SQLiteVoterStorage(path)))
+    assert registered(engine) == 3
+
+
+def test_database_without_counts_is_recounted(tmp_path):
+    path = str(tmp_path / 'voters.db')
+    storage = SQLiteVoterStorage(path)
+    storage.add_many([build_voter_record(voter_data(i), 'hash', approved=True) for i in range(4)])
+    storage.close()
+
+    conn = sqlite3.connect(path)
+    conn.execute('DROP TABLE registration_counts')
+    conn.commit()
+    conn.close()
+
+    assert sum(count for _, count in SQLiteVoterStorage(path).registration_counts()) == 4
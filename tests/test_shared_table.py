@@ -0,0 +1,24 @@
+"""
+Shared Table Tests
+RemoteTable closes the socket of a connection attempt that fails
+"""
+
+import gc
+import warnings
+
+import pytest
+
+from utils.shared_table import RemoteTable
+
+
+def test_failed_connect_closes_socket(tmp_path):
+    table = RemoteTable(str(tmp_path / 'missing.sock'))
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', ResourceWarning)
+        for _ in range(3):
+            with pytest.raises(OSError):
+                table.is_blocked('voter')
+        gc.collect()
+
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
@@ -0,0 +1,51 @@
+"""
+Time Bucket Tests
+The average voting rate has no step at one hour, and series reads are consistent with writers
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+from utils.time_buckets import TimeBucketCounter
+
+START = datetime(2026, 3, 1, 8, 0)
+
+
+def counter_with_span(votes, span):
+    counter = TimeBucketCounter()
+    counter.record(START)
+    counter.record(START + span, votes - 1)
+    return counter
+
+
+def test_rate_is_continuous_across_the_hour():
+    below = counter_with_span(600, timedelta(minutes=59, seconds=59)).get_votes_per_hour()
+    at = counter_with_span(600, timedelta(hours=1)).get_votes_per_hour()
+    above = counter_with_span(600, timedelta(hours=1, seconds=1)).get_votes_per_hour()
+
+    assert below == at == 600
+    assert 599.8 < above < 600
+
+
+def test_series_stays_consistent_while_recording():
+    counter = TimeBucketCounter()
+    stop = threading.Event()
+
+    def record():
+        minute = 0
+        while not stop.is_set():
+            counter.record(START + timedelta(minutes=minute % 600))
+            minute += 1
+
+    writer = threading.Thread(target=record)
+    writer.start()
+    try:
+        for _ in range(200):
+            series = counter.series('minute')
+            assert all(count >= 0 for _, count in series)
+            assert [start for start, _ in series] == sorted(start for start, _ in series)
+    finally:
+        stop.set()
+        writer.join()
+
+    assert sum(count for _, count in counter.series('minute')) == counter.total
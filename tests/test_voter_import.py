@@ -0,0 +1,70 @@
+"""
+Voter Import Tests
+Resuming after a crash between a batch commit and its checkpoint, and rejecting non-text fields
+"""
+
+import json
+
+import pytest
+
+from utils.voter_import import VoterRollImporter
+from utils.voter_storage import SQLiteVoterStorage
+
+
+def write_roll(path, count, extra=()):
+    with open(path, 'w') as f:
+        for i in range(count):
+            f.write(json.dumps({'voter_id': f'V{i}', 'name': f'Voter {i}', 'email': f'voter{i}@example.org',
+                                'phone': '01700000000', 'password': 'Passw0rd!',
+                                'national_id': f'NID{i}'}) + '\n')
+        for row in extra:
+            f.write(json.dumps(row) + '\n')
+
+
+def importer(tmp_path, storage):
+    return VoterRollImporter(storage, batch_size=4, workers=1,
+                             checkpoint_path=str(tmp_path / 'roll.checkpoint'),
+                             rejects_path=str(tmp_path / 'rejects.ndjson'))
+
+
+def test_resume_counts_batch_stored_before_crash(tmp_path, monkeypatch):
+    roll = str(tmp_path / 'roll.ndjson')
+    write_roll(roll, 10)
+    storage = SQLiteVoterStorage(str(tmp_path / 'voters.db'))
+    storage.add_many([{'voter_id': 'V5', 'name': 'Earlier', 'email': 'e@example.org', 'phone': '',
+                       'national_id': 'N', 'approved': False, 'active': True}])
+
+    first = importer(tmp_path, storage)
+    saves = []
+    original = first.save_checkpoint
+
+    def crash_on_second_batch(stats):
+        # The initial save and the first batch's save succeed; the second batch is stored,
+        # then the process dies before its checkpoint is written
+        if len(saves) == 2:
+            raise KeyboardInterrupt
+        saves.append(stats['rows_processed'])
+        original(stats)
+
+    monkeypatch.setattr(first, 'save_checkpoint', crash_on_second_batch)
+    with pytest.raises(KeyboardInterrupt):
+        first.import_file(roll)
+
+    stats = importer(tmp_path, storage).import_file(roll)
+
+    assert stats['completed']
+    assert stats['imported'] == 9
+    assert stats['reject_reasons'] == {'Voter already registered': 1}
+    with open(tmp_path / 'rejects.ndjson') as f:
+        assert [json.loads(line)['voter_id'] for line in f] == ['V5']
+
+
+def test_non_text_fields_are_rejected(tmp_path):
+    roll = str(tmp_path / 'roll.ndjson')
+    write_roll(roll, 2, extra=[{'voter_id': 'V9', 'name': 'Voter 9', 'email': 12345, 'phone': '0170',
+                                'password': 'Passw0rd!', 'national_id': 'NID9'}])
+
+    stats = importer(tmp_path, SQLiteVoterStorage(str(tmp_path / 'voters.db'))).import_file(roll)
+
+    assert stats['imported'] == 2
+    assert stats['reject_reasons'] == {'Fields must be text: email': 1}
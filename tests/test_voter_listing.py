@@ -0,0 +1,63 @@
+"""
+Voter Listing Tests
+Keyset pagination over the SQLite storage, including cursors that were not issued by it
+"""
+
+import base64
+import json
+
+import pytest
+
+from utils.voter_management import VoterManager, encode_cursor
+from utils.voter_storage import SQLiteVoterStorage
+
+
+@pytest.fixture
+def voter_manager(tmp_path):
+    manager = VoterManager(storage=SQLiteVoterStorage(str(tmp_path / 'voters.db')))
+    for i in range(5):
+        manager.register_voter({
+            'voter_id': f'V{i}',
+            'name': f'Voter {i}',
+            'email': f'voter{i}@example.org',
+            'phone': f'0170000000{i}',
+            'password': 'Passw0rd!',
+            'national_id': f'NID{i}'
+        })
+    manager.approve_voters(approve_all=True)
+    return manager
+
+
+def raw_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def test_cursor_pages_through_every_voter(voter_manager):
+    seen = []
+    cursor = None
+    while True:
+        page = voter_manager.list_voters(sort='voter_id', cursor=cursor, limit=2)
+        seen.extend(voter['voter_id'] for voter in page['voters'])
+        cursor = page['next_cursor']
+        if not page['has_more']:
+            break
+
+    assert seen == ['V0', 'V1', 'V2', 'V3', 'V4']
+
+
+@pytest.mark.parametrize('cursor', [
+    raw_cursor([1, {'a': 1}]),
+    raw_cursor([['x'], 'V1']),
+    raw_cursor(['2024-01-01', None]),
+    raw_cursor({'sort': 'V1'}),
+    raw_cursor(['V1']),
+    'not base64!',
+])
+def test_malformed_cursor_is_rejected(voter_manager, cursor):
+    with pytest.raises(ValueError):
+        voter_manager.list_voters(cursor=cursor)
+
+
+def test_issued_cursor_is_accepted(voter_manager):
+    page = voter_manager.list_voters(sort='name', cursor=encode_cursor(['Voter 2', 'V2']))
+    assert [voter['voter_id'] for voter in page['voters']] == ['V3', 'V4']
@@ -0,0 +1,31 @@
+"""
+Voter Search Tests
+The search index is built in the background from the searchable columns and follows later changes
+"""
+
+import pytest
+
+from utils.voter_management import VoterManager, build_voter_record
+from utils.voter_storage import MemoryVoterStorage, SQLiteVoterStorage
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def storage(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryVoterStorage()
+    return SQLiteVoterStorage(str(tmp_path / 'voters.db'))
+
+
+def test_background_index_matches_storage(storage):
+    storage.add_many([
+        build_voter_record({'voter_id': f'V{i}', 'name': name, 'email': f'{name.lower()}@example.org',
+                            'phone': '0170', 'national_id': f'NID{i}'}, 'hash', approved=True)
+        for i, name in enumerate(['Rahima Begum', 'Karim Uddin', 'Rahim Ali'])
+    ])
+    manager = VoterManager(storage=storage)
+    manager.start_search_index().join()
+
+    assert {r['voter_id'] for r in manager.search_voters('rahim')['results']} == {'V0', 'V2'}
+
+    manager.deactivate_voter('V2')
+    assert [r['voter_id'] for r in manager.search_voters('rahim', active_only=True)['results']] == ['V0']
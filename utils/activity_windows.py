@@ -0,0 +1,119 @@
+"""
+Activity Windows Module
+Per-user sliding-window counters on a monotonic clock, with idle-user eviction
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class UserWindows:
+    """Recent event times of one user"""
+
+    __slots__ = ('actions', 'failures', 'last_seen', 'rapid_flagged')
+
+    def __init__(self):
+        self.actions = deque()
+        self.failures = deque()
+        self.last_seen = 0.0
+        self.rapid_flagged = False
+
+
+class ActivityWindows:
+    """Raises anomalies as events arrive: action bursts and repeated failures per user"""
+
+    def __init__(self, action_window=60, max_actions=10, failure_window=900, max_failures=5,
+                 idle_timeout=3600, clock=time.monotonic):
+        self.action_window = action_window
+        self.max_actions = max_actions
+        self.failure_window = failure_window
+        self.max_failures = max_failures
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        # Least recently active first, so idle users are evicted from the front
+        self.users = OrderedDict()
+
+    def __len__(self):
+        return len(self.users)
+
+    def record(self, user_id, failed=False):
+        """Count one event for a user, returning the anomalies it triggers"""
+        now = self.clock()
+        anomalies = []
+
+        with self.lock:
+            windows = self.users.get(user_id)
+            if windows is None:
+                windows = self.users[user_id] = UserWindows()
+            else:
+                self.users.move_to_end(user_id)
+            windows.last_seen = now
+
+            # Each timestamp is appended and expired once: amortized O(1) per event
+            actions = windows.actions
+            actions.append(now)
+            while actions[0] <= now - self.action_window:
+                actions.popleft()
+
+            if len(actions) > self.max_actions:
+                # One anomaly per burst; re-armed once the window drains below the limit
+                if not windows.rapid_flagged:
+                    windows.rapid_flagged = True
+                    anomalies.append({
+                        'user_id': user_id,
+                        'type': 'rapid_actions',
+                        'count': len(actions),
+                        'window_seconds': self.action_window,
+                        'severity': 'high'
+                    })
+            else:
+                windows.rapid_flagged = False
+
+            failures = windows.failures
+            while failures and failures[0] <= now - self.failure_window:
+                failures.popleft()
+            if failed:
+                failures.append(now)
+                if len(failures) == self.max_failures:
+                    anomalies.append({
+                        'user_id': user_id,
+                        'type': 'repeated_failures',
+                        'count': len(failures),
+                        'window_seconds': self.failure_window,
+                        'severity': 'high'
+                    })
+
+            self.evict_idle(now)
+
+        return anomalies
+
+    def evict_idle(self, now):
+        """Forget users with no events for idle_timeout seconds"""
+        cutoff = now - self.idle_timeout
+        while self.users:
+            user_id, windows = next(iter(self.users.items()))
+            if windows.last_seen > cutoff:
+                break
+            del self.users[user_id]
+
+    def failure_count(self, user_id):
+        """Failures by a user within the failure window"""
+        now = self.clock()
+        with self.lock:
+            windows = self.users.get(user_id)
+            if windows is None:
+                return 0
+            return sum(1 for t in windows.failures if t > now - self.failure_window)
+
+    def active_bursts(self):
+        """Users currently over the action limit"""
+        now = self.clock()
+        with self.lock:
+            bursts = []
+            for user_id, windows in self.users.items():
+                count = sum(1 for t in windows.actions if t > now - self.action_window)
+                if count > self.max_actions:
+                    bursts.append({'user_id': user_id, 'count': count})
+            return bursts
@@ -0,0 +1,131 @@
+"""
+Aggregation Cube
+Incrementally maintained vote and registration counts over demographic dimensions
+"""
+
+import threading
+from collections import Counter
+from itertools import combinations
+
+from utils.vote_store import UNKNOWN
+
+VOTE_DIMENSIONS = ('region', 'age_group', 'gender', 'candidate', 'hour')
+REGISTRATION_DIMENSIONS = ('region', 'age_group', 'gender')
+
+
+class AggregationCube:
+    """Materializes every roll-up (cuboid) of a set of dimensions"""
+
+    def __init__(self, dimensions):
+        self.dimensions = tuple(dimensions)
+        self.lock = threading.Lock()
+        self.cuboids = {
+            dims: Counter()
+            for size in range(len(self.dimensions) + 1)
+            for dims in combinations(self.dimensions, size)
+        }
+
+    def add(self, cell, amount=1):
+        """Add to one cell and every roll-up containing it, O(2^dimensions)"""
+        values = {d: cell.get(d) or UNKNOWN for d in self.dimensions}
+
+        with self.lock:
+            for dims, cuboid in self.cuboids.items():
+                key = tuple(values[d] for d in dims)
+                cuboid[key] += amount
+                if cuboid[key] == 0:
+                    del cuboid[key]
+
+    def cuboid_for(self, dimensions):
+        """Get the cuboid covering exactly the given dimensions"""
+        dims = tuple(d for d in self.dimensions if d in dimensions)
+        return dims, self.cuboids[dims]
+
+    def query(self, group_by=(), filters=None):
+        """Get {group key tuple: count} for a slice, touching only one cuboid"""
+        filters = filters or {}
+        unknown = [d for d in list(group_by) + list(filters) if d not in self.dimensions]
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {', '.join(unknown)}")
+
+        dims, cuboid = self.cuboid_for(set(group_by) | set(filters))
+        positions = {d: i for i, d in enumerate(dims)}
+        filter_items = [(positions[d], value) for d, value in filters.items()]
+        group_positions = [positions[d] for d in group_by]
+
+        results = Counter()
+        with self.lock:
+            cells = list(cuboid.items())
+
+        for key, count in cells:
+            if all(key[i] == value for i, value in filter_items):
+                results[tuple(key[i] for i in group_positions)] += count
+
+        return results
+
+    def total(self, filters=None):
+        """Count everything in a slice"""
+        return sum(self.query((), filters).values())
+
+
+class ElectionCube:
+    """Vote cube plus a registered-voter cube used as turnout denominators"""
+
+    def __init__(self):
+        self.votes = AggregationCube(VOTE_DIMENSIONS)
+        self.registrations = AggregationCube(REGISTRATION_DIMENSIONS)
+
+    def record_vote(self, candidate_id, timestamp, demographics=None):
+        """Add a committed vote"""
+        cell = dict(demographics or {})
+        cell['candidate'] = candidate_id
+        cell['hour'] = timestamp.strftime('%Y-%m-%dT%H:00')
+        self.votes.add(cell)
+
+    def load_registrations(self, counts):
+        """Replace the registered voters with (demographics, count) pairs"""
+        registrations = AggregationCube(REGISTRATION_DIMENSIONS)
+        for demographics, count in counts:
+            registrations.add(demographics, count)
+        self.registrations = registrations
+
+    def slice(self, group_by=(), filters=None):
+        """Get vote counts, and turnout where the slice is purely demographic"""
+        group_by = tuple(group_by)
+        filters = filters or {}
+        vote_counts = self.votes.query(group_by, filters)
+
+        registration_filters = {d: v for d, v in filters.items() if d in REGISTRATION_DIMENSIONS}
+        registration_group = tuple(d for d in group_by if d in REGISTRATION_DIMENSIONS)
+        registered_counts = self.registrations.query(registration_group, registration_filters)
+        positions = [group_by.index(d) for d in registration_group]
+        demographic_only = all(d in REGISTRATION_DIMENSIONS for d in list(group_by) + list(filters))
+
+        # Cells with registered voters but no votes yet still have a turnout of zero
+        if demographic_only:
+            for key in registered_counts:
+                vote_counts.setdefault(key, 0)
+
+        rows = []
+        for key, votes in sorted(vote_counts.items(), key=lambda item: -item[1]):
+            row = dict(zip(group_by, key))
+            row['votes'] = votes
+
+            registered = registered_counts.get(tuple(key[i] for i in positions), 0)
+            row['registered'] = registered
+            if demographic_only:
+                row['turnout_percentage'] = round(votes / registered * 100, 2) if registered else None
+            rows.append(row)
+
+        return rows
+
+    def summary(self):
+        """Dashboard roll-ups by each demographic dimension and by candidate"""
+        return {
+            'by_region': self.slice(('region',)),
+            'by_age_group': self.slice(('age_group',)),
+            'by_gender': self.slice(('gender',)),
+            'by_region_and_candidate': self.slice(('region', 'candidate')),
+            'total_votes': self.votes.total(),
+            'total_registered': self.registrations.total()
+        }
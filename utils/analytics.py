@@ -5,34 +5,57 @@ Handles election analytics, statistics, and fraud detection
 
 from datetime import datetime, timedelta
 from collections import Counter
+import ipaddress
 import json
+import logging
+import threading
+
+from utils.time_buckets import TimeBucketCounter
+from utils.vote_store import ColumnarVoteStore
+from utils.projection import ProjectionEngine
+from utils.aggregation_cube import ElectionCube
+from utils.sketches import WindowedCountMin, HyperLogLogBank, DecayedCounts
+
+logger = logging.getLogger(__name__)
 
 class AnalyticsEngine:
     """Election analytics and data visualization"""
     
-    def __init__(self):
-        self.vote_records = []
-        self.temporal_data = []
+    def __init__(self, voter_manager=None):
+        self.vote_store = ColumnarVoteStore()
+        self.projection_engine = ProjectionEngine(self.vote_store)
+        self.cube = ElectionCube()
+        self.temporal_data = TimeBucketCounter()
+        
+        # Turnout denominators come from voter storage, reloaded whenever its change sequence
+        # moves, so approvals, deactivations and imports by other processes are all counted
+        self.voter_manager = voter_manager
+        self.registration_version = None
+        self.registration_lock = threading.Lock()
     
-    def record_vote(self, voter_id, candidate_id, timestamp):
+    def record_vote(self, voter_id, candidate_id, timestamp, demographics=None):
         """Record vote for analytics"""
-        self.vote_records.append({
-            'voter_id': voter_id,
-            'candidate_id': candidate_id,
-            'timestamp': timestamp.isoformat()
-        })
-        
-        self.temporal_data.append({
-            'timestamp': timestamp.isoformat(),
-            'hour': timestamp.hour,
-            'day': timestamp.day,
-            'month': timestamp.month
-        })
+        self.vote_store.append(voter_id, candidate_id, timestamp, demographics)
+        self.temporal_data.record(timestamp)
+        self.cube.record_vote(candidate_id, timestamp, demographics)
+    
+    def current_cube(self):
+        """Get the cube, reloading registered voters if storage changed since the last load"""
+        if self.voter_manager is not None:
+            with self.registration_lock:
+                # Version first: changes made while the counts are read are reloaded next time
+                version = self.voter_manager.storage.change_version()
+                if version != self.registration_version:
+                    self.cube.load_registrations(self.voter_manager.get_registration_counts())
+                    self.registration_version = version
+        return self.cube
     
     def calculate_results(self, blockchain):
         """Calculate final election results"""
-        votes = blockchain.get_all_votes()
-        
+        return self.tally_votes(blockchain.get_all_votes())
+    
+    def tally_votes(self, votes):
+        """Decrypt and count votes into ranked results"""
         # Decrypt and count votes
         from utils.security import decrypt_vote
         
@@ -64,45 +87,58 @@ class AnalyticsEngine:
         }
     
     def get_live_results(self, blockchain):
-        """Get real-time election results"""
-        return self.calculate_results(blockchain)
+        """Get real-time election results, stamped with the number of blocks they cover"""
+        # The chain only grows, so a fixed prefix is a consistent snapshot; clients skip
+        # tally events for blocks below block_height, which the snapshot already counts
+        height = len(blockchain.chain)
+        results = self.tally_votes([vote for block in blockchain.chain[1:height] for vote in block.votes])
+        results['block_height'] = height
+        return results
     
     def get_temporal_analysis(self):
         """Analyze voting patterns over time"""
-        hourly_votes = Counter()
-        daily_votes = Counter()
-        
-        for record in self.temporal_data:
-            hourly_votes[record['hour']] += 1
-            daily_votes[record['day']] += 1
+        hourly_votes = Counter(self.temporal_data.get_hour_of_day_distribution())
+        daily_votes = Counter(self.temporal_data.get_daily_distribution())
         
         return {
             'hourly_distribution': dict(hourly_votes),
             'daily_distribution': dict(daily_votes),
             'peak_hour': hourly_votes.most_common(1)[0] if hourly_votes else None,
-            'peak_day': daily_votes.most_common(1)[0] if daily_votes else None
+            'peak_day': daily_votes.most_common(1)[0] if daily_votes else None,
+            'votes_per_hour': self.temporal_data.get_votes_per_hour(),
+            'recent_votes_per_hour': self.temporal_data.get_recent_rate()
         }
     
-    def get_demographic_analysis(self, voter_demographics):
-        """Analyze voting patterns by demographics"""
-        age_groups = Counter()
-        gender_distribution = Counter()
-        regional_distribution = Counter()
-        
-        for voter_id, demographics in voter_demographics.items():
-            age_groups[demographics.get('age_group', 'unknown')] += 1
-            gender_distribution[demographics.get('gender', 'unknown')] += 1
-            regional_distribution[demographics.get('region', 'unknown')] += 1
-        
-        return {
-            'age_groups': dict(age_groups),
-            'gender_distribution': dict(gender_distribution),
-            'regional_distribution': dict(regional_distribution)
-        }
+    def get_time_series(self, resolution='hour', start=None, end=None):
+        """Get vote counts per minute, hour or day bucket"""
+        return [
+            {'bucket_start': bucket_start.isoformat(), 'count': count}
+            for bucket_start, count in self.temporal_data.series(resolution, start, end)
+        ]
+    
+    def get_candidate_time_series(self, resolution=3600, filters=None):
+        """Get per-candidate vote counts per time bucket"""
+        return self.vote_store.candidate_time_series(resolution, filters)
+    
+    def get_vote_breakdown(self, dimension, filters=None):
+        """Get vote counts by region, age group, gender or candidate"""
+        return self.vote_store.breakdown(dimension, filters)
+    
+    def get_crosstab(self, row_dimension, column_dimension, filters=None):
+        """Cross-tabulate votes over two dimensions"""
+        return self.vote_store.crosstab(row_dimension, column_dimension, filters)
+    
+    def get_demographic_analysis(self):
+        """Analyze votes and turnout by demographics"""
+        return self.current_cube().summary()
+    
+    def get_cube_slice(self, group_by=(), filters=None):
+        """Get vote counts and turnout for any slice or roll-up of the cube"""
+        return self.current_cube().slice(group_by, filters)
     
     def get_turnout_statistics(self, total_registered_voters):
         """Calculate voter turnout statistics"""
-        total_votes = len(self.vote_records)
+        total_votes = len(self.vote_store)
         turnout_percentage = (total_votes / total_registered_voters * 100) if total_registered_voters > 0 else 0
         
         return {
@@ -120,8 +156,9 @@ class AnalyticsEngine:
         return {
             'election_results': results,
             'temporal_analysis': temporal,
-            'total_votes': len(self.vote_records),
-            'votes_per_hour': len(self.vote_records) / 24 if self.vote_records else 0
+            'demographic_analysis': self.get_demographic_analysis(),
+            'total_votes': len(self.vote_store),
+            'votes_per_hour': temporal['votes_per_hour']
         }
     
     def generate_election_report(self, blockchain, voter_manager):
@@ -145,84 +182,88 @@ class AnalyticsEngine:
         """Export analytics data"""
         if format == 'json':
             return json.dumps({
-                'vote_records': self.vote_records,
-                'temporal_data': self.temporal_data
+                'vote_records': self.vote_store.to_records(),
+                'temporal_data': self.temporal_data.to_dict()
             }, indent=4)
         
         return None
     
-    def predict_final_results(self, current_results, total_expected_voters, confidence_interval=0.95):
-        """Predict final election results based on current data"""
-        total_votes = current_results['total_votes']
-        
-        if total_votes < 100:  # Need minimum sample size
-            return {'error': 'Insufficient data for prediction'}
-        
-        predictions = []
-        
-        for candidate in current_results['results']:
-            current_percentage = candidate['percentage']
-            
-            # Simple prediction with margin of error
-            # In production, use more sophisticated statistical methods
-            margin_of_error = 5  # Simplified
-            
-            predictions.append({
-                'candidate_id': candidate['candidate_id'],
-                'predicted_percentage': current_percentage,
-                'margin_of_error': margin_of_error,
-                'confidence_interval': confidence_interval
-            })
-        
-        return {
-            'predictions': predictions,
-            'sample_size': total_votes,
-            'total_expected': total_expected_voters
-        }
+    def predict_final_results(self, blockchain, total_expected_voters, confidence_interval=0.95,
+                              method='analytic', registered_by_region=None):
+        """Project final election results with stratified confidence intervals"""
+        return self.projection_engine.project(
+            blockchain.get_latest_block().hash,
+            total_expected_voters,
+            confidence_interval,
+            method=method,
+            registered_by_region=registered_by_region
+        )
 
 
 class FraudDetector:
     """AI-based fraud detection system"""
     
-    def __init__(self):
+    def __init__(self, block_table=None, max_votes_per_ip=5, max_voters_per_subnet=200, rapid_seconds=10,
+                 count_window=3600):
         self.suspicious_activities = []
-        self.ip_tracking = {}
-        self.voting_patterns = {}
+        # Fixed-memory sketches instead of per-IP and per-voter dicts, so a flood of spoofed IPs
+        # cannot grow memory. See utils/sketches.py for their error bounds. IP and voter counts are
+        # kept apart and only cover the last one to two count_windows, so their overcount stays small.
+        # The IP sketch keeps its bound under max_votes_per_ip for about a million votes per window;
+        # beyond that the IP rule is suspended rather than flagging every address
+        self.ip_votes = WindowedCountMin(width=2 ** 19, window=count_window)
+        self.voter_attempts = WindowedCountMin(window=count_window)
+        self.subnet_voters = HyperLogLogBank()
+        # Exact per-voter decayed counts: sketch collisions would flag distinct voters as repeats
+        self.recent_attempts = DecayedCounts(half_life=rapid_seconds)
+        self.max_votes_per_ip = max_votes_per_ip
+        self.max_voters_per_subnet = max_voters_per_subnet
+        # A previous attempt under rapid_seconds ago leaves more than this much decayed weight
+        self.rapid_threshold = self.recent_attempts.weight_after(rapid_seconds)
+        self.ip_rule_suspended = False
         self.blocked_entities = set()
+        # Optional SharedTable or RemoteTable so blocks apply in every worker process
+        self.block_table = block_table
     
     def detect_suspicious_activity(self, voter_id, ip_address):
         """Detect potential fraudulent activities"""
         suspicious = False
         reasons = []
         
-        # Check for multiple votes from same IP
-        if ip_address in self.ip_tracking:
-            self.ip_tracking[ip_address] += 1
-            
-            if self.ip_tracking[ip_address] > 5:
-                suspicious = True
-                reasons.append('Multiple votes from same IP address')
-        else:
-            self.ip_tracking[ip_address] = 1
-        
-        # Check voting pattern anomalies
-        if voter_id in self.voting_patterns:
-            last_attempt = self.voting_patterns[voter_id][-1]
-            time_diff = (datetime.now() - datetime.fromisoformat(last_attempt)).seconds
-            
-            if time_diff < 10:  # Less than 10 seconds between attempts
-                suspicious = True
-                reasons.append('Rapid successive voting attempts')
-        else:
-            self.voting_patterns[voter_id] = []
+        # Check for multiple votes from same IP (Count-Min: may overcount, never undercounts)
+        ip_votes = self.ip_votes.add(f'ip:{ip_address}')
+        if self.ip_counts_reliable() and ip_votes > self.max_votes_per_ip:
+            suspicious = True
+            reasons.append('Multiple votes from same IP address')
+        
+        # Count distinct voters behind each /24 or /64 subnet (HyperLogLog estimate). Campus,
+        # carrier-grade NAT and polling-station networks legitimately put many voters behind
+        # one subnet, so this only feeds the fraud report and risk score and never blocks
+        self.subnet_voters.add(subnet_of(ip_address), voter_id)
         
-        self.voting_patterns[voter_id].append(datetime.now().isoformat())
+        # Check voting pattern anomalies: decayed weight of this voter's earlier attempts
+        self.voter_attempts.add(f'voter:{voter_id}')
+        if self.recent_attempts.add(voter_id) > self.rapid_threshold:
+            suspicious = True
+            reasons.append('Rapid successive voting attempts')
         
         if suspicious:
             self.log_suspicious_activity(voter_id, ip_address, reasons)
         
         return suspicious
     
+    def ip_counts_reliable(self):
+        """Check that IP vote estimates cannot overcount by the limit, logging when that changes"""
+        reliable = self.ip_votes.error_bound()[0] < self.max_votes_per_ip
+        if reliable == self.ip_rule_suspended:
+            self.ip_rule_suspended = not reliable
+            if reliable:
+                logger.warning('IP vote counts are precise again, resuming the per-IP vote limit')
+            else:
+                logger.warning('Vote volume exceeds what the IP sketch counts precisely, '
+                               'suspending the per-IP vote limit')
+        return reliable
+    
     def log_suspicious_activity(self, voter_id, ip_address, reasons):
         """Log suspicious activities"""
         activity = {
@@ -312,27 +353,68 @@ class FraudDetector:
             'total_incidents': len(self.suspicious_activities),
             'blocked_entities': list(self.blocked_entities),
             'high_severity_count': sum(1 for a in self.suspicious_activities if a['severity'] == 'high'),
+            'busy_subnets': self.get_busy_subnets(),
+            'sketches': self.get_sketch_stats(),
             'generated_at': datetime.now().isoformat()
         }
     
+    def get_busy_subnets(self):
+        """Get subnets with more estimated distinct voters than max_voters_per_subnet"""
+        return {
+            subnet: count for subnet, count in self.subnet_voters.counts().items()
+            if count > self.max_voters_per_subnet
+        }
+    
+    def get_sketch_stats(self):
+        """Memory and current error bounds of the tracking sketches"""
+        overcount, probability = self.ip_votes.error_bound()
+        return {
+            'memory_bytes': (self.ip_votes.memory_bytes() + self.voter_attempts.memory_bytes()
+                             + self.subnet_voters.memory_bytes() + self.recent_attempts.memory_bytes()),
+            'count_overestimate_bound': round(overcount, 2),
+            'count_bound_failure_probability': round(probability, 4),
+            'ip_rule_suspended': self.ip_rule_suspended,
+            'recent_voters_tracked': len(self.recent_attempts),
+            'distinct_voters_standard_error': round(self.subnet_voters.standard_error(), 4)
+        }
+    
     def block_entity(self, entity_id):
         """Block suspicious entity"""
         self.blocked_entities.add(entity_id)
+        if self.block_table is not None:
+            try:
+                self.block_table.block(f'block:{entity_id}')
+            except (OSError, ValueError) as e:
+                logger.warning('Could not share block of %s: %s', entity_id, e)
     
     def is_blocked(self, entity_id):
         """Check if entity is blocked"""
+        if self.block_table is not None:
+            try:
+                return self.block_table.is_blocked(f'block:{entity_id}')
+            except (OSError, ValueError) as e:
+                # Fall back to the blocks this process made itself
+                logger.warning('Could not check shared block of %s: %s', entity_id, e)
         return entity_id in self.blocked_entities
     
     def calculate_fraud_risk_score(self, voter_id, ip_address, voting_history):
         """Calculate fraud risk score for a vote"""
         risk_score = 0
         
-        # Check IP reputation
-        if ip_address in self.ip_tracking and self.ip_tracking[ip_address] > 3:
+        ip_votes = self.ip_votes.estimate(f'ip:{ip_address}')
+        voter_attempts = self.voter_attempts.estimate(f'voter:{voter_id}')
+        subnet_voters = self.subnet_voters.count(subnet_of(ip_address))
+        
+        # Check IP reputation, unless collisions alone could account for the count
+        if ip_votes > 3 and self.ip_votes.error_bound()[0] < 3:
             risk_score += 30
         
+        # Check for an unusually busy subnet
+        if subnet_voters > self.max_voters_per_subnet:
+            risk_score += 20
+        
         # Check voter history
-        if voter_id in self.voting_patterns and len(self.voting_patterns[voter_id]) > 1:
+        if voter_attempts > 1 and self.voter_attempts.error_bound()[0] < 1:
             risk_score += 20
         
         # Check against suspicious activities
@@ -352,8 +434,21 @@ class FraudDetector:
             'risk_score': risk_score,
             'risk_level': risk_level,
             'factors': {
-                'ip_reputation': ip_address in self.ip_tracking,
-                'voting_history': len(self.voting_patterns.get(voter_id, [])),
+                'ip_reputation': ip_votes > 0,
+                'voting_history': voter_attempts,
+                'subnet_voters': subnet_voters,
                 'past_incidents': len(voter_incidents)
             }
         }
+
+
+def subnet_of(ip_address):
+    """Group IPv4 addresses by /24 and IPv6 addresses by /64"""
+    if ip_address and ip_address.count('.') == 3:
+        return ip_address.rpartition('.')[0] + '.0/24'
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return str(ip_address)
+    prefix = 24 if address.version == 4 else 64
+    return str(ipaddress.ip_network(f'{address}/{prefix}', strict=False))
@@ -0,0 +1,89 @@
+"""
+Credential Pool Module
+Bounded worker pool for password verification, with backpressure and transparent hash upgrades
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.security import verify_password, hash_password, password_needs_rehash
+
+
+class CredentialQueueFull(Exception):
+    """Raised when too many verifications are already queued"""
+
+
+class CredentialVerifier:
+    """Runs password checks on worker threads instead of request threads"""
+
+    def __init__(self, max_workers=4, max_queue=64):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='credential-verifier')
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        self.depth = 0
+        self.stats = {'verified': 0, 'rejected': 0, 'overloaded': 0, 'rehashed': 0}
+        self.total_wait = 0.0
+        self.total_work = 0.0
+
+    def check(self, password, hashed_password, enqueued_at):
+        """Worker task: verify, and rehash with current parameters when due"""
+        started = time.perf_counter()
+        try:
+            ok = verify_password(password, hashed_password)
+            new_hash = hash_password(password) if ok and password_needs_rehash(hashed_password) else None
+        finally:
+            # A malformed hash raises; the slot must still be freed or the queue fills up for good
+            with self.lock:
+                self.depth -= 1
+        finished = time.perf_counter()
+
+        with self.lock:
+            self.stats['verified' if ok else 'rejected'] += 1
+            if new_hash:
+                self.stats['rehashed'] += 1
+            self.total_wait += started - enqueued_at
+            self.total_work += finished - started
+        return ok, new_hash
+
+    def submit(self, password, hashed_password):
+        """Queue a verification, raising CredentialQueueFull instead of waiting when saturated"""
+        with self.lock:
+            if self.depth >= self.max_queue:
+                self.stats['overloaded'] += 1
+                raise CredentialQueueFull(f'{self.depth} credential checks already queued')
+            self.depth += 1
+
+        try:
+            return self.executor.submit(self.check, password, hashed_password, time.perf_counter())
+        except RuntimeError:
+            with self.lock:
+                self.depth -= 1
+            raise
+
+    def verify(self, password, hashed_password, timeout=None):
+        """Verify on the pool and wait, returning (ok, upgraded hash or None)"""
+        return self.submit(password, hashed_password).result(timeout)
+
+    @property
+    def queue_depth(self):
+        """Verifications submitted and not yet finished, including running ones"""
+        return self.depth
+
+    def get_stats(self):
+        """Get queue depth, outcome counters and mean wait and work times"""
+        with self.lock:
+            completed = self.stats['verified'] + self.stats['rejected']
+            return dict(
+                self.stats,
+                queue_depth=self.depth,
+                max_queue=self.max_queue,
+                workers=self.max_workers,
+                avg_wait_ms=round(self.total_wait / completed * 1000, 2) if completed else 0.0,
+                avg_work_ms=round(self.total_work / completed * 1000, 2) if completed else 0.0
+            )
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,254 @@
+"""
+Key Manager Module
+Persistent, rotatable master keys and per-election data keys for envelope encryption of votes
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+from cryptography.hazmat.primitives import serialization
+
+try:
+    import fcntl
+except ImportError:  # Windows: keystore writes are only serialized within one process
+    fcntl = None
+
+# Ciphertext layout: env1:<election id>:<Fernet token under that election's data key>
+ENVELOPE_PREFIX = 'env1:'
+
+
+class KeyManager:
+    """Master keys in a local keystore file wrap one data key per election; data keys encrypt votes"""
+
+    def __init__(self, keystore_path='keys/vote_keys.json'):
+        self.keystore_path = keystore_path
+        self.lock = threading.Lock()
+        # Unwrapped data keys; valid for the life of the process since data keys never change
+        self.data_keys = {}
+        self.master = None
+        self.master_ids = []
+        self.load()
+
+    @contextmanager
+    def file_lock(self):
+        """Serialize keystore writes across worker processes"""
+        os.makedirs(os.path.dirname(self.keystore_path) or '.', exist_ok=True)
+        with open(self.keystore_path + '.lock', 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_keystore(self):
+        if not os.path.exists(self.keystore_path):
+            return None
+        with open(self.keystore_path) as f:
+            return json.load(f)
+
+    def write_keystore(self, keystore):
+        """Replace the keystore atomically, readable by the owner only"""
+        tmp_path = f'{self.keystore_path}.{os.getpid()}.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(keystore, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.keystore_path)
+
+    def use_master_keys(self, keystore):
+        # Newest key first: MultiFernet encrypts with it and decrypts with any
+        self.master_ids = [key['id'] for key in keystore['master_keys']]
+        self.master = MultiFernet([Fernet(key['key'].encode()) for key in keystore['master_keys']])
+
+    def load(self):
+        """Load the keystore, creating it with a first master key if missing"""
+        keystore = self.read_keystore()
+        if keystore is None:
+            with self.file_lock():
+                return self.load_locked()
+        self.use_master_keys(keystore)
+        return keystore
+
+    def load_locked(self):
+        """Load the keystore while holding the file lock, creating it if missing"""
+        keystore = self.read_keystore()
+        if keystore is None:
+            keystore = {'master_keys': [new_master_key(1)], 'data_keys': {}}
+            self.write_keystore(keystore)
+        self.use_master_keys(keystore)
+        return keystore
+
+    def data_key(self, election_id):
+        """Get an election's data key, unwrapping or creating it on first use in this process"""
+        fernet = self.data_keys.get(election_id)
+        if fernet is not None:
+            return fernet
+
+        with self.lock:
+            fernet = self.data_keys.get(election_id)
+            if fernet is not None:
+                return fernet
+
+            # Another worker may have created the key or rotated the master keys since we loaded
+            keystore = self.load()
+            wrapped = keystore['data_keys'].get(election_id)
+            if wrapped is None:
+                with self.file_lock():
+                    keystore = self.load_locked()
+                    wrapped = keystore['data_keys'].get(election_id)
+                    if wrapped is None:
+                        wrapped = self.master.encrypt(Fernet.generate_key()).decode()
+                        keystore['data_keys'][election_id] = wrapped
+                        self.write_keystore(keystore)
+
+            return self.unwrap(election_id, wrapped)
+
+    def existing_data_key(self, election_id):
+        """Get an election's data key without creating one, raising ValueError if it has none"""
+        fernet = self.data_keys.get(election_id)
+        if fernet is not None:
+            return fernet
+
+        with self.lock:
+            fernet = self.data_keys.get(election_id)
+            if fernet is not None:
+                return fernet
+
+            keystore = self.read_keystore()
+            wrapped = keystore['data_keys'].get(election_id) if keystore else None
+            if wrapped is None:
+                raise ValueError(f'No data key for election {election_id!r}')
+            self.use_master_keys(keystore)
+            return self.unwrap(election_id, wrapped)
+
+    def unwrap(self, election_id, wrapped):
+        """Decrypt a wrapped data key and cache it; the caller holds the lock"""
+        fernet = Fernet(self.master.decrypt(wrapped.encode()))
+        self.data_keys[election_id] = fernet
+        return fernet
+
+    def encrypt(self, plaintext, election_id):
+        """Encrypt bytes under the election's data key"""
+        election_id = election_id or 'default'
+        token = self.data_key(election_id).encrypt(plaintext)
+        return f'{ENVELOPE_PREFIX}{election_id}:{token.decode()}'
+
+    def decrypt(self, envelope):
+        """Decrypt an envelope from encrypt, raising ValueError if it is malformed or forged"""
+        if not envelope.startswith(ENVELOPE_PREFIX):
+            raise ValueError('Unknown ciphertext format')
+        election_id, _, token = envelope[len(ENVELOPE_PREFIX):].rpartition(':')
+        try:
+            return self.existing_data_key(election_id).decrypt(token.encode())
+        except InvalidToken:
+            raise ValueError('Ciphertext does not match its data key')
+
+    def rotate(self):
+        """Add a new master key and rewrap every data key with it; vote ciphertexts are untouched"""
+        with self.lock, self.file_lock():
+            keystore = self.load_locked()
+            number = max(int(key['id'][1:]) for key in keystore['master_keys']) + 1
+            keystore['master_keys'].insert(0, new_master_key(number))
+            self.use_master_keys(keystore)
+            keystore['data_keys'] = {
+                election_id: self.master.rotate(wrapped.encode()).decode()
+                for election_id, wrapped in keystore['data_keys'].items()
+            }
+            self.write_keystore(keystore)
+            return self.master_ids[0]
+
+    def retire_old_keys(self, keep=1):
+        """Drop all but the newest master keys; only safe after rotate has rewrapped everything"""
+        with self.lock, self.file_lock():
+            keystore = self.load_locked()
+            keystore['master_keys'] = keystore['master_keys'][:keep]
+            self.write_keystore(keystore)
+            self.use_master_keys(keystore)
+
+    def get_stats(self):
+        return {
+            'keystore': self.keystore_path,
+            'master_keys': self.master_ids,
+            'cached_data_keys': len(self.data_keys)
+        }
+
+
+def new_master_key(number):
+    return {
+        'id': f'k{number}',
+        'key': Fernet.generate_key().decode(),
+        'created': datetime.now().isoformat()
+    }
+
+
+def load_or_create_private_key(key_path, generate):
+    """Load a PEM private key, or generate one with generate() and persist it on first run"""
+    if os.path.exists(key_path):
+        return read_private_key(key_path)
+
+    private_key = generate()
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+    key_dir = os.path.dirname(key_path) or '.'
+    os.makedirs(key_dir, exist_ok=True)
+    # Write the whole key to a private temp file first, then publish it with a hard link,
+    # which fails if the name exists: readers never see a partial PEM, and if another
+    # worker published a key first, theirs is used
+    fd, tmp_path = tempfile.mkstemp(dir=key_dir, prefix='.key-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pem)
+            f.flush()
+            os.fsync(f.fileno())
+        os.link(tmp_path, key_path)
+    except FileExistsError:
+        return read_private_key(key_path)
+    finally:
+        os.unlink(tmp_path)
+    write_fingerprint(key_path, pem)
+    return private_key
+
+
+def fingerprint_path(key_path):
+    return key_path + '.sha256'
+
+
+def write_fingerprint(key_path, pem):
+    """Record the digest of a key we generated, marking it safe to load without validation"""
+    tmp_path = f'{fingerprint_path(key_path)}.{os.getpid()}.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(hashlib.sha256(pem).hexdigest())
+    os.replace(tmp_path, fingerprint_path(key_path))
+
+
+def generated_here(key_path, pem):
+    """Check whether a PEM is the one write_fingerprint recorded for this path"""
+    try:
+        with open(fingerprint_path(key_path)) as f:
+            return f.read().strip() == hashlib.sha256(pem).hexdigest()
+    except OSError:
+        return False
+
+
+def read_private_key(key_path):
+    """Load a PEM private key, validating it unless we generated it ourselves"""
+    with open(key_path, 'rb') as f:
+        pem = f.read()
+    # The RSA consistency checks take ~100 ms for a 2048-bit key and are only worth skipping
+    # for keys load_or_create_private_key built; a supplied or replaced key is always checked.
+    # Ignored for non-RSA keys
+    return serialization.load_pem_private_key(pem, password=None,
+                                              unsafe_skip_rsa_key_validation=generated_here(key_path, pem))
@@ -0,0 +1,147 @@
+"""
+Live Updates Module
+Fans out tally deltas and new-block events to Server-Sent Events subscribers
+"""
+
+import json
+import threading
+from collections import Counter, deque
+from datetime import datetime
+
+
+class EventBroadcaster:
+    """Single publisher, many subscribers event channel with resumable cursors"""
+
+    def __init__(self, history_size=1000, keepalive_interval=15):
+        self.history = deque(maxlen=history_size)
+        self.keepalive_interval = keepalive_interval
+        self.last_event_id = 0
+        self.condition = threading.Condition()
+        self.subscriber_count = 0
+
+    def publish(self, event_type, data):
+        """Publish an event to every subscriber"""
+        with self.condition:
+            self.last_event_id += 1
+            event_id = self.last_event_id
+            self.history.append({
+                'id': event_id,
+                'event': event_type,
+                'data': data,
+                'timestamp': datetime.now().isoformat()
+            })
+            self.condition.notify_all()
+
+        return event_id
+
+    def events_since(self, cursor):
+        """Get buffered events after a cursor, or None if the cursor was evicted"""
+        if not self.history or cursor >= self.last_event_id:
+            return []
+
+        oldest_id = self.history[0]['id']
+        if cursor < oldest_id - 1:
+            return None
+
+        # Event IDs are contiguous, so the offset into the buffer is direct
+        return list(self.history)[cursor - oldest_id + 1:]
+
+    def subscribe(self, cursor=None):
+        """Yield Server-Sent Events frames, resuming after the given cursor"""
+        with self.condition:
+            self.subscriber_count += 1
+            if cursor is None or cursor > self.last_event_id:
+                cursor = self.last_event_id
+
+        try:
+            yield self.format_event('hello', {'cursor': cursor}, cursor)
+
+            while True:
+                with self.condition:
+                    events = self.events_since(cursor)
+                    if events == []:
+                        self.condition.wait(self.keepalive_interval)
+                        events = self.events_since(cursor)
+
+                if events is None:
+                    # Subscriber fell behind the buffer, client must refetch a snapshot
+                    with self.condition:
+                        cursor = self.last_event_id
+                    yield self.format_event('resync', {'cursor': cursor}, cursor)
+                elif not events:
+                    yield ': keepalive\n\n'
+                else:
+                    for event in events:
+                        cursor = event['id']
+                        yield self.format_event(event['event'], event['data'], cursor)
+        finally:
+            with self.condition:
+                self.subscriber_count -= 1
+
+    def format_event(self, event_type, data, event_id):
+        """Format a single Server-Sent Events frame"""
+        return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+    def get_stats(self):
+        """Get broadcaster statistics"""
+        return {
+            'subscribers': self.subscriber_count,
+            'last_event_id': self.last_event_id,
+            'buffered_events': len(self.history)
+        }
+
+
+class TallyCoalescer:
+    """Sums per-vote tally deltas and publishes them once per interval
+
+    Subscribers are unauthenticated, so a delta per vote would tie each vote's candidate to
+    the moment it was cast; a summed delta only says how an interval's votes split.
+    """
+
+    def __init__(self, broadcaster, interval=1.0):
+        self.broadcaster = broadcaster
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.deltas = Counter()
+        self.first_block_index = None
+        self.block_index = None
+        self.stop_event = threading.Event()
+        self.flusher = threading.Thread(target=self.run_flusher, name='tally-coalescer', daemon=True)
+        self.flusher.start()
+
+    def add(self, candidate_id, block_index):
+        """Count one vote towards the next tally event"""
+        with self.lock:
+            self.deltas[candidate_id] += 1
+            # Concurrent votes can reach here out of block order, so keep the range they span
+            if self.first_block_index is None:
+                self.first_block_index = self.block_index = block_index
+            self.first_block_index = min(self.first_block_index, block_index)
+            self.block_index = max(self.block_index, block_index)
+
+    def run_flusher(self):
+        while not self.stop_event.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Publish the votes counted since the last flush as one tally event"""
+        # Published under the lock so consecutive events keep their block order
+        with self.lock:
+            if not self.deltas:
+                return None
+            event_id = self.broadcaster.publish('tally', {
+                'deltas': dict(self.deltas),
+                'total_votes_delta': sum(self.deltas.values()),
+                'first_block_index': self.first_block_index,
+                'block_index': self.block_index
+            })
+            self.deltas = Counter()
+            self.first_block_index = None
+            self.block_index = None
+            return event_id
+
+    def close(self):
+        """Stop the flusher thread after publishing anything still pending"""
+        self.stop_event.set()
+        self.flusher.join()
@@ -0,0 +1,247 @@
+"""
+Projection Engine
+Stratified, vectorized projections of final results with real confidence intervals
+"""
+
+import threading
+from datetime import datetime
+from statistics import NormalDist
+
+import numpy as np
+
+MIN_SAMPLE_SIZE = 100
+
+# Half-width (percentage points) below which a projection is reported as converged
+CONVERGENCE_THRESHOLD = 1.0
+
+# Bootstrap strata cap: time buckets are merged until region x time fits under it
+MAX_BOOTSTRAP_STRATA = 256
+
+# Replicates are drawn in blocks of at most this many (replicate, stratum, candidate) cells
+BOOTSTRAP_BLOCK_CELLS = 1 << 20
+
+
+class ProjectionEngine:
+    """Projects final vote shares from a ColumnarVoteStore, cached per vote count"""
+
+    def __init__(self, vote_store, bootstrap_samples=2000, time_resolution=3600, seed=None):
+        self.vote_store = vote_store
+        self.bootstrap_samples = bootstrap_samples
+        self.time_resolution = time_resolution
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.latest_estimates = (0, None)
+        self.previous_estimates = None
+
+    def stratum_table(self, views, stratify_by, max_strata=None):
+        """Get a (strata x candidates) count matrix and each stratum's region code"""
+        candidates = views['candidate'].astype(np.int64)
+        size = len(candidates)
+        num_candidates = len(self.vote_store.codebooks['candidate'])
+
+        strata = np.zeros(size, dtype=np.int64)
+        num_strata = 1
+        regions = None
+
+        if 'region' in stratify_by:
+            regions = views['region'].astype(np.int64)
+            strata = regions
+            num_strata = len(self.vote_store.codebooks['region'])
+
+        if 'time' in stratify_by and size:
+            buckets = views['timestamp'] // self.time_resolution
+            buckets = buckets - buckets.min()
+            num_buckets = int(buckets.max()) + 1
+            if max_strata and num_strata * num_buckets > max_strata:
+                # Merge adjacent time buckets so the strata stay under the cap
+                merge = -(-num_buckets // max(1, max_strata // num_strata))
+                buckets = buckets // merge
+                num_buckets = int(buckets.max()) + 1
+            strata = strata * num_buckets + buckets
+            num_strata *= num_buckets
+
+        table = np.bincount(
+            strata * num_candidates + candidates,
+            minlength=num_strata * num_candidates
+        ).reshape(num_strata, num_candidates)
+
+        # Region of each stratum, for reweighting against registered voters
+        stratum_regions = np.arange(num_strata)
+        if regions is not None and 'time' in stratify_by and size:
+            stratum_regions = stratum_regions // num_buckets
+
+        populated = table.sum(axis=1) > 0
+        return table[populated], stratum_regions[populated]
+
+    def stratum_weights(self, table, stratum_regions, stratify_by, registered_by_region):
+        """Weight strata by registered voters per region, else by observed share"""
+        observed = table.sum(axis=1).astype(np.float64)
+
+        if not registered_by_region or 'region' not in stratify_by:
+            return observed / observed.sum()
+
+        codebook = self.vote_store.codebooks['region']
+        registered = np.array([
+            registered_by_region.get(codebook.decode(code), 0) for code in stratum_regions
+        ], dtype=np.float64)
+
+        # Split each region's weight across its time strata by observed volume
+        region_observed = np.bincount(stratum_regions, weights=observed)
+        within_region = observed / region_observed[stratum_regions]
+        weights = registered * within_region
+
+        if weights.sum() == 0:
+            return observed / observed.sum()
+        return weights / weights.sum()
+
+    def analytic_intervals(self, table, weights, z, total_expected):
+        """Stratified multinomial normal-approximation intervals"""
+        n = table.sum(axis=1, keepdims=True).astype(np.float64)
+        shares = table / n
+        estimates = weights @ shares
+
+        # Finite population correction, since the electorate is finite and known
+        fpc = 1.0
+        if total_expected and total_expected > 0:
+            fpc = max(0.0, 1 - n.sum() / total_expected)
+
+        variance = (weights[:, None] ** 2 * shares * (1 - shares) / n).sum(axis=0) * fpc
+        standard_errors = np.sqrt(variance)
+
+        return estimates, estimates - z * standard_errors, estimates + z * standard_errors, standard_errors
+
+    def bootstrap_intervals(self, table, weights, confidence, total_expected):
+        """Vectorized stratified multinomial bootstrap"""
+        n = table.sum(axis=1)
+        shares = table / n[:, None]
+        samples = self.bootstrap_samples
+
+        # One multinomial draw per (replicate, stratum), a block of replicates at a time so
+        # memory stays at BOOTSTRAP_BLOCK_CELLS however many strata and candidates there are
+        block = max(1, BOOTSTRAP_BLOCK_CELLS // table.size)
+        replicate_estimates = np.empty((samples, table.shape[1]))
+        for start in range(0, samples, block):
+            count = min(block, samples - start)
+            resampled = self.rng.multinomial(n, shares, size=(count, len(n)))
+            replicate_estimates[start:start + count] = np.einsum(
+                's,bsc->bc', weights, resampled / n[None, :, None])
+
+        if total_expected and total_expected > 0:
+            fpc = max(0.0, 1 - n.sum() / total_expected)
+            estimates = weights @ shares
+            replicate_estimates = estimates + (replicate_estimates - estimates) * np.sqrt(fpc)
+
+        alpha = (1 - confidence) / 2
+        lower, upper = np.quantile(replicate_estimates, [alpha, 1 - alpha], axis=0)
+        standard_errors = replicate_estimates.std(axis=0, ddof=1)
+
+        leaders = np.argmax(replicate_estimates, axis=1)
+        win_probability = np.bincount(leaders, minlength=table.shape[1]) / samples
+
+        return replicate_estimates.mean(axis=0), lower, upper, standard_errors, win_probability
+
+    def project(self, tip, total_expected_voters, confidence_interval=0.95, method='analytic',
+                stratify_by=('region', 'time'), registered_by_region=None):
+        """Project final results, reusing the cached projection for the same votes"""
+        # One snapshot cut under the store lock is both the data and the cache key: the chain
+        # tip moves before the store is appended to, so it cannot identify what was projected
+        views = self.vote_store.snapshot('candidate', 'region', 'timestamp')
+        sample_size = len(views['candidate'])
+        stratify_by = tuple(stratify_by)
+        cache_key = (sample_size, total_expected_voters, confidence_interval, method, stratify_by,
+                     tuple(sorted((registered_by_region or {}).items())))
+
+        with self.lock:
+            if cache_key in self.cache:
+                return self.cache[cache_key]
+
+        if sample_size < MIN_SAMPLE_SIZE:
+            return {'error': 'Insufficient data for prediction'}
+
+        max_strata = MAX_BOOTSTRAP_STRATA if method == 'bootstrap' else None
+        table, stratum_regions = self.stratum_table(views, stratify_by, max_strata)
+        weights = self.stratum_weights(table, stratum_regions, stratify_by, registered_by_region)
+        z = NormalDist().inv_cdf(0.5 + confidence_interval / 2)
+
+        if method == 'bootstrap':
+            estimates, lower, upper, standard_errors, win_probability = self.bootstrap_intervals(
+                table, weights, confidence_interval, total_expected_voters
+            )
+            # Monte Carlo error of the bootstrap mean shrinks with more replicates
+            mc_error = standard_errors / np.sqrt(self.bootstrap_samples)
+        else:
+            estimates, lower, upper, standard_errors = self.analytic_intervals(
+                table, weights, z, total_expected_voters
+            )
+            win_probability = None
+            mc_error = None
+
+        lower = np.clip(lower, 0, 1)
+        upper = np.clip(upper, 0, 1)
+        half_widths = (upper - lower) / 2 * 100
+
+        codebook = self.vote_store.codebooks['candidate']
+        order = np.argsort(-estimates)
+        predictions = []
+        for code in order:
+            if not table[:, code].any():
+                continue
+            prediction = {
+                'candidate_id': codebook.decode(int(code)),
+                'predicted_percentage': round(float(estimates[code]) * 100, 2),
+                'lower_bound': round(float(lower[code]) * 100, 2),
+                'upper_bound': round(float(upper[code]) * 100, 2),
+                'margin_of_error': round(float(half_widths[code]), 2),
+                'standard_error': round(float(standard_errors[code]) * 100, 4),
+                'confidence_interval': confidence_interval
+            }
+            if win_probability is not None:
+                prediction['win_probability'] = round(float(win_probability[code]), 4)
+            predictions.append(prediction)
+
+        # Compare against the estimate made with fewer votes to show convergence
+        with self.lock:
+            latest_size, latest = self.latest_estimates
+            if sample_size > latest_size:
+                self.previous_estimates = latest
+                self.latest_estimates = (sample_size, estimates)
+            previous = self.previous_estimates
+
+        shift = None
+        if previous is not None:
+            common = min(len(previous), len(estimates))
+            shift = round(float(np.abs(estimates[:common] - previous[:common]).max()) * 100, 4)
+
+        convergence = {
+            'max_margin_of_error': round(float(half_widths.max()), 4),
+            'max_shift_since_previous_sample': shift,
+            'strata': int(table.shape[0]),
+            'min_stratum_size': int(table.sum(axis=1).min()),
+            'converged': bool(half_widths.max() < CONVERGENCE_THRESHOLD)
+        }
+        if mc_error is not None:
+            convergence['bootstrap_samples'] = self.bootstrap_samples
+            convergence['max_monte_carlo_error'] = round(float(mc_error.max()) * 100, 6)
+
+        projection = {
+            'predictions': predictions,
+            'sample_size': sample_size,
+            'total_expected': total_expected_voters,
+            'method': method,
+            'stratified_by': list(stratify_by),
+            'convergence': convergence,
+            'tip': tip,
+            'generated_at': datetime.now().isoformat()
+        }
+
+        with self.lock:
+            # Projections of fewer votes are never requested again; a slower request for an
+            # older snapshot must not evict a newer one
+            newest = max([key[0] for key in self.cache] + [sample_size])
+            if sample_size == newest:
+                cache = {key: value for key, value in self.cache.items() if key[0] == newest}
+                cache[cache_key] = projection
+                self.cache = cache
+
+        return projection
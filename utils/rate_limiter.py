@@ -0,0 +1,132 @@
+"""
+Rate Limiter Module
+Per-key token buckets with constant state per key, LRU eviction of idle keys, and per-route policies
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitPolicy:
+    """Sustained rate and burst size for one class of requests"""
+
+    __slots__ = ('name', 'rate', 'burst', 'methods')
+
+    def __init__(self, name, per_minute, burst=None, methods=None):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = burst if burst is not None else per_minute
+        # None applies the policy to every method
+        self.methods = frozenset(methods) if methods else None
+
+    def applies_to(self, method):
+        return self.methods is None or method in self.methods
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by arbitrary strings: two floats per key, bounded key count"""
+
+    def __init__(self, max_keys=100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self.lock = threading.Lock()
+        # key -> [tokens, last refill time]; least recently used first
+        self.buckets = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def get_stats(self):
+        return {
+            'tracked_keys': len(self.buckets),
+            'max_keys': self.max_keys,
+            'evicted_keys': self.evicted
+        }
+
+    def acquire(self, key, rate, burst, cost=1):
+        """Take cost tokens, returning (allowed, seconds until that many tokens are available)"""
+        now = self.clock()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                # A new or evicted key starts full, which is what an idle key would have refilled to
+                bucket = self.buckets[key] = [float(burst), now]
+                if len(self.buckets) > self.max_keys:
+                    self.buckets.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self.buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return True, 0.0
+            return False, (cost - bucket[0]) / rate
+
+
+class RateLimiter:
+    """Applies the policy for a request path to the client's bucket"""
+
+    def __init__(self, policies, default_policy=None, limiter=None, max_keys=100_000):
+        # policies maps exact request paths to RateLimitPolicy; limiter is anything with
+        # acquire(key, rate, burst), such as a SharedTable for limits shared by worker processes
+        self.policies = dict(policies)
+        self.default_policy = default_policy
+        self.limiter = limiter if limiter is not None else TokenBucketLimiter(max_keys=max_keys)
+        # Used while a shared limiter is unreachable, so limits still hold per process
+        self.fallback = TokenBucketLimiter(max_keys=max_keys) if limiter is not None else None
+        self.limited = 0
+        self.backend_errors = 0
+        self.backend_down = False
+
+    def policy_for(self, path, method):
+        policy = self.policies.get(path, self.default_policy)
+        if policy is not None and policy.applies_to(method):
+            return policy
+        return None
+
+    def check(self, path, method, client):
+        """Get (allowed, whole seconds to wait) for one request from client"""
+        policy = self.policy_for(path, method)
+        if policy is None:
+            return True, 0
+
+        allowed, wait = self.acquire(f'{policy.name}:{client}', policy.rate, policy.burst)
+        if allowed:
+            return True, 0
+        self.limited += 1
+        return False, max(1, math.ceil(wait))
+
+    def acquire(self, key, rate, burst):
+        """Take a token from the shared limiter, or from the local fallback while it is failing"""
+        if self.fallback is None:
+            return self.limiter.acquire(key, rate, burst)
+
+        try:
+            result = self.limiter.acquire(key, rate, burst)
+        except (OSError, ValueError) as e:
+            self.backend_errors += 1
+            if not self.backend_down:
+                logger.warning('Shared rate limiter unavailable, using per-process limits: %s', e)
+                self.backend_down = True
+            return self.fallback.acquire(key, rate, burst)
+
+        if self.backend_down:
+            logger.warning('Shared rate limiter available again')
+            self.backend_down = False
+        return result
+
+    def get_stats(self):
+        try:
+            stats = self.limiter.get_stats()
+        except (OSError, ValueError):
+            stats = {}
+        return dict(stats, limited_requests=self.limited, backend_errors=self.backend_errors,
+                    backend_down=self.backend_down)
@@ -0,0 +1,97 @@
+"""
+Report Jobs Module
+Runs election report generation on a background worker pool, cached per chain tip
+"""
+
+import json
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+class ReportJobManager:
+    """Submits report builds to a worker pool and serves their artifacts"""
+
+    def __init__(self, max_workers=2, max_jobs=200):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report')
+        self.max_jobs = max_jobs
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+        self.jobs_by_tip = {}
+
+    def submit(self, tip, build_report):
+        """Submit a report build for a chain tip, reusing any live job for that tip"""
+        with self.lock:
+            existing = self.jobs.get(self.jobs_by_tip.get(tip))
+            if existing and existing['status'] != FAILED:
+                return self.public_view(existing)
+
+            job = {
+                'job_id': secrets.token_hex(8),
+                'tip': tip,
+                'status': QUEUED,
+                'submitted_at': datetime.now().isoformat(),
+                'started_at': None,
+                'completed_at': None,
+                'error': None,
+                'report': None
+            }
+            self.jobs[job['job_id']] = job
+            self.jobs_by_tip[tip] = job['job_id']
+            self.evict_old_jobs()
+
+        self.executor.submit(self.run_job, job, build_report)
+        return self.public_view(job)
+
+    def run_job(self, job, build_report):
+        """Build a report on a worker thread and record the outcome"""
+        job['status'] = RUNNING
+        job['started_at'] = datetime.now().isoformat()
+
+        try:
+            report = build_report()
+            job['report'] = json.dumps(report, indent=4)
+            job['status'] = COMPLETED
+        except Exception as e:
+            job['error'] = str(e)
+            job['status'] = FAILED
+        finally:
+            job['completed_at'] = datetime.now().isoformat()
+
+    def evict_old_jobs(self):
+        """Drop the oldest finished jobs once the retention limit is reached"""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            job = self.jobs[job_id]
+            if job['status'] in (COMPLETED, FAILED):
+                del self.jobs[job_id]
+                if self.jobs_by_tip.get(job['tip']) == job_id:
+                    del self.jobs_by_tip[job['tip']]
+
+    def get_status(self, job_id):
+        """Get a job's status without its artifact"""
+        job = self.jobs.get(job_id)
+        return self.public_view(job) if job else None
+
+    def get_artifact(self, job_id):
+        """Get a completed job's serialized report"""
+        job = self.jobs.get(job_id)
+        if job and job['status'] == COMPLETED:
+            return job['report']
+        return None
+
+    def list_jobs(self):
+        """List all retained jobs, newest first"""
+        return [self.public_view(job) for job in reversed(self.jobs.values())]
+
+    def public_view(self, job):
+        """Job metadata safe to return from the API"""
+        return {key: value for key, value in job.items() if key != 'report'}
@@ -0,0 +1,165 @@
+"""
+Search Index Module
+Trigram inverted index for ranked substring search over voter name, email and ID
+"""
+
+import threading
+from array import array
+
+import numpy as np
+
+FIELDS = ('voter_id', 'name', 'email')
+
+# Shorter queries have no trigrams to look up and would have to scan every voter
+MIN_QUERY_LENGTH = 3
+
+# Field weights for ranking: an ID hit outranks a name hit, which outranks an email hit
+FIELD_WEIGHTS = {'voter_id': 3.0, 'name': 2.0, 'email': 1.0}
+
+
+def trigrams(text):
+    """Get the distinct trigrams of a lowercased string"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Append-only trigram postings over dense document ordinals"""
+
+    def __init__(self, max_candidates=1000):
+        self.lock = threading.Lock()
+        self.max_candidates = max_candidates
+        self.postings = {}
+        self.unsorted = set()
+        self.ordinals = {}
+        self.voter_ids = []
+        self.documents = {field: [] for field in FIELDS}
+        self.active = array('b')
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def add(self, voter):
+        """Index a voter, or re-index it if already present"""
+        voter_id = voter['voter_id']
+        texts = {field: str(voter.get(field) or '').lower() for field in FIELDS}
+
+        with self.lock:
+            ordinal = self.ordinals.get(voter_id)
+            if ordinal is None:
+                ordinal = len(self.active)
+                self.ordinals[voter_id] = ordinal
+                self.voter_ids.append(voter_id)
+                for field in FIELDS:
+                    self.documents[field].append(texts[field])
+                self.active.append(1 if voter.get('active', True) else 0)
+                new_grams = set().union(*(trigrams(t) for t in texts.values()))
+            else:
+                # Stale postings for the old text are harmless: matches are re-verified
+                old_grams = set().union(*(trigrams(self.documents[f][ordinal]) for f in FIELDS))
+                for field in FIELDS:
+                    self.documents[field][ordinal] = texts[field]
+                self.active[ordinal] = 1 if voter.get('active', True) else 0
+                new_grams = set().union(*(trigrams(t) for t in texts.values())) - old_grams
+
+            for gram in new_grams:
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array('I')
+                elif posting[-1] >= ordinal:
+                    # Re-indexing an older voter breaks ordinal order for this posting
+                    self.unsorted.add(gram)
+                posting.append(ordinal)
+
+    def candidates(self, query, needed):
+        """Get up to roughly `needed` ordinals containing every trigram of the query"""
+        # Held throughout: appending to a posting fails while NumPy views export its buffer
+        with self.lock:
+            return self.intersect_postings(query, needed)
+
+    def sorted_posting(self, gram):
+        """Get a posting as a sorted, duplicate-free uint32 view"""
+        posting = self.postings[gram]
+        if gram in self.unsorted:
+            posting = self.postings[gram] = array('I', np.unique(np.frombuffer(posting, dtype=np.uint32)).tobytes())
+            self.unsorted.discard(gram)
+        return np.frombuffer(posting, dtype=np.uint32)
+
+    def intersect_postings(self, query, needed):
+        """Intersect query trigram postings, walking the shortest one in chunks"""
+        grams = trigrams(query)
+        if any(gram not in self.postings for gram in grams):
+            return np.empty(0, dtype=np.uint32), False
+
+        postings = sorted((self.sorted_posting(gram) for gram in grams), key=len)
+        shortest, others = postings[0], postings[1:]
+
+        # Membership is a binary search per candidate, so cost depends on the chunk,
+        # not on how long the other postings are
+        found = []
+        found_count = 0
+        chunk_size = max(needed * 4, 1024)
+        for start in range(0, len(shortest), chunk_size):
+            chunk = shortest[start:start + chunk_size]
+            for other in others:
+                positions = np.minimum(np.searchsorted(other, chunk), len(other) - 1)
+                chunk = chunk[other[positions] == chunk]
+                if not len(chunk):
+                    break
+
+            found.append(chunk.copy())
+            found_count += len(chunk)
+            if found_count >= needed:
+                return np.concatenate(found), start + chunk_size < len(shortest)
+
+        return np.concatenate(found) if found else np.empty(0, dtype=np.uint32), False
+
+    def score(self, ordinal, query):
+        """Rank a verified match, 0 if the query is not actually a substring"""
+        best = 0.0
+        for field in FIELDS:
+            text = self.documents[field][ordinal]
+            position = text.find(query)
+            if position < 0:
+                continue
+
+            if text == query:
+                field_score = 3.0
+            elif position == 0:
+                field_score = 2.0
+            else:
+                field_score = 1.0 + 1.0 / (1 + position)
+
+            best = max(best, FIELD_WEIGHTS[field] * field_score)
+        return best
+
+    def search(self, query, limit=20, offset=0, active_only=False):
+        """Get ranked, paginated (voter_id, score) matches"""
+        query = query.strip().lower()
+        if len(query) < MIN_QUERY_LENGTH:
+            return {'matches': [], 'total': 0, 'truncated': False}
+
+        # Verification is bounded, so very common queries rank a prefix of their matches
+        budget = self.max_candidates * 2
+        candidates, truncated = self.candidates(query, budget)
+        truncated = truncated or len(candidates) > budget
+        pool = candidates[:budget].tolist()
+
+        scored = {}
+        for ordinal in pool:
+            if active_only and not self.active[ordinal]:
+                continue
+            s = self.score(ordinal, query)
+            if s:
+                scored[ordinal] = s
+                if len(scored) >= self.max_candidates:
+                    truncated = True
+                    break
+
+        scored = sorted((-s, ordinal) for ordinal, s in scored.items())
+        page = scored[offset:offset + limit]
+
+        return {
+            'matches': [(self.voter_ids[ordinal], -neg_score) for neg_score, ordinal in page],
+            'total': len(scored),
+            'truncated': truncated
+        }
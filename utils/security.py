@@ -8,23 +8,53 @@ import hmac
 import secrets
 import json
 from datetime import datetime
-from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import serialization
 import base64
+import atexit
+import os
+import threading
+from collections import deque
+
+from utils.activity_windows import ActivityWindows
+from utils.key_manager import KeyManager, load_or_create_private_key
+from utils.security_log import SecurityLog
+
+# RSA-OAEP parameters shared by every EncryptionManager operation
+OAEP_PADDING = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None
+)
+
+# Process-wide vote key manager, created on first use from VOTE_KEYSTORE_PATH
+key_manager = None
+key_manager_lock = threading.Lock()
+
+
+def get_key_manager():
+    """Get the shared KeyManager, loading the keystore once per process"""
+    global key_manager
+    if key_manager is None:
+        with key_manager_lock:
+            if key_manager is None:
+                key_manager = KeyManager(os.environ.get('VOTE_KEYSTORE_PATH', 'keys/vote_keys.json'))
+    return key_manager
 
-# Generate encryption key (in production, use secure key management)
-ENCRYPTION_KEY = Fernet.generate_key()
-cipher_suite = Fernet(ENCRYPTION_KEY)
 
 class SecurityManager:
     """Manages security operations and logging"""
     
-    def __init__(self):
-        self.activity_log = []
-        self.failed_attempts = {}
-        self.max_failed_attempts = 5
+    def __init__(self, log_dir=None, log_capacity=10_000, compress_logs=False, anomaly_history=1000):
+        # Recent entries stay in memory; with log_dir, all entries also go to rotated NDJSON files
+        self.activity_log = SecurityLog(capacity=log_capacity, log_dir=log_dir, compress=compress_logs)
+        if log_dir:
+            atexit.register(self.activity_log.close)
+        # Per-user sliding windows; anomalies are raised as events are logged
+        self.activity_windows = ActivityWindows(max_failures=5)
+        self.anomalies = deque(maxlen=anomaly_history)
+        self.on_anomaly = None
     
     def log_activity(self, user_id, action, status, details=''):
         """Log security-related activities"""
@@ -34,22 +64,24 @@ class SecurityManager:
             'action': action,
             'status': status,
             'details': details,
-            'ip_address': '',  # Should be passed from request
-            'log_id': secrets.token_hex(16)
+            'ip_address': ''  # Should be passed from request
         }
         
+        # Non-blocking: the file sink writes from its own thread
         self.activity_log.append(log_entry)
         
-        # Track failed attempts
-        if status == 'failed':
-            if user_id not in self.failed_attempts:
-                self.failed_attempts[user_id] = []
-            
-            self.failed_attempts[user_id].append(datetime.now())
-            
-            # Check if account should be locked
-            if len(self.failed_attempts[user_id]) >= self.max_failed_attempts:
+        # Count the event in the user's windows; lock on repeated failures within the window
+        for anomaly in self.activity_windows.record(user_id, failed=status == 'failed'):
+            if anomaly['type'] == 'repeated_failures':
                 self.lock_account(user_id)
+            self.raise_anomaly(anomaly)
+    
+    def raise_anomaly(self, anomaly):
+        """Keep a raised anomaly and pass it to the on_anomaly hook"""
+        anomaly['timestamp'] = datetime.now().isoformat()
+        self.anomalies.append(anomaly)
+        if self.on_anomaly is not None:
+            self.on_anomaly(anomaly)
     
     def lock_account(self, user_id):
         """Lock user account after too many failed attempts"""
@@ -58,119 +90,107 @@ class SecurityManager:
             'user_id': user_id,
             'action': 'account_locked',
             'status': 'security_measure',
-            'details': f'Account locked after {self.max_failed_attempts} failed attempts'
+            'details': (f'Account locked after {self.activity_windows.max_failures} failed attempts '
+                        f'within {self.activity_windows.failure_window} seconds')
         }
         self.activity_log.append(log_entry)
     
     def get_logs(self, filters=None):
         """Retrieve security logs with optional filters"""
         if not filters:
-            return self.activity_log[-100:]  # Return last 100 entries
-        
-        filtered_logs = self.activity_log
-        
-        if 'user_id' in filters:
-            filtered_logs = [log for log in filtered_logs if log['user_id'] == filters['user_id']]
+            return self.activity_log.recent(100)  # Return last 100 entries
         
-        if 'action' in filters:
-            filtered_logs = [log for log in filtered_logs if log['action'] == filters['action']]
-        
-        if 'start_date' in filters:
-            filtered_logs = [log for log in filtered_logs if log['timestamp'] >= filters['start_date']]
-        
-        return filtered_logs
+        filters = dict(filters)
+        start = filters.pop('start_date', None)
+        end = filters.pop('end_date', None)
+        result = self.activity_log.query(filters, start, end, limit=len(self.activity_log))
+        return result['logs'][::-1]
+    
+    def query_logs(self, filters=None, start=None, end=None, cursor=None, limit=100, count_only=False):
+        """Query logs by user, action and status over a time range, newest first, one page at a time"""
+        return self.activity_log.query(filters, start, end, before_id=cursor, limit=limit, count_only=count_only)
     
     def export_logs(self, format='json'):
         """Export security logs"""
+        logs = self.activity_log.recent()
         if format == 'json':
-            return json.dumps(self.activity_log, indent=4)
+            return json.dumps(logs, indent=4)
         elif format == 'csv':
             # Convert to CSV format
             csv_data = 'timestamp,user_id,action,status,details\n'
-            for log in self.activity_log:
+            for log in logs:
                 csv_data += f"{log['timestamp']},{log['user_id']},{log['action']},{log['status']},{log['details']}\n"
             return csv_data
         
-        return self.activity_log
+        return logs
     
     def detect_anomalies(self):
-        """Detect anomalous activities"""
-        anomalies = []
-        
-        # Check for rapid successive login attempts
-        user_activities = {}
-        for log in self.activity_log:
-            user_id = log['user_id']
-            if user_id not in user_activities:
-                user_activities[user_id] = []
-            user_activities[user_id].append(log)
-        
-        for user_id, activities in user_activities.items():
-            # Check for more than 10 actions in 1 minute
-            recent_activities = [a for a in activities if 
-                               (datetime.now() - datetime.fromisoformat(a['timestamp'])).seconds < 60]
-            
-            if len(recent_activities) > 10:
-                anomalies.append({
-                    'user_id': user_id,
-                    'type': 'rapid_actions',
-                    'count': len(recent_activities),
-                    'severity': 'high'
-                })
-        
-        return anomalies
+        """Get anomalies raised so far, oldest first"""
+        return list(self.anomalies)
 
 
-def encrypt_vote(vote_data):
-    """Encrypt vote data using Fernet symmetric encryption"""
+def encrypt_vote(vote_data, election_id=''):
+    """Encrypt vote data with the election's data key (envelope encryption)"""
     vote_string = json.dumps(vote_data)
-    encrypted = cipher_suite.encrypt(vote_string.encode())
-    return base64.b64encode(encrypted).decode()
+    return get_key_manager().encrypt(vote_string.encode(), election_id)
 
 
 def decrypt_vote(encrypted_vote):
     """Decrypt vote data"""
     try:
-        encrypted_bytes = base64.b64decode(encrypted_vote.encode())
-        decrypted = cipher_suite.decrypt(encrypted_bytes)
+        decrypted = get_key_manager().decrypt(encrypted_vote)
         return json.loads(decrypted.decode())
     except Exception as e:
         return None
 
 
-def generate_digital_signature(voter_id, vote_data):
-    """Generate digital signature for vote"""
-    # In production, use actual private key
-    message = f"{voter_id}:{vote_data}:{datetime.now().isoformat()}"
-    signature = hashlib.sha256(message.encode()).hexdigest()
-    return signature
-
+# scrypt cost for new password hashes; stored hashes with other parameters are upgraded on login
+PASSWORD_HASH_PARAMS = {'n': 2 ** 14, 'r': 8, 'p': 1}
 
-def verify_signature(voter_id, vote_data, signature):
-    """Verify digital signature"""
-    expected_signature = generate_digital_signature(voter_id, vote_data)
-    return hmac.compare_digest(signature, expected_signature)
 
-
-def hash_password(password, salt=None):
-    """Hash password using SHA-256 with salt"""
+def hash_password(password, salt=None, params=None):
+    """Hash password using memory-hard scrypt with salt"""
+    params = params or PASSWORD_HASH_PARAMS
     if salt is None:
         salt = secrets.token_hex(16)
     
-    pwd_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-    return f"{salt}${pwd_hash}"
+    pwd_hash = scrypt_hash(password, salt, params['n'], params['r'], params['p'])
+    return f"scrypt${params['n']}${params['r']}${params['p']}${salt}${pwd_hash}"
+
+
+def scrypt_hash(password, salt, n, r, p):
+    """Derive a hex scrypt digest; hashlib releases the GIL while it runs"""
+    return hashlib.scrypt(
+        password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+        maxmem=max(256 * r * n * p, 32 * 2 ** 20), dklen=32
+    ).hex()
 
 
 def verify_password(password, hashed_password):
-    """Verify password against hash"""
+    """Verify password against a scrypt or legacy salted SHA-256 hash"""
     try:
-        salt, pwd_hash = hashed_password.split('$')
-        expected_hash = hashlib.sha256((password + salt).encode()).hexdigest()
+        parts = hashed_password.split('$')
+        if len(parts) == 2:
+            salt, pwd_hash = parts
+            expected_hash = hashlib.sha256((password + salt).encode()).hexdigest()
+        else:
+            _, n, r, p, salt, pwd_hash = parts
+            expected_hash = scrypt_hash(password, salt, int(n), int(r), int(p))
         return hmac.compare_digest(pwd_hash, expected_hash)
     except:
         return False
 
 
+def password_needs_rehash(hashed_password):
+    """Check whether a stored hash uses an older scheme or other scrypt parameters"""
+    parts = hashed_password.split('$')
+    if len(parts) != 6 or parts[0] != 'scrypt':
+        return True
+    
+    current = PASSWORD_HASH_PARAMS
+    return parts[1:4] != [str(current['n']), str(current['r']), str(current['p'])]
+
+
 def generate_otp():
     """Generate 6-digit OTP"""
     return str(secrets.randbelow(1000000)).zfill(6)
@@ -263,42 +283,68 @@ class BiometricAuth:
 class EncryptionManager:
     """Advanced encryption management"""
     
-    def __init__(self):
-        # Generate RSA key pair for asymmetric encryption
-        self.private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048
-        )
-        self.public_key = self.private_key.public_key()
+    def __init__(self, key_path=None, key_size=2048):
+        # Key material is loaded, or generated and persisted, on first use rather than here
+        self.key_path = key_path
+        self.key_size = key_size
+        self.key_lock = threading.Lock()
+        self.loaded_private_key = None
+        self.loaded_public_key = None
+    
+    @property
+    def private_key(self):
+        """RSA private key, loaded from key_path or generated on first access"""
+        if self.loaded_private_key is None:
+            with self.key_lock:
+                if self.loaded_private_key is None:
+                    if self.key_path:
+                        private_key = load_or_create_private_key(self.key_path, self.generate_key)
+                    else:
+                        private_key = self.generate_key()
+                    self.loaded_private_key = private_key
+        return self.loaded_private_key
+    
+    @property
+    def public_key(self):
+        if self.loaded_public_key is None:
+            self.loaded_public_key = self.private_key.public_key()
+        return self.loaded_public_key
+    
+    def generate_key(self):
+        return rsa.generate_private_key(public_exponent=65537, key_size=self.key_size)
     
     def encrypt_with_public_key(self, data):
         """Encrypt data with public key"""
-        encrypted = self.public_key.encrypt(
-            data.encode(),
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
-            )
-        )
+        encrypted = self.public_key.encrypt(data.encode(), OAEP_PADDING)
         return base64.b64encode(encrypted).decode()
     
     def decrypt_with_private_key(self, encrypted_data):
         """Decrypt data with private key"""
         try:
             encrypted_bytes = base64.b64decode(encrypted_data.encode())
-            decrypted = self.private_key.decrypt(
-                encrypted_bytes,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                    algorithm=hashes.SHA256(),
-                    label=None
-                )
-            )
+            decrypted = self.private_key.decrypt(encrypted_bytes, OAEP_PADDING)
             return decrypted.decode()
         except:
             return None
     
+    def encrypt_many(self, items):
+        """Encrypt a list of strings with the public key, resolving the key once"""
+        public_key = self.public_key
+        return [base64.b64encode(public_key.encrypt(item.encode(), OAEP_PADDING)).decode()
+                for item in items]
+    
+    def decrypt_many(self, encrypted_items):
+        """Decrypt a list of ciphertexts; entries that fail to decrypt come back as None"""
+        private_key = self.private_key
+        results = []
+        for encrypted_data in encrypted_items:
+            try:
+                results.append(private_key.decrypt(base64.b64decode(encrypted_data.encode()),
+                                                   OAEP_PADDING).decode())
+            except Exception:
+                results.append(None)
+        return results
+    
     def export_public_key(self):
         """Export public key for sharing"""
         pem = self.public_key.public_bytes(
@@ -306,3 +352,18 @@ class EncryptionManager:
             format=serialization.PublicFormat.SubjectPublicKeyInfo
         )
         return pem.decode()
+
+
+# Process-wide EncryptionManager, so the RSA key is loaded once per process
+encryption_manager = None
+encryption_manager_lock = threading.Lock()
+
+
+def get_encryption_manager():
+    """Get the shared EncryptionManager backed by the PEM file at RSA_KEY_PATH"""
+    global encryption_manager
+    if encryption_manager is None:
+        with encryption_manager_lock:
+            if encryption_manager is None:
+                encryption_manager = EncryptionManager(os.environ.get('RSA_KEY_PATH', 'keys/rsa_private.pem'))
+    return encryption_manager
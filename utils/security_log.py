@@ -0,0 +1,296 @@
+"""
+Security Log Module
+Bounded, indexed in-memory ring of recent security events with a background rotating NDJSON file sink
+"""
+
+import bisect
+import gzip
+import json
+import os
+import shutil
+import threading
+from json.encoder import encode_basestring_ascii as quote
+
+# Shared compact encoder; json.dumps with custom separators builds a new encoder per call
+ENCODER = json.JSONEncoder(separators=(',', ':'), default=str)
+
+# Line for the entries SecurityManager.log_activity builds. Filling it with quoted strings costs
+# about a third of the generic encoder, and the writer's encoding is what callers wait on for the GIL
+ACTIVITY_LINE = ('{"timestamp":%s,"user_id":%s,"action":%s,"status":%s,"details":%s,'
+                 '"ip_address":%s,"log_id":%d}\n')
+
+# Entry fields with a secondary index
+INDEXED_FIELDS = ('user_id', 'action', 'status')
+
+
+def id_range(ids, low_id, high_id):
+    """Get (lo, hi) positions of the IDs in [low_id, high_id] within an ascending ID list"""
+    lo = bisect.bisect_left(ids, low_id)
+    hi = bisect.bisect_right(ids, high_id, lo)
+    return lo, hi
+
+
+def encode_line(entry):
+    """Encode an entry as one compact NDJSON line"""
+    if len(entry) == 7:
+        try:
+            return ACTIVITY_LINE % (quote(entry['timestamp']), quote(entry['user_id']),
+                                    quote(entry['action']), quote(entry['status']),
+                                    quote(entry['details']), quote(entry['ip_address']), entry['log_id'])
+        except (KeyError, TypeError):
+            pass
+    return ENCODER.encode(entry) + '\n'
+
+
+class SecurityLog:
+    """Indexed recent-entry ring plus an optional batched, size-rotated file sink"""
+
+    def __init__(self, capacity=10_000, log_dir=None, filename='security.ndjson',
+                 max_bytes=10 * 2 ** 20, backup_count=5, compress=False,
+                 flush_interval=1.0, batch_size=1000, max_pending=100_000):
+        # Entry with log ID n lives in slot n % capacity; IDs are assigned in arrival order,
+        # so the ring is ordered by ID and, with a non-decreasing clock, by timestamp
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.first_id = 1
+        self.next_id = 1
+        # field -> value -> ascending log IDs. Built lazily by queries, so appends pay nothing
+        # for it; IDs below first_id are evicted and skipped by bisection until pruned
+        self.indexes = {field: {} for field in INDEXED_FIELDS}
+        self.indexed_id = 1
+        self.pruned_id = 1
+        self.lock = threading.Lock()
+        self.dropped = 0
+
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, filename) if log_dir else None
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+
+        # Producers append here under the lock; the writer swaps the whole list out at once
+        self.pending = []
+        self.write_lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.file = None
+        self.writer = None
+        self.written = 0
+        self.rotations = 0
+
+        if self.path:
+            os.makedirs(log_dir, exist_ok=True)
+            self.file = open(self.path, 'a', encoding='utf-8')
+            self.writer = threading.Thread(target=self.run_writer, name='security-log-writer', daemon=True)
+            self.writer.start()
+
+    def __len__(self):
+        return self.next_id - self.first_id
+
+    def append(self, entry):
+        """Record an entry; indexing waits for the next query and file I/O for the writer thread"""
+        with self.lock:
+            log_id = self.next_id
+            slot = log_id % self.capacity
+            if log_id - self.first_id >= self.capacity:
+                self.first_id += 1
+
+            entry['log_id'] = log_id
+            self.slots[slot] = entry
+            self.next_id = log_id + 1
+
+            if self.file is not None:
+                pending = self.pending
+                if len(pending) < self.max_pending:
+                    pending.append(entry)
+                    # Wake the writer once per full batch instead of signalling every entry
+                    if len(pending) == self.batch_size:
+                        self.wake_event.set()
+                else:
+                    self.dropped += 1
+        return entry
+
+    def update_indexes(self):
+        """Index the entries appended since the last query; the caller holds the lock"""
+        slots, capacity = self.slots, self.capacity
+        new_ids = range(max(self.indexed_id, self.first_id), self.next_id)
+        for field, postings in self.indexes.items():
+            for log_id in new_ids:
+                value = slots[log_id % capacity].get(field)
+                ids = postings.get(value)
+                if ids is None:
+                    postings[value] = [log_id]
+                else:
+                    ids.append(log_id)
+        self.indexed_id = self.next_id
+
+        # Once a ring's worth of entries has been evicted, drop their IDs; values that only
+        # appeared in evicted entries (idle users) are forgotten, so the indexes stay bounded
+        if self.first_id - self.pruned_id >= capacity:
+            for postings in self.indexes.values():
+                for value, ids in list(postings.items()):
+                    dead = bisect.bisect_left(ids, self.first_id)
+                    if dead == len(ids):
+                        del postings[value]
+                    elif dead:
+                        del ids[:dead]
+            self.pruned_id = self.first_id
+
+    def entry(self, log_id):
+        return self.slots[log_id % self.capacity]
+
+    def recent(self, limit=None):
+        """Get the newest entries in the ring, oldest first"""
+        with self.lock:
+            low_id = self.first_id if not limit else max(self.first_id, self.next_id - limit)
+            return [self.entry(log_id) for log_id in range(low_id, self.next_id)]
+
+    def id_at_or_after(self, timestamp):
+        """Binary search the first log ID whose timestamp is >= timestamp"""
+        lo, hi = self.first_id, self.next_id
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.entry(mid)['timestamp'] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def id_after(self, timestamp):
+        """Binary search the first log ID whose timestamp is > timestamp"""
+        lo, hi = self.first_id, self.next_id
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.entry(mid)['timestamp'] <= timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def query(self, filters=None, start=None, end=None, before_id=None, limit=100, count_only=False):
+        """Get matching entries newest first, or only their count"""
+        # start and end are inclusive ISO timestamps; before_id is the previous page's cursor
+        filters = filters or {}
+        unknown = [field for field in filters if field not in INDEXED_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown filters: {', '.join(unknown)}")
+
+        with self.lock:
+            low_id = self.id_at_or_after(start) if start else self.first_id
+            high_id = (self.id_after(end) if end else self.next_id) - 1
+            if before_id is not None:
+                high_id = min(high_id, before_id - 1)
+
+            if filters:
+                self.update_indexes()
+                postings = [self.indexes[field].get(value) for field, value in filters.items()]
+                if any(ids is None for ids in postings):
+                    return self.page([], None, count_only)
+
+                # Walk the posting with the fewest IDs in range and check the other filters on the entry
+                ranges = [(ids, id_range(ids, low_id, high_id)) for ids in postings]
+                driver, (lo, hi) = min(ranges, key=lambda item: item[1][1] - item[1][0])
+                if count_only and len(filters) == 1:
+                    return self.page([], None, count_only, hi - lo)
+                candidates = (driver[i] for i in range(hi - 1, lo - 1, -1))
+            else:
+                if count_only:
+                    return self.page([], None, count_only, max(0, high_id - low_id + 1))
+                candidates = range(high_id, low_id - 1, -1)
+
+            matches = []
+            for log_id in candidates:
+                entry = self.entry(log_id)
+                if all(entry.get(field) == value for field, value in filters.items()):
+                    matches.append(entry)
+                    if not count_only and len(matches) > limit:
+                        break
+
+        if count_only:
+            return self.page([], None, count_only, len(matches))
+
+        next_cursor = matches[limit - 1]['log_id'] if len(matches) > limit else None
+        return self.page(matches[:limit], next_cursor, count_only)
+
+    def page(self, entries, next_cursor, count_only, count=None):
+        if count_only:
+            return {'count': count or 0}
+        return {'logs': entries, 'next_cursor': next_cursor}
+
+    def run_writer(self):
+        while not self.stop_event.is_set():
+            self.wake_event.wait(self.flush_interval)
+            self.wake_event.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Write every pending entry to the sink in batches"""
+        if self.file is None:
+            return
+
+        with self.write_lock:
+            with self.lock:
+                pending, self.pending = self.pending, []
+
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                self.file.write(''.join(map(encode_line, batch)))
+                self.file.flush()
+                self.written += len(batch)
+
+                if self.file.tell() >= self.max_bytes:
+                    self.rotate()
+
+    def rotate(self):
+        """Shift security.ndjson -> .1 -> .2 ..., compressing rotated files if enabled"""
+        self.file.close()
+        suffix = '.gz' if self.compress else ''
+
+        oldest = f'{self.path}.{self.backup_count}{suffix}'
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f'{self.path}.{index}{suffix}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{index + 1}{suffix}')
+
+        if self.backup_count > 0:
+            if self.compress:
+                with open(self.path, 'rb') as src, gzip.open(f'{self.path}.1.gz', 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self.path)
+            else:
+                os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.rotations += 1
+
+    def close(self):
+        """Stop the writer after it drains pending entries"""
+        if self.writer is not None:
+            self.stop_event.set()
+            self.wake_event.set()
+            self.writer.join()
+            self.writer = None
+        if self.file is not None:
+            with self.write_lock:
+                self.file.close()
+                self.file = None
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'in_memory': len(self),
+                'capacity': self.capacity,
+                'pending': len(self.pending),
+                'written': self.written,
+                'dropped': self.dropped,
+                'rotations': self.rotations,
+                'path': self.path
+            }
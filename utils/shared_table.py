@@ -0,0 +1,299 @@
+"""
+Shared Table Module
+Fixed-size, memory-mapped hash table of token buckets and block flags shared by worker processes,
+plus a local-socket server and client standing in for a cross-host store
+"""
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within one process are serialized
+    fcntl = None
+
+MAGIC = b'SVTBL1\0\0'
+HEADER = struct.Struct('<8sII')
+# Slot: 64-bit key fingerprint (0 = empty), tokens, last refill time, blocked until (0 = not blocked)
+SLOT = struct.Struct('<Qddd')
+GROUP_SLOTS = 8
+THREAD_STRIPES = 64
+
+
+def key_fingerprint(key):
+    """Non-zero 64-bit fingerprint of a key; collisions are negligible at table sizes used here"""
+    fingerprint = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+    return fingerprint or 1
+
+
+class SharedTable:
+    """Token buckets and block flags in a file-backed mmap, updated under per-group byte-range locks"""
+
+    def __init__(self, path, groups=8192, clock=time.time):
+        # Wall-clock time: monotonic clocks are not comparable across reboots, and the file may outlive one
+        self.path = path
+        self.clock = clock
+        self.thread_locks = [threading.Lock() for _ in range(THREAD_STRIPES)]
+        self.evicted = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self.init_file(groups)
+        self.map = mmap.mmap(self.fd, os.fstat(self.fd).st_size)
+        self.groups = HEADER.unpack_from(self.map, 0)[1]
+
+    def init_file(self, groups):
+        """Write the header of a new table; an existing table keeps its own size"""
+        if fcntl:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, HEADER.size, 0)
+        try:
+            if os.fstat(self.fd).st_size >= HEADER.size:
+                magic, _, _ = HEADER.unpack(os.pread(self.fd, HEADER.size, 0))
+                if magic != MAGIC:
+                    raise ValueError(f'{self.path} is not a shared table')
+                return
+            os.ftruncate(self.fd, HEADER.size + groups * GROUP_SLOTS * SLOT.size)
+            os.pwrite(self.fd, HEADER.pack(MAGIC, groups, GROUP_SLOTS), 0)
+        finally:
+            if fcntl:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, HEADER.size, 0)
+
+    @contextmanager
+    def locked_group(self, fingerprint):
+        """Lock the key's group against other threads and processes, yielding its offset"""
+        group = fingerprint % self.groups
+        offset = self.group_offset(fingerprint)
+        # POSIX record locks exclude other processes only; the striped thread lock covers this one
+        with self.thread_locks[group % THREAD_STRIPES]:
+            if fcntl:
+                fcntl.lockf(self.fd, fcntl.LOCK_EX, GROUP_SLOTS * SLOT.size, offset)
+            try:
+                yield offset
+            finally:
+                if fcntl:
+                    fcntl.lockf(self.fd, fcntl.LOCK_UN, GROUP_SLOTS * SLOT.size, offset)
+
+    def group_offset(self, fingerprint):
+        return HEADER.size + (fingerprint % self.groups) * GROUP_SLOTS * SLOT.size
+
+    def find_slot(self, offset, fingerprint, now, create):
+        """Get (slot offset, slot fields) for a key within its group, claiming a slot if create"""
+        victim = None
+        victim_rank = None
+        for position in range(offset, offset + GROUP_SLOTS * SLOT.size, SLOT.size):
+            fields = SLOT.unpack_from(self.map, position)
+            if fields[0] == fingerprint:
+                return position, fields
+            if not create:
+                continue
+            # Prefer empty slots, then unblocked ones by oldest use, then the block expiring soonest
+            if fields[0] == 0:
+                rank = (0, 0.0)
+            elif fields[3] <= now:
+                rank = (1, fields[2])
+            else:
+                rank = (2, fields[3])
+            if victim_rank is None or rank < victim_rank:
+                victim, victim_rank = position, rank
+
+        if victim is None:
+            return None, None
+        if victim_rank[0]:
+            self.evicted += 1
+        return victim, None
+
+    def acquire(self, key, rate, burst, cost=1):
+        """Take cost tokens from key's bucket, returning (allowed, seconds until available)"""
+        fingerprint = key_fingerprint(key)
+        with self.locked_group(fingerprint) as offset:
+            now = self.clock()
+            position, fields = self.find_slot(offset, fingerprint, now, create=True)
+            if fields is None:
+                tokens, blocked_until = float(burst), 0.0
+            else:
+                _, tokens, stamp, blocked_until = fields
+                tokens = min(burst, tokens + max(0.0, now - stamp) * rate)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            SLOT.pack_into(self.map, position, fingerprint, tokens, now, blocked_until)
+
+        return (True, 0.0) if allowed else (False, (cost - tokens) / rate)
+
+    def block(self, key, seconds=None):
+        """Flag key as blocked for seconds, or indefinitely"""
+        fingerprint = key_fingerprint(key)
+        with self.locked_group(fingerprint) as offset:
+            now = self.clock()
+            position, fields = self.find_slot(offset, fingerprint, now, create=True)
+            tokens = fields[1] if fields else 0.0
+            until = math.inf if seconds is None else now + seconds
+            SLOT.pack_into(self.map, position, fingerprint, tokens, now, until)
+
+    def unblock(self, key):
+        fingerprint = key_fingerprint(key)
+        with self.locked_group(fingerprint) as offset:
+            position, fields = self.find_slot(offset, fingerprint, self.clock(), create=False)
+            if fields is not None:
+                SLOT.pack_into(self.map, position, fingerprint, fields[1], fields[2], 0.0)
+
+    def is_blocked(self, key):
+        """Check a block flag; a torn read can only delay seeing a concurrent update"""
+        fingerprint = key_fingerprint(key)
+        _, fields = self.find_slot(self.group_offset(fingerprint), fingerprint, 0.0, create=False)
+        return fields is not None and fields[3] > self.clock()
+
+    def blocked_count(self):
+        now = self.clock()
+        return sum(1 for fields in SLOT.iter_unpack(self.map[HEADER.size:])
+                   if fields[0] and fields[3] > now)
+
+    def get_stats(self):
+        return {
+            'path': self.path,
+            'slots': self.groups * GROUP_SLOTS,
+            'evicted_keys': self.evicted
+        }
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
+
+
+class TableRequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request per line: {"op": ..., "key": ..., ...} -> one JSON reply per line
+
+    A malformed request gets {"error": ...} and the connection stays open for the next one.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                reply = self.dispatch(json.loads(line))
+            except (ValueError, TypeError) as e:
+                reply = {'error': str(e)}
+            self.wfile.write(json.dumps(reply).encode() + b'\n')
+
+    def dispatch(self, request):
+        if not isinstance(request, dict):
+            raise ValueError('Request must be a JSON object')
+        key = request.get('key')
+        if not isinstance(key, str):
+            raise ValueError('key must be a string')
+
+        table = self.server.table
+        op = request.get('op')
+        if op == 'acquire':
+            rate = positive_number(request, 'rate')
+            burst = positive_number(request, 'burst')
+            cost = positive_number(request, 'cost', 1)
+            return table.acquire(key, rate, burst, cost)
+        if op == 'block':
+            seconds = positive_number(request, 'seconds', None)
+            return table.block(key, seconds)
+        if op == 'unblock':
+            return table.unblock(key)
+        if op == 'is_blocked':
+            return table.is_blocked(key)
+        raise ValueError(f'Unknown op: {op}')
+
+
+def positive_number(request, field, default=ValueError):
+    """Get a finite, positive number from a request, or default when the field is absent or null"""
+    value = request.get(field)
+    if value is None:
+        if default is ValueError:
+            raise ValueError(f'{field} is required')
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 < value < math.inf:
+        raise ValueError(f'{field} must be a positive number')
+    return value
+
+
+class TableServer(socketserver.ThreadingUnixStreamServer):
+    """Serves a SharedTable over a Unix socket; a stand-in for a network store shared by several hosts"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, table):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.table = table
+        super().__init__(socket_path, TableRequestHandler)
+
+
+class RemoteTable:
+    """SharedTable interface over a TableServer socket, one connection per thread"""
+
+    def __init__(self, socket_path, timeout=1.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+            except OSError:
+                # Every failed call would otherwise leave one more socket for the GC
+                sock.close()
+                raise
+            conn = self.local.conn = (sock, sock.makefile('rb'))
+        return conn
+
+    def call(self, request):
+        sock, reader = self.connection()
+        try:
+            sock.sendall(json.dumps(request).encode() + b'\n')
+            reply = json.loads(reader.readline())
+        except (OSError, ValueError):
+            # Reconnect on the next call rather than reuse a broken stream
+            self.local.conn = None
+            sock.close()
+            raise
+        if isinstance(reply, dict) and 'error' in reply:
+            raise ValueError(f"Shared table rejected {request['op']}: {reply['error']}")
+        return reply
+
+    def acquire(self, key, rate, burst, cost=1):
+        allowed, wait = self.call({'op': 'acquire', 'key': key, 'rate': rate, 'burst': burst, 'cost': cost})
+        return allowed, wait
+
+    def block(self, key, seconds=None):
+        self.call({'op': 'block', 'key': key, 'seconds': seconds})
+
+    def unblock(self, key):
+        self.call({'op': 'unblock', 'key': key})
+
+    def is_blocked(self, key):
+        return self.call({'op': 'is_blocked', 'key': key})
+
+    def get_stats(self):
+        return {'socket': self.socket_path}
+
+
+def serve(socket_path, table_path):
+    """Run a TableServer in the foreground"""
+    server = TableServer(socket_path, SharedTable(table_path))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    import sys
+    serve(sys.argv[1], sys.argv[2])
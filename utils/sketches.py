@@ -0,0 +1,260 @@
+"""
+Sketches Module
+Fixed-memory streaming counters for fraud tracking: Count-Min, windowed Count-Min, HyperLogLog and
+bounded time-decayed counts
+"""
+
+import hashlib
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+def hash_pair(key):
+    """Two independent 64-bit hashes of a string key, for double hashing"""
+    digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class CountMinSketch:
+    """Approximate per-key counts in width * depth counters
+
+    Estimates never undercount. With N total increments, an estimate exceeds the true count
+    by more than (e / width) * N with probability at most e^-depth. Conservative update
+    (only raising the counters that hold the minimum) keeps the typical error well below that bound.
+    """
+
+    def __init__(self, width=2 ** 18, depth=4):
+        self.width = width
+        self.depth = depth
+        self.counters = array('I', bytes(4 * width * depth))
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def positions(self, key):
+        h1, h2 = hash_pair(key)
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        """Count key and return its new estimate"""
+        return self.add_at(self.positions(key), count)
+
+    def add_at(self, positions, count=1):
+        counters = self.counters
+        with self.lock:
+            estimate = min(counters[p] for p in positions) + count
+            for p in positions:
+                if counters[p] < estimate:
+                    counters[p] = estimate
+            self.total += count
+        return estimate
+
+    def estimate(self, key):
+        return self.estimate_at(self.positions(key))
+
+    def estimate_at(self, positions):
+        counters = self.counters
+        return min(counters[p] for p in positions)
+
+    def error_bound(self):
+        """(additive error, probability it is exceeded) for the counts so far"""
+        return math.e / self.width * self.total, math.exp(-self.depth)
+
+    def memory_bytes(self):
+        return self.counters.itemsize * len(self.counters)
+
+
+class WindowedCountMin:
+    """Count-Min counts over a sliding window of between window and 2 * window seconds
+
+    Two CountMinSketch generations are kept; every window seconds the older one is dropped and the
+    newer one takes its place. Estimates are the sum of both, so error bounds only grow with the
+    events of the last two windows rather than with every event since startup.
+    """
+
+    def __init__(self, width=2 ** 18, depth=4, window=3600.0, clock=time.monotonic):
+        self.width = width
+        self.depth = depth
+        self.window = window
+        self.clock = clock
+        self.current = CountMinSketch(width, depth)
+        self.previous = CountMinSketch(width, depth)
+        self.rotated_at = clock()
+        self.lock = threading.Lock()
+
+    def rotate(self):
+        now = self.clock()
+        if now - self.rotated_at < self.window:
+            return
+        with self.lock:
+            if now - self.rotated_at < self.window:
+                return
+            if now - self.rotated_at >= 2 * self.window:
+                self.previous = CountMinSketch(self.width, self.depth)
+            else:
+                self.previous = self.current
+            self.current = CountMinSketch(self.width, self.depth)
+            self.rotated_at = now
+
+    def add(self, key, count=1):
+        """Count key and return its new estimate over the window"""
+        self.rotate()
+        current, previous = self.current, self.previous
+        # Both generations have the same shape, so the key's counters sit at the same positions
+        positions = current.positions(key)
+        return current.add_at(positions, count) + previous.estimate_at(positions)
+
+    def estimate(self, key):
+        self.rotate()
+        current, previous = self.current, self.previous
+        positions = current.positions(key)
+        return current.estimate_at(positions) + previous.estimate_at(positions)
+
+    def error_bound(self):
+        """(additive error, probability it is exceeded) for the counts in the window"""
+        self.rotate()
+        return math.e / self.width * (self.current.total + self.previous.total), math.exp(-self.depth)
+
+    def memory_bytes(self):
+        return self.current.memory_bytes() * 2
+
+
+class HyperLogLogBank:
+    """Distinct-item estimates for many keys: one small HyperLogLog per key, at most max_keys of them
+
+    Each estimate has a standard error of about 1.04 / sqrt(2^precision); below about 2.5 * 2^precision
+    items linear counting is used, which is close to exact. Memory is bounded by max_keys * 2^precision
+    bytes. The least recently updated key is evicted past max_keys and restarts from zero if seen again.
+    """
+
+    def __init__(self, max_keys=16_384, precision=8):
+        self.max_keys = max_keys
+        self.precision = precision
+        self.num_registers = 1 << precision
+        # alpha_m bias correction for m >= 128; smaller m use the tabulated constants
+        self.alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(self.num_registers,
+                                                          0.7213 / (1 + 1.079 / self.num_registers))
+        # key -> [registers, sum of 2^-register, empty register count], least recently updated first;
+        # the sum and zero count are kept incrementally so an estimate is O(1)
+        self.sketches = OrderedDict()
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sketches)
+
+    def add(self, key, item):
+        """Add item to key's set and return the key's distinct estimate"""
+        x = hash_pair(item)[0]
+        rest_bits = 64 - self.precision
+        register = x >> rest_bits
+        rank = rest_bits - (x & ((1 << rest_bits) - 1)).bit_length() + 1
+
+        with self.lock:
+            sketch = self.sketches.get(key)
+            if sketch is None:
+                sketch = self.sketches[key] = [bytearray(self.num_registers), float(self.num_registers),
+                                               self.num_registers]
+                if len(self.sketches) > self.max_keys:
+                    self.sketches.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self.sketches.move_to_end(key)
+
+            registers = sketch[0]
+            old = registers[register]
+            if rank > old:
+                registers[register] = rank
+                sketch[1] += 2.0 ** -rank - 2.0 ** -old
+                if old == 0:
+                    sketch[2] -= 1
+            return self.estimate(sketch)
+
+    def count(self, key):
+        with self.lock:
+            sketch = self.sketches.get(key)
+            return self.estimate(sketch) if sketch else 0
+
+    def counts(self):
+        """Get {key: distinct estimate} for every tracked key"""
+        with self.lock:
+            return {key: self.estimate(sketch) for key, sketch in self.sketches.items()}
+
+    def estimate(self, sketch):
+        m = self.num_registers
+        _, inverse_sum, zeros = sketch
+        raw = self.alpha * m * m / inverse_sum
+        # Small-range correction: linear counting while many registers are still empty
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+    def standard_error(self):
+        return 1.04 / math.sqrt(self.num_registers)
+
+    def memory_bytes(self):
+        return self.max_keys * self.num_registers
+
+
+class DecayedCounts:
+    """Exponentially decayed per-key counts: each event's weight halves every half_life seconds
+
+    Counts are exact for every key still held. At most max_keys keys are kept; the least recently
+    updated key is dropped past that, or once it is horizon half-lives old and its weight has
+    decayed to nothing. A dropped key reads as 0, so estimates can only undercount, and only for
+    keys last seen more than max_keys updates ago. Memory is bounded by max_keys.
+    """
+
+    def __init__(self, max_keys=100_000, half_life=10.0, horizon=10, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.half_life = half_life
+        self.decay_rate = math.log(2) / half_life
+        self.max_age = half_life * horizon
+        self.clock = clock
+        # key -> [decayed count, time of last update]; least recently updated first
+        self.counts = OrderedDict()
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, key, weight=1.0):
+        """Record an event and return the key's decayed count from before it"""
+        now = self.clock()
+        counts = self.counts
+        with self.lock:
+            entry = counts.get(key)
+            if entry is None:
+                previous = 0.0
+                entry = counts[key] = [0.0, now]
+            else:
+                previous = entry[0] * math.exp(-self.decay_rate * (now - entry[1]))
+                counts.move_to_end(key)
+            entry[0] = previous + weight
+            entry[1] = now
+
+            while len(counts) > self.max_keys:
+                counts.popitem(last=False)
+                self.evicted += 1
+            while now - next(iter(counts.values()))[1] > self.max_age:
+                counts.popitem(last=False)
+        return previous
+
+    def estimate(self, key):
+        with self.lock:
+            entry = self.counts.get(key)
+            if entry is None:
+                return 0.0
+            return entry[0] * math.exp(-self.decay_rate * (self.clock() - entry[1]))
+
+    def weight_after(self, seconds):
+        """Remaining weight of one event after seconds, for turning time thresholds into count thresholds"""
+        return math.exp(-self.decay_rate * seconds)
+
+    def memory_bytes(self):
+        """Approximate size when full: about 270 bytes per key for the dict slot, key, list and floats"""
+        return self.max_keys * 270
@@ -0,0 +1,142 @@
+"""
+Time Bucket Counters
+Fixed-resolution, array-backed vote counters with minute, hour and day roll-ups
+"""
+
+import calendar
+import threading
+from array import array
+from datetime import datetime, timedelta
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def wall_clock_seconds(timestamp):
+    """Convert a datetime to seconds since epoch in its own wall-clock time"""
+    return calendar.timegm(timestamp.timetuple())
+
+
+class BucketRing:
+    """Ring of fixed-width counters, each slot tagged with the bucket it holds"""
+
+    def __init__(self, resolution, capacity):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.counts = array('q', [0]) * capacity
+        self.bucket_ids = array('q', [-1]) * capacity
+
+    def increment(self, seconds, amount=1):
+        """Add to the bucket containing the given wall-clock second"""
+        bucket_id = seconds // self.resolution
+        slot = bucket_id % self.capacity
+
+        # A stale slot belongs to a bucket that has rolled out of the window
+        if self.bucket_ids[slot] != bucket_id:
+            self.bucket_ids[slot] = bucket_id
+            self.counts[slot] = 0
+
+        self.counts[slot] += amount
+
+    def count(self, bucket_id):
+        """Get the count held for a bucket, zero if empty or evicted"""
+        slot = bucket_id % self.capacity
+        if self.bucket_ids[slot] == bucket_id:
+            return self.counts[slot]
+        return 0
+
+    def series(self, start_bucket, end_bucket):
+        """Get (bucket_id, count) pairs for an inclusive bucket range"""
+        start_bucket = max(start_bucket, end_bucket - self.capacity + 1)
+        return [(b, self.count(b)) for b in range(start_bucket, end_bucket + 1)]
+
+
+class TimeBucketCounter:
+    """Per-minute, per-hour and per-day vote counters updated in O(1) per vote"""
+
+    def __init__(self, minute_capacity=2 * 24 * 60, hour_capacity=62 * 24, day_capacity=3660):
+        self.lock = threading.Lock()
+        self.rings = {
+            'minute': BucketRing(MINUTE, minute_capacity),
+            'hour': BucketRing(HOUR, hour_capacity),
+            'day': BucketRing(DAY, day_capacity)
+        }
+        self.hour_of_day = array('q', [0]) * 24
+        self.total = 0
+        self.first_seconds = None
+        self.last_seconds = None
+
+    def record(self, timestamp, amount=1):
+        """Record votes at the given datetime"""
+        seconds = wall_clock_seconds(timestamp)
+
+        with self.lock:
+            for ring in self.rings.values():
+                ring.increment(seconds, amount)
+
+            self.hour_of_day[timestamp.hour] += amount
+            self.total += amount
+
+            if self.first_seconds is None or seconds < self.first_seconds:
+                self.first_seconds = seconds
+            if self.last_seconds is None or seconds > self.last_seconds:
+                self.last_seconds = seconds
+
+    def series(self, resolution, start=None, end=None):
+        """Get (bucket start datetime, count) pairs between two datetimes"""
+        ring = self.rings[resolution]
+
+        # The default range and the buckets are read together, so a concurrent record
+        # cannot move the range or reuse a slot partway through
+        with self.lock:
+            if self.total == 0:
+                return []
+            end_seconds = wall_clock_seconds(end) if end else self.last_seconds
+            start_seconds = wall_clock_seconds(start) if start else self.first_seconds
+            buckets = ring.series(start_seconds // ring.resolution, end_seconds // ring.resolution)
+
+        return [(EPOCH + timedelta(seconds=b * ring.resolution), count) for b, count in buckets]
+
+    def count_between(self, resolution, start, end):
+        """Count votes in the buckets covering a time range"""
+        return sum(count for _, count in self.series(resolution, start, end))
+
+    def get_hour_of_day_distribution(self):
+        """Get vote counts keyed by hour of day, skipping empty hours"""
+        with self.lock:
+            return {hour: count for hour, count in enumerate(self.hour_of_day) if count}
+
+    def get_daily_distribution(self):
+        """Get vote counts keyed by calendar date, skipping empty days"""
+        return {day.strftime('%Y-%m-%d'): count for day, count in self.series('day') if count}
+
+    def get_votes_per_hour(self):
+        """Average voting rate from the first to the last recorded vote"""
+        with self.lock:
+            total = self.total
+            if total == 0:
+                return 0.0
+            span_seconds = self.last_seconds - self.first_seconds
+
+        # One formula throughout: the span is floored at an hour, since scaling a short burst
+        # up to an hour overstates the rate, and the result moves smoothly past that hour
+        return round(total * HOUR / max(span_seconds, HOUR), 2)
+
+    def get_recent_rate(self, now=None, window_minutes=60):
+        """Votes per hour over the trailing window of minute buckets"""
+        now = now or datetime.now()
+        start = now - timedelta(minutes=window_minutes - 1)
+        return round(self.count_between('minute', start, now) * 60 / window_minutes, 2)
+
+    def to_dict(self):
+        """Export non-empty buckets at every resolution"""
+        return {
+            resolution: [
+                {'bucket_start': start.isoformat(), 'count': count}
+                for start, count in self.series(resolution) if count
+            ]
+            for resolution in self.rings
+        }
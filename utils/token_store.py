@@ -0,0 +1,269 @@
+"""
+Token Store Module
+Bounded TTL store for OTPs and other short-lived tokens, with heap-driven expiry sweeping,
+and an SQLite-backed store shared by worker processes
+"""
+
+import heapq
+import hmac
+import itertools
+import json
+import threading
+import time
+
+
+class TokenStore:
+    """In-process key -> token map with monotonic expiry and attempt counting"""
+
+    def __init__(self, ttl=300, max_entries=100_000, max_attempts=5, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = {}
+        # (expires_at, sequence, key); replaced or removed keys leave stale items behind
+        self.expiry_heap = []
+        self.sequence = itertools.count()
+        self.stats = {'issued': 0, 'verified': 0, 'failed': 0, 'expired': 0, 'evicted': 0, 'locked': 0}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def put(self, key, token, ttl=None, data=None):
+        """Store a token for key, replacing any previous one and resetting its attempts"""
+        now = self.clock()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        sequence = next(self.sequence)
+
+        with self.lock:
+            self.sweep_locked(now)
+            if key not in self.entries:
+                while len(self.entries) >= self.max_entries:
+                    self.evict_soonest_locked()
+
+            self.entries[key] = {
+                'token': token,
+                'data': data,
+                'expires_at': expires_at,
+                'attempts': 0,
+                'sequence': sequence
+            }
+            heapq.heappush(self.expiry_heap, (expires_at, sequence, key))
+            self.stats['issued'] += 1
+            self.compact_locked()
+
+    def get(self, key):
+        """Get the live entry for key as a dict copy, or None"""
+        now = self.clock()
+        with self.lock:
+            entry = self.live_entry_locked(key, now)
+            return dict(entry, expires_in=entry['expires_at'] - now) if entry else None
+
+    def verify(self, key, token, consume=True):
+        """Check a token in constant time; too many wrong guesses revoke it"""
+        now = self.clock()
+        with self.lock:
+            self.sweep_locked(now)
+            entry = self.live_entry_locked(key, now)
+            if entry is None:
+                return False
+
+            if hmac.compare_digest(str(entry['token']).encode(), str(token).encode()):
+                if consume:
+                    del self.entries[key]
+                self.stats['verified'] += 1
+                return True
+
+            entry['attempts'] += 1
+            self.stats['failed'] += 1
+            if entry['attempts'] >= self.max_attempts:
+                del self.entries[key]
+                self.stats['locked'] += 1
+            return False
+
+    def discard(self, key):
+        """Remove the token for key, if any"""
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def sweep(self):
+        """Evict every expired entry, returning how many were removed"""
+        with self.lock:
+            return self.sweep_locked(self.clock())
+
+    def live_entry_locked(self, key, now):
+        entry = self.entries.get(key)
+        if entry is not None and entry['expires_at'] <= now:
+            del self.entries[key]
+            self.stats['expired'] += 1
+            return None
+        return entry
+
+    def sweep_locked(self, now):
+        # Each heap item is pushed once and popped once, so sweeping is amortized O(1) per put
+        removed = 0
+        heap = self.expiry_heap
+        while heap and heap[0][0] <= now:
+            _, sequence, key = heapq.heappop(heap)
+            entry = self.entries.get(key)
+            if entry is not None and entry['sequence'] == sequence:
+                del self.entries[key]
+                self.stats['expired'] += 1
+                removed += 1
+        return removed
+
+    def evict_soonest_locked(self):
+        # At capacity: drop the live token closest to expiry
+        while self.expiry_heap:
+            _, sequence, key = heapq.heappop(self.expiry_heap)
+            entry = self.entries.get(key)
+            if entry is not None and entry['sequence'] == sequence:
+                del self.entries[key]
+                self.stats['evicted'] += 1
+                return
+
+    def compact_locked(self):
+        # Stale items from replaced or consumed tokens are bounded to the live entry count
+        if len(self.expiry_heap) > 2 * len(self.entries) + 64:
+            self.expiry_heap = [
+                (entry['expires_at'], entry['sequence'], key) for key, entry in self.entries.items()
+            ]
+            heapq.heapify(self.expiry_heap)
+
+    def get_stats(self):
+        """Get counters and current size"""
+        with self.lock:
+            return dict(self.stats, active=len(self.entries), heap_size=len(self.expiry_heap))
+
+
+class SQLiteTokenStore:
+    """TokenStore interface over an otps table in the voter database, shared by worker processes"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS otps (
+            key TEXT PRIMARY KEY,
+            token TEXT NOT NULL,
+            data TEXT,
+            expires_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_otps_expires ON otps(expires_at);
+    """
+
+    def __init__(self, storage, ttl=300, max_attempts=5, clock=time.time):
+        # storage is an SQLiteVoterStorage; its pooled per-thread connections are reused here.
+        # Wall-clock time: expiry stamps are compared across processes
+        self.storage = storage
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.stats = {'issued': 0, 'verified': 0, 'failed': 0, 'expired': 0, 'locked': 0}
+
+        storage.connection().executescript(self.SCHEMA)
+        storage.release()
+
+    def __len__(self):
+        return self.storage.connection().execute(
+            'SELECT COUNT(*) FROM otps WHERE expires_at > ?', (self.clock(),)
+        ).fetchone()[0]
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def put(self, key, token, ttl=None, data=None):
+        """Store a token for key, replacing any previous one and resetting its attempts"""
+        now = self.clock()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        conn = self.storage.connection()
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            expired = conn.execute('DELETE FROM otps WHERE expires_at <= ?', (now,)).rowcount
+            conn.execute(
+                'INSERT OR REPLACE INTO otps (key, token, data, expires_at, attempts) VALUES (?, ?, ?, ?, 0)',
+                (key, str(token), json.dumps(data), expires_at)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        self.count('expired', expired)
+        self.count('issued')
+
+    def get(self, key):
+        """Get the live entry for key as a dict, or None"""
+        now = self.clock()
+        row = self.storage.connection().execute(
+            'SELECT token, data, expires_at, attempts FROM otps WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+
+        token, data, expires_at, attempts = row
+        return {
+            'token': token,
+            'data': json.loads(data),
+            'expires_at': expires_at,
+            'attempts': attempts,
+            'expires_in': expires_at - now
+        }
+
+    def verify(self, key, token, consume=True):
+        """Check a token in constant time; too many wrong guesses revoke it"""
+        now = self.clock()
+        conn = self.storage.connection()
+
+        # Read and update in one write transaction so concurrent guesses from other
+        # processes are counted and a token is consumed at most once
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT token, expires_at, attempts FROM otps WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                outcome = None
+            elif row[1] <= now:
+                conn.execute('DELETE FROM otps WHERE key = ?', (key,))
+                outcome = 'expired'
+            elif hmac.compare_digest(row[0].encode(), str(token).encode()):
+                if consume:
+                    conn.execute('DELETE FROM otps WHERE key = ?', (key,))
+                outcome = 'verified'
+            elif row[2] + 1 >= self.max_attempts:
+                conn.execute('DELETE FROM otps WHERE key = ?', (key,))
+                outcome = 'locked'
+            else:
+                conn.execute('UPDATE otps SET attempts = attempts + 1 WHERE key = ?', (key,))
+                outcome = 'failed'
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if outcome == 'locked':
+            self.count('failed')
+        if outcome:
+            self.count(outcome)
+        return outcome == 'verified'
+
+    def discard(self, key):
+        """Remove the token for key, if any"""
+        self.storage.connection().execute('DELETE FROM otps WHERE key = ?', (key,))
+
+    def sweep(self):
+        """Delete every expired entry, returning how many were removed"""
+        removed = self.storage.connection().execute(
+            'DELETE FROM otps WHERE expires_at <= ?', (self.clock(),)
+        ).rowcount
+        self.count('expired', removed)
+        return removed
+
+    def get_stats(self):
+        """Get this process's counters and the shared live token count"""
+        with self.lock:
+            stats = dict(self.stats)
+        return dict(stats, active=len(self))
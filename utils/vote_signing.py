@@ -0,0 +1,164 @@
+"""
+Vote Signing Module
+Ed25519 signatures over canonical vote bytes, with parallel chain audits that skip verified block ranges
+"""
+
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from utils.key_manager import load_or_create_private_key
+
+# Vote fields that carry the signature itself and are left out of the signed bytes
+SIGNATURE_FIELDS = ('signature', 'signature_key')
+
+
+def canonical_vote_bytes(vote_data):
+    """Serialize a vote record deterministically: sorted keys, no whitespace, UTF-8"""
+    signed = {key: value for key, value in vote_data.items() if key not in SIGNATURE_FIELDS}
+    return json.dumps(signed, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def public_key_id(public_key):
+    """Short stable identifier of a public key, stored with each signature"""
+    raw = public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+class VoteSigner:
+    """Signs vote records with an Ed25519 key, optionally persisted as a PEM file"""
+
+    def __init__(self, private_key=None, key_path=None):
+        self.key_path = key_path
+        if private_key is None:
+            private_key = (load_or_create_private_key(key_path, Ed25519PrivateKey.generate) if key_path
+                           else Ed25519PrivateKey.generate())
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        self.key_id = public_key_id(self.public_key)
+
+    def sign(self, vote_data):
+        """Get the hex signature of a vote record"""
+        return self.private_key.sign(canonical_vote_bytes(vote_data)).hex()
+
+    def sign_vote(self, vote_data):
+        """Add signature and signature_key fields to a vote record"""
+        vote_data['signature'] = self.sign(vote_data)
+        vote_data['signature_key'] = self.key_id
+        return vote_data
+
+    def verify(self, vote_data, signature):
+        """Check a hex signature against this signer's public key"""
+        return verify_with_key(self.public_key, vote_data, signature)
+
+    def export_public_key(self):
+        return self.public_key.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+
+
+def verify_with_key(public_key, vote_data, signature):
+    """Check a hex signature over the canonical vote bytes"""
+    try:
+        public_key.verify(bytes.fromhex(signature), canonical_vote_bytes(vote_data))
+        return True
+    except (InvalidSignature, ValueError, TypeError):
+        return False
+
+
+class SignatureAuditor:
+    """Verifies vote signatures across a chain in parallel batches, remembering verified block ranges"""
+
+    def __init__(self, public_keys, max_workers=4, batch_size=256):
+        # public_keys maps key ID to Ed25519 public key, so votes signed before a key rotation still verify
+        self.public_keys = dict(public_keys)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='signature-audit')
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        # Disjoint [start, end, hash of block end] ranges, ascending. A range is trusted while its last
+        # block's hash is unchanged: the hash chain pins every earlier block, and is_chain_valid checks it
+        self.verified_ranges = []
+
+    def add_public_key(self, public_key):
+        self.public_keys[public_key_id(public_key)] = public_key
+
+    def verify_blocks(self, blocks):
+        """Worker task: get (block index, reason) for each bad vote in a batch of blocks"""
+        failures = []
+        for block in blocks:
+            for vote in block.votes:
+                public_key = self.public_keys.get(vote.get('signature_key'))
+                if public_key is None:
+                    failures.append((block.index, 'unknown signing key'))
+                elif not verify_with_key(public_key, vote, vote.get('signature', '')):
+                    failures.append((block.index, 'invalid signature'))
+        return failures
+
+    def trusted_ranges(self, chain):
+        """Drop cached ranges whose last block changed or no longer exists"""
+        self.verified_ranges = [
+            (start, end, end_hash) for start, end, end_hash in self.verified_ranges
+            if end < len(chain) and chain[end].hash == end_hash
+        ]
+        return self.verified_ranges
+
+    def unverified_ranges(self, chain):
+        """Get [start, end] block ranges not yet verified, skipping the genesis block"""
+        gaps = []
+        position = 1
+        for start, end, _ in self.trusted_ranges(chain):
+            if start > position:
+                gaps.append((position, start - 1))
+            position = max(position, end + 1)
+        if position < len(chain):
+            gaps.append((position, len(chain) - 1))
+        return gaps
+
+    def mark_verified(self, start, end, end_hash):
+        """Record a verified range, merging it with adjacent or overlapping ranges"""
+        merged = []
+        for range_start, range_end, range_hash in sorted(self.verified_ranges + [(start, end, end_hash)]):
+            if merged and range_start <= merged[-1][1] + 1:
+                if range_end >= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], range_end, range_hash)
+            else:
+                merged.append((range_start, range_end, range_hash))
+        self.verified_ranges = merged
+
+    def audit(self, chain):
+        """Verify every vote signature not already covered by a verified range"""
+        with self.lock:
+            batches = []
+            for start, end in self.unverified_ranges(chain):
+                for batch_start in range(start, end + 1, self.batch_size):
+                    batch_end = min(batch_start + self.batch_size - 1, end)
+                    batches.append((batch_start, batch_end, chain[batch_start:batch_end + 1]))
+
+            futures = [self.executor.submit(self.verify_blocks, blocks) for _, _, blocks in batches]
+
+            failures = []
+            checked = 0
+            for (batch_start, batch_end, blocks), future in zip(batches, futures):
+                batch_failures = future.result()
+                checked += len(blocks)
+                if batch_failures:
+                    failures.extend(batch_failures)
+                else:
+                    self.mark_verified(batch_start, batch_end, blocks[-1].hash)
+
+            return {
+                'valid': not failures,
+                'checked_blocks': checked,
+                'skipped_blocks': max(0, len(chain) - 1 - checked),
+                'failures': [{'block_index': index, 'reason': reason} for index, reason in failures[:100]],
+                'verified_ranges': [[start, end] for start, end, _ in self.verified_ranges]
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,263 @@
+"""
+Columnar Vote Store
+NumPy-backed, dictionary-encoded vote columns for vectorized analytics
+"""
+
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from utils.time_buckets import EPOCH, wall_clock_seconds
+
+UNKNOWN = 'unknown'
+
+DIMENSIONS = ('candidate', 'region', 'age_group', 'gender')
+
+
+class CodeBook:
+    """Dictionary encoding between category labels and dense integer codes"""
+
+    def __init__(self):
+        self.codes = {}
+        self.labels = []
+
+    def encode(self, label):
+        """Get the code for a label, assigning the next code if unseen"""
+        label = UNKNOWN if label in (None, '') else label
+        code = self.codes.get(label)
+        if code is None:
+            code = len(self.labels)
+            self.codes[label] = code
+            self.labels.append(label)
+        return code
+
+    def decode(self, code):
+        """Get the label for a code"""
+        return self.labels[code]
+
+    def __len__(self):
+        return len(self.labels)
+
+
+class ColumnarVoteStore:
+    """Append-only columns of vote attributes with amortized doubling growth"""
+
+    def __init__(self, initial_capacity=1024):
+        self.lock = threading.Lock()
+        self.size = 0
+        self.codebooks = {dimension: CodeBook() for dimension in DIMENSIONS}
+        self.columns = {
+            'timestamp': np.zeros(initial_capacity, dtype=np.int64),
+            'voter_key': np.zeros(initial_capacity, dtype=np.int64)
+        }
+        for dimension in DIMENSIONS:
+            self.columns[dimension] = np.zeros(initial_capacity, dtype=np.int32)
+
+    def __len__(self):
+        return self.size
+
+    def ensure_capacity(self, required):
+        """Grow every column geometrically so appends are amortized O(1)"""
+        capacity = len(self.columns['timestamp'])
+        if required <= capacity:
+            return
+
+        new_capacity = max(required, capacity * 2)
+        for name, column in self.columns.items():
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def append(self, voter_id, candidate_id, timestamp, demographics=None):
+        """Append a single vote"""
+        self.append_many([(voter_id, candidate_id, timestamp, demographics)])
+
+    def append_many(self, votes):
+        """Append (voter_id, candidate_id, timestamp, demographics) tuples"""
+        votes = list(votes)
+        if not votes:
+            return
+
+        with self.lock:
+            start = self.size
+            self.ensure_capacity(start + len(votes))
+
+            for offset, (voter_id, candidate_id, timestamp, demographics) in enumerate(votes):
+                row = start + offset
+                demographics = demographics or {}
+                self.columns['timestamp'][row] = wall_clock_seconds(timestamp)
+                self.columns['voter_key'][row] = voter_key(voter_id)
+                self.columns['candidate'][row] = self.codebooks['candidate'].encode(candidate_id)
+                for dimension in ('region', 'age_group', 'gender'):
+                    self.columns[dimension][row] = self.codebooks[dimension].encode(
+                        demographics.get(dimension)
+                    )
+
+            self.size = start + len(votes)
+
+    def column(self, name):
+        """Get a read-only view over the filled part of a column"""
+        return self.snapshot(name)[name]
+
+    def snapshot(self, *names):
+        """Get read-only views of several columns cut at the same row count
+
+        The size and the column arrays are read together under the lock, so the views line up
+        even while appends grow or replace the arrays; filled rows are never written again.
+        """
+        with self.lock:
+            size = self.size
+            views = {name: self.columns[name][:size] for name in names}
+        for view in views.values():
+            view.flags.writeable = False
+        return views
+
+    def build_mask(self, filters=None, start=None, end=None, views=None):
+        """Build a boolean row mask from label filters and a time range"""
+        # views lets callers mask columns from their own snapshot; otherwise one is taken here
+        filters = filters or {}
+        if views is None:
+            names = list(filters)
+            if start is not None or end is not None:
+                names.append('timestamp')
+            views = self.snapshot(*names) if names else {}
+        size = len(next(iter(views.values()))) if views else self.size
+        mask = np.ones(size, dtype=bool)
+
+        for dimension, label in filters.items():
+            code = self.codebooks[dimension].codes.get(label)
+            if code is None:
+                return np.zeros(size, dtype=bool)
+            mask &= views[dimension] == code
+
+        if start is not None:
+            mask &= views['timestamp'] >= wall_clock_seconds(start)
+        if end is not None:
+            mask &= views['timestamp'] <= wall_clock_seconds(end)
+
+        return mask
+
+    def count(self, filters=None, start=None, end=None):
+        """Count votes matching filters"""
+        if not filters and start is None and end is None:
+            return self.size
+        return int(np.count_nonzero(self.build_mask(filters, start, end)))
+
+    def recount_unique_voters(self):
+        """Count distinct voters from the voter_key column; the voter storage's voted
+        counter gives the same number in O(1), so this is for consistency checks"""
+        return int(np.unique(self.column('voter_key')).size)
+
+    def breakdown(self, dimension, filters=None):
+        """Get vote counts per label of one dimension"""
+        views = self.snapshot(dimension, *(filters or {}))
+        codes = views[dimension]
+        if filters:
+            codes = codes[self.build_mask(filters, views=views)]
+
+        counts = np.bincount(codes, minlength=len(self.codebooks[dimension]))
+        return {
+            self.codebooks[dimension].decode(code): int(count)
+            for code, count in enumerate(counts) if count
+        }
+
+    def crosstab(self, row_dimension, column_dimension, filters=None):
+        """Get a nested {row label: {column label: count}} contingency table"""
+        views = self.snapshot(row_dimension, column_dimension, *(filters or {}))
+        rows, cols = views[row_dimension], views[column_dimension]
+        if filters:
+            mask = self.build_mask(filters, views=views)
+            rows, cols = rows[mask], cols[mask]
+
+        num_rows = len(self.codebooks[row_dimension])
+        num_cols = len(self.codebooks[column_dimension])
+        table = np.bincount(
+            rows.astype(np.int64) * num_cols + cols,
+            minlength=num_rows * num_cols
+        ).reshape(num_rows, num_cols)
+
+        return {
+            self.codebooks[row_dimension].decode(r): {
+                self.codebooks[column_dimension].decode(c): int(table[r, c])
+                for c in np.flatnonzero(table[r])
+            }
+            for r in np.flatnonzero(table.sum(axis=1))
+        }
+
+    def candidate_time_series(self, resolution=3600, filters=None):
+        """Get per-candidate vote counts per time bucket"""
+        views = self.snapshot('timestamp', 'candidate', *(filters or {}))
+        timestamps, candidates = views['timestamp'], views['candidate']
+        if filters:
+            mask = self.build_mask(filters, views=views)
+            timestamps, candidates = timestamps[mask], candidates[mask]
+        if timestamps.size == 0:
+            return {'bucket_starts': [], 'series': {}}
+
+        buckets = timestamps // resolution
+        first_bucket = int(buckets.min())
+        num_buckets = int(buckets.max()) - first_bucket + 1
+        num_candidates = len(self.codebooks['candidate'])
+
+        table = np.bincount(
+            candidates.astype(np.int64) * num_buckets + (buckets - first_bucket),
+            minlength=num_candidates * num_buckets
+        ).reshape(num_candidates, num_buckets)
+
+        return {
+            'bucket_starts': [
+                (EPOCH + timedelta(seconds=(first_bucket + b) * resolution)).isoformat()
+                for b in range(num_buckets)
+            ],
+            'series': {
+                self.codebooks['candidate'].decode(c): table[c].tolist()
+                for c in np.flatnonzero(table.sum(axis=1))
+            }
+        }
+
+    def to_records(self):
+        """Materialize rows as dicts, without voter identifiers"""
+        views = self.snapshot('timestamp', *DIMENSIONS)
+        timestamps = views['timestamp'].tolist()
+        decoded = {
+            dimension: [self.codebooks[dimension].decode(c) for c in views[dimension].tolist()]
+            for dimension in DIMENSIONS
+        }
+
+        return [
+            {
+                'candidate_id': decoded['candidate'][i],
+                'timestamp': (EPOCH + timedelta(seconds=timestamps[i])).isoformat(),
+                'region': decoded['region'][i],
+                'age_group': decoded['age_group'][i],
+                'gender': decoded['gender'][i]
+            }
+            for i in range(len(timestamps))
+        ]
+
+
+def voter_key(voter_id):
+    """Derive a stable 63-bit key from a voter ID so raw IDs are not stored"""
+    digest = hashlib.sha256(str(voter_id).encode()).digest()
+    return int.from_bytes(digest[:8], 'big') >> 1
+
+
+def age_group_from_dob(date_of_birth, today=None):
+    """Bucket an ISO date of birth into an age group label"""
+    if not date_of_birth:
+        return UNKNOWN
+
+    try:
+        born = datetime.fromisoformat(date_of_birth)
+    except ValueError:
+        return UNKNOWN
+
+    today = today or datetime.now()
+    age = today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+
+    for upper, label in ((25, '18-24'), (35, '25-34'), (45, '35-44'), (55, '45-54'), (65, '55-64')):
+        if age < upper:
+            return label
+    return '65+'
@@ -0,0 +1,261 @@
+"""
+Voter Roll Import Module
+Streams CSV or NDJSON voter rolls into voter storage with parallel password hashing
+
+Usage: python -m utils.voter_import roll.csv [--db voters.db] [--approve] [--rejects rejects.ndjson]
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.security import hash_password
+from utils.voter_management import build_voter_record, REQUIRED_FIELDS
+from utils.voter_storage import SQLiteVoterStorage
+
+
+class VoterRollImporter:
+    """Validates, hashes and writes voter roll rows in large batches"""
+
+    def __init__(self, storage, batch_size=5000, workers=None, approve=False,
+                 checkpoint_path=None, rejects_path=None, progress=None):
+        # Rows go straight to the storage backend; a VoterManager would start a credential
+        # pool and OTP store the import never uses
+        self.storage = storage
+        self.batch_size = batch_size
+        self.workers = os.cpu_count() if workers is None else workers
+        self.approve = approve
+        self.checkpoint_path = checkpoint_path
+        self.rejects_path = rejects_path
+        self.progress = progress
+
+    def read_rows(self, path, file_format=None):
+        """Yield (row number, row dict) from a CSV or NDJSON file"""
+        file_format = file_format or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        with open(path, newline='', encoding='utf-8') as f:
+            if file_format == 'csv':
+                for row_number, row in enumerate(csv.DictReader(f), start=1):
+                    yield row_number, row
+            else:
+                for row_number, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield row_number, json.loads(line)
+                    except ValueError:
+                        yield row_number, None
+
+    def validate_row(self, row):
+        """Get the rejection reason for a row, or None if it is valid"""
+        if not isinstance(row, dict):
+            return 'Malformed row'
+
+        missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or '').strip()]
+        if missing:
+            return f"Missing required fields: {', '.join(missing)}"
+
+        # NDJSON values can be numbers, lists or objects
+        not_text = [field for field in REQUIRED_FIELDS if not isinstance(row[field], str)]
+        if not_text:
+            return f"Fields must be text: {', '.join(not_text)}"
+
+        if '@' not in row['email']:
+            return 'Invalid email'
+
+        return None
+
+    def load_checkpoint(self, path):
+        """Get the saved progress for this source file, if any"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+
+        if checkpoint.get('source') != os.path.abspath(path) or checkpoint.get('completed'):
+            return None
+        return checkpoint
+
+    def save_checkpoint(self, stats):
+        """Atomically persist progress after a committed batch"""
+        if not self.checkpoint_path:
+            return
+
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(stats, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def hash_passwords(self, pool, passwords):
+        """Hash a batch of passwords, across the process pool if there is one"""
+        if pool is None:
+            return [hash_password(p) for p in passwords]
+
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(pool.map(hash_password, passwords, chunksize=chunksize))
+
+    def write_batch(self, pool, batch, stats, rejects_file):
+        """Hash, build and store one batch of validated rows"""
+        hashed = self.hash_passwords(pool, [row['password'] for _, row in batch])
+
+        records = [
+            build_voter_record(row, hashed_password, approved=self.approve)
+            for (_, row), hashed_password in zip(batch, hashed)
+        ]
+        # The last row number goes into the same transaction, so a resumed run can tell this
+        # batch's voters from ones that were already registered
+        existing = self.storage.add_many(records, progress=(stats['import_id'], batch[-1][0]))
+        self.count_batch(batch, stats, rejects_file, existing)
+
+    def count_batch(self, batch, stats, rejects_file, existing):
+        """Count a stored batch, rejecting rows whose voter IDs already existed"""
+        for row_number, row in batch:
+            if row['voter_id'] in existing:
+                self.reject(stats, rejects_file, row_number, row, 'Voter already registered')
+        stats['imported'] += len(batch) - len(existing)
+
+    def reject(self, stats, rejects_file, row_number, row, reason):
+        """Count a rejected row and append it to the rejects file"""
+        stats['rejected'] += 1
+        stats['reject_reasons'][reason] = stats['reject_reasons'].get(reason, 0) + 1
+
+        if rejects_file:
+            voter_id = row.get('voter_id') if isinstance(row, dict) else None
+            rejects_file.write(json.dumps({
+                'row': row_number,
+                'voter_id': voter_id,
+                'reason': reason
+            }) + '\n')
+
+    def import_file(self, path, file_format=None):
+        """Import a roll file, resuming from the last checkpoint if one matches"""
+        checkpoint = self.load_checkpoint(path)
+        stats = checkpoint or {
+            'source': os.path.abspath(path),
+            'rows_processed': 0,
+            'imported': 0,
+            'rejected': 0,
+            'reject_reasons': {},
+            'rejects_offset': None,
+            'completed': False
+        }
+        # Names this run in storage; checkpoints saved before import IDs get one on resume
+        stats.setdefault('import_id', secrets.token_hex(8))
+        resume_after = stats['rows_processed']
+
+        # A batch stored after the checkpoint was last saved is counted again, not written again
+        stored = self.storage.import_progress(stats['import_id'])
+        if stored and stored[0] <= resume_after:
+            stored = None
+
+        start = time.perf_counter()
+        rows_this_run = 0
+        seen_in_batch = set()
+        batch = []
+
+        pool = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        rejects_file = self.open_rejects(stats) if self.rejects_path else None
+        if not checkpoint:
+            # Saved before the first batch, so a run stopped during it resumes as this import
+            self.save_checkpoint(stats)
+
+        last_row_number = resume_after
+
+        try:
+            for row_number, row in self.read_rows(path, file_format):
+                if row_number <= resume_after:
+                    continue
+
+                last_row_number = row_number
+                rows_this_run += 1
+                reason = self.validate_row(row)
+                if reason is None and row['voter_id'] in seen_in_batch:
+                    reason = 'Duplicate voter ID in file'
+
+                if reason:
+                    self.reject(stats, rejects_file, row_number, row, reason)
+                else:
+                    seen_in_batch.add(row['voter_id'])
+                    batch.append((row_number, row))
+
+                if stored and row_number == stored[0]:
+                    self.count_batch(batch, stats, rejects_file, stored[1])
+                    stored = None
+                elif not stored and len(batch) >= self.batch_size:
+                    self.write_batch(pool, batch, stats, rejects_file)
+                else:
+                    continue
+                self.commit_progress(stats, row_number, rows_this_run, start, rejects_file)
+                batch = []
+                seen_in_batch = set()
+
+            if batch:
+                self.write_batch(pool, batch, stats, rejects_file)
+            stats['completed'] = True
+            self.commit_progress(stats, last_row_number, rows_this_run, start, rejects_file)
+        finally:
+            if pool:
+                pool.shutdown()
+            if rejects_file:
+                rejects_file.close()
+
+        return stats
+
+    def open_rejects(self, stats):
+        """Open the rejects file for appending, cut back to the checkpoint when resuming"""
+        rejects_file = open(self.rejects_path, 'a+b')
+        # Rows after the checkpoint are processed again, so rejects written for them are dropped
+        if stats.get('rejects_offset') is not None:
+            rejects_file.truncate(stats['rejects_offset'])
+        stats['rejects_offset'] = rejects_file.seek(0, os.SEEK_END)
+        return io.TextIOWrapper(rejects_file, encoding='utf-8')
+
+    def commit_progress(self, stats, row_number, rows_this_run, start, rejects_file):
+        """Record progress after a batch has been written"""
+        elapsed = time.perf_counter() - start
+        stats['rows_processed'] = row_number
+        stats['rows_per_second'] = round(rows_this_run / elapsed, 1) if elapsed > 0 else 0.0
+
+        if rejects_file:
+            rejects_file.flush()
+            stats['rejects_offset'] = rejects_file.buffer.tell()
+        self.save_checkpoint(stats)
+
+        if self.progress:
+            self.progress(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import a voter roll file')
+    parser.add_argument('path', help='CSV or NDJSON voter roll')
+    parser.add_argument('--format', choices=['csv', 'ndjson'])
+    parser.add_argument('--db', default=os.environ.get('VOTER_DB_PATH', 'voters.db'))
+    parser.add_argument('--approve', action='store_true', help='Import voters as already approved')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--checkpoint', help='Progress file used to resume (default: <path>.checkpoint)')
+    parser.add_argument('--rejects', help='NDJSON file that receives rejected rows')
+    args = parser.parse_args()
+
+    importer = VoterRollImporter(
+        SQLiteVoterStorage(args.db),
+        batch_size=args.batch_size,
+        workers=args.workers,
+        approve=args.approve,
+        checkpoint_path=args.checkpoint or args.path + '.checkpoint',
+        rejects_path=args.rejects,
+        progress=lambda s: print(f"{s['rows_processed']:,} rows, {s['imported']:,} imported, "
+                                 f"{s['rejected']:,} rejected, {s['rows_per_second']:,} rows/s")
+    )
+    stats = importer.import_file(args.path, args.format)
+    print(json.dumps(stats, indent=4))
+
+
+if __name__ == '__main__':
+    main()
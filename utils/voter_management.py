@@ -3,90 +3,136 @@ Voter Management Module
 Handles voter registration, authentication, and profile management
 """
 
+import base64
+import binascii
+import hashlib
 import json
 import secrets
-from datetime import datetime, timedelta
-from utils.security import hash_password, verify_password, generate_otp, verify_qr_data
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+from utils.security import hash_password, generate_otp, generate_qr_data, verify_qr_data
+from utils.credential_pool import CredentialVerifier
+from utils.vote_store import age_group_from_dob, UNKNOWN
+from utils.voter_storage import MemoryVoterStorage
+from utils.search_index import TrigramIndex
+from utils.token_store import TokenStore
+
+REQUIRED_FIELDS = ['voter_id', 'name', 'email', 'phone', 'password', 'national_id']
 
 class VoterManager:
     """Manages voter registration and authentication"""
     
-    def __init__(self):
-        self.voters = {}
-        self.voted_voters = set()
-        self.pending_registrations = {}
-        self.otp_storage = {}
+    def __init__(self, storage=None, qr_cache_size=10_000, credential_verifier=None, otp_store=None):
+        self.storage = storage or MemoryVoterStorage()
+        self.credential_verifier = credential_verifier or CredentialVerifier()
         self.feedback_storage = []
+        
+        # QR payloads are built on first request and kept in a bounded LRU cache
+        self.qr_cache = OrderedDict()
+        self.qr_cache_size = qr_cache_size
+        self.qr_cache_lock = threading.Lock()
+        
+        # OTPs are keyed by phone, live 5 minutes and allow 5 wrong guesses; the default store
+        # is process-local, so multi-worker deployments pass an SQLiteTokenStore
+        self.otp_store = otp_store if otp_store is not None else TokenStore(ttl=300, max_attempts=5)
+        
+        # Search covers approved voters; the index is built by start_search_index (or else the
+        # first search) and then follows the storage change sequence, which also sees other
+        # processes' writes
+        self.search_index = None
+        self.search_version = 0
+        self.search_lock = threading.Lock()
     
     def register_voter(self, voter_data):
         """Register a new voter"""
         voter_id = voter_data.get('voter_id')
         
         # Check if voter already exists
-        if voter_id in self.voters:
+        if self.storage.voter_exists(voter_id):
             return {'success': False, 'message': 'Voter already registered'}
         
         # Validate required fields
-        required_fields = ['voter_id', 'name', 'email', 'phone', 'password', 'national_id']
-        if not all(field in voter_data for field in required_fields):
+        if not all(field in voter_data for field in REQUIRED_FIELDS):
             return {'success': False, 'message': 'Missing required fields'}
         
         # Hash password
         hashed_password = hash_password(voter_data['password'])
         
         # Create voter record
-        voter_record = {
-            'voter_id': voter_id,
-            'name': voter_data['name'],
-            'email': voter_data['email'],
-            'phone': voter_data['phone'],
-            'password': hashed_password,
-            'national_id': voter_data['national_id'],
-            'address': voter_data.get('address', ''),
-            'date_of_birth': voter_data.get('date_of_birth', ''),
-            'registration_date': datetime.now().isoformat(),
-            'approved': False,
-            'active': True,
-            'biometric_registered': False,
-            'qr_code': self.generate_voter_qr(voter_id)
-        }
+        voter_record = build_voter_record(voter_data, hashed_password)
         
         # Store in pending registrations
-        self.pending_registrations[voter_id] = voter_record
+        if not self.storage.add_pending(voter_record):
+            return {'success': False, 'message': 'Voter already registered'}
         
         return {'success': True, 'message': 'Registration submitted for approval'}
     
     def approve_voter(self, voter_id):
         """Approve voter registration"""
-        if voter_id in self.pending_registrations:
-            voter_record = self.pending_registrations[voter_id]
-            voter_record['approved'] = True
-            voter_record['approval_date'] = datetime.now().isoformat()
-            
-            # Move to active voters
-            self.voters[voter_id] = voter_record
-            del self.pending_registrations[voter_id]
-            
+        # Move to active voters
+        voter_record = self.storage.approve(voter_id, datetime.now().isoformat())
+        if voter_record:
             return {'success': True, 'message': 'Voter approved'}
         
         return {'success': False, 'message': 'Voter not found in pending registrations'}
     
+    def approve_voters(self, voter_ids=None, filters=None, approve_all=False):
+        """Approve many pending registrations by explicit ID list or by filter"""
+        if voter_ids is None and not filters:
+            # An empty filter matches every pending registration, so that has to be asked for explicitly
+            if not approve_all:
+                return {'success': False,
+                        'message': 'Provide voter_ids or filters, or set all to approve every pending voter'}
+            filters = {}
+        
+        try:
+            approved = self.storage.approve_many(datetime.now().isoformat(), voter_ids, filters)
+        except ValueError as e:
+            return {'success': False, 'message': str(e)}
+        
+        approved_ids = {voter['voter_id'] for voter in approved}
+        
+        if voter_ids is not None:
+            results = [
+                {'voter_id': voter_id, 'success': True, 'message': 'Voter approved'}
+                if voter_id in approved_ids else
+                {'voter_id': voter_id, 'success': False,
+                 'message': 'Voter not found in pending registrations'}
+                for voter_id in voter_ids
+            ]
+        else:
+            results = [
+                {'voter_id': voter['voter_id'], 'success': True, 'message': 'Voter approved'}
+                for voter in approved
+            ]
+        
+        return {
+            'success': True,
+            'approved_count': len(approved),
+            'failed_count': len(results) - len(approved),
+            'results': results
+        }
+    
     def verify_voter(self, voter_id, password, otp=None, biometric=None):
         """Verify voter credentials with multi-factor authentication"""
         # Check if voter exists
-        if voter_id not in self.voters:
+        voter = self.storage.get_voter(voter_id)
+        if not voter:
             return None
         
-        voter = self.voters[voter_id]
-        
         # Check if voter is active and approved
         if not voter['approved'] or not voter['active']:
             return None
         
-        # Verify password
-        if not verify_password(password, voter['password']):
+        # Verify password off the request thread; raises CredentialQueueFull when saturated
+        password_ok, upgraded_hash = self.credential_verifier.verify(password, voter['password'])
+        if not password_ok:
             return None
         
+        if upgraded_hash:
+            self.storage.update_voter(voter_id, {'password': upgraded_hash})
+        
         # Verify OTP if provided
         if otp:
             if not self.verify_otp(voter_id, otp):
@@ -102,12 +148,7 @@ class VoterManager:
     def send_otp(self, phone):
         """Generate and send OTP to phone number"""
         otp = generate_otp()
-        
-        # Store OTP with expiration (5 minutes)
-        self.otp_storage[phone] = {
-            'otp': otp,
-            'expires_at': (datetime.now() + timedelta(minutes=5)).isoformat()
-        }
+        self.otp_store.put(phone, otp)
         
         # In production, integrate with SMS gateway
         print(f"OTP for {phone}: {otp}")
@@ -116,62 +157,67 @@ class VoterManager:
     
     def verify_otp(self, voter_id, otp):
         """Verify OTP"""
-        if voter_id not in self.voters:
-            return False
-        
-        phone = self.voters[voter_id]['phone']
-        
-        if phone not in self.otp_storage:
-            return False
-        
-        stored_otp_data = self.otp_storage[phone]
-        
-        # Check expiration
-        if datetime.now() > datetime.fromisoformat(stored_otp_data['expires_at']):
-            del self.otp_storage[phone]
+        # Registration sends an OTP before approval, so pending voters can verify too
+        voter = self.storage.get_voter(voter_id) or self.storage.get_pending(voter_id)
+        if not voter:
             return False
         
-        # Verify OTP
-        if stored_otp_data['otp'] == otp:
-            del self.otp_storage[phone]
-            return True
-        
-        return False
+        return self.otp_store.verify(voter['phone'], otp)
     
     def generate_voter_qr(self, voter_id):
         """Generate QR code data for voter"""
-        from utils.security import generate_qr_data
         return generate_qr_data(voter_id, datetime.now().isoformat())
     
+    def get_voter_qr(self, voter_id):
+        """Get a voter's QR payload, generating it on first request"""
+        with self.qr_cache_lock:
+            qr_code = self.qr_cache.get(voter_id)
+            if qr_code is not None:
+                self.qr_cache.move_to_end(voter_id)
+                return qr_code
+        
+        if not self.storage.get_voter(voter_id):
+            return None
+        
+        # Payloads are self-verifying, so an evicted one is simply regenerated;
+        # earlier payloads for the same voter still verify
+        qr_code = self.generate_voter_qr(voter_id)
+        with self.qr_cache_lock:
+            qr_code = self.qr_cache.setdefault(voter_id, qr_code)
+            self.qr_cache.move_to_end(voter_id)
+            while len(self.qr_cache) > self.qr_cache_size:
+                self.qr_cache.popitem(last=False)
+        return qr_code
+    
     def verify_qr_code(self, qr_data):
         """Verify QR code and extract voter info"""
         voter_info = verify_qr_data(qr_data)
         
-        if voter_info and voter_info['voter_id'] in self.voters:
-            return self.voters[voter_info['voter_id']]
+        if voter_info:
+            return self.storage.get_voter(voter_info['voter_id'])
         
         return None
     
     def register_biometric(self, voter_id, biometric_type, biometric_data):
         """Register biometric data for voter"""
-        if voter_id in self.voters:
-            if 'biometrics' not in self.voters[voter_id]:
-                self.voters[voter_id]['biometrics'] = {}
+        voter = self.storage.get_voter(voter_id)
+        if voter:
+            biometrics = dict(voter.get('biometrics', {}))
+            biometrics[biometric_type] = biometric_data
             
-            self.voters[voter_id]['biometrics'][biometric_type] = biometric_data
-            self.voters[voter_id]['biometric_registered'] = True
-            
-            return True
+            return self.storage.update_voter(voter_id, {
+                'biometrics': biometrics,
+                'biometric_registered': True
+            })
         
         return False
     
     def verify_biometric(self, voter_id, biometric_data):
         """Verify biometric data"""
-        if voter_id not in self.voters:
+        voter = self.storage.get_voter(voter_id)
+        if not voter:
             return False
         
-        voter = self.voters[voter_id]
-        
         if not voter.get('biometric_registered'):
             return False
         
@@ -181,17 +227,42 @@ class VoterManager:
     
     def has_voted(self, voter_id):
         """Check if voter has already voted"""
-        return voter_id in self.voted_voters
+        return self.storage.has_voted(voter_id)
     
     def mark_as_voted(self, voter_id):
-        """Mark voter as having voted"""
-        self.voted_voters.add(voter_id)
+        """Atomically mark voter as having voted, False if already marked"""
+        return self.storage.mark_as_voted(voter_id)
+    
+    def get_voter(self, voter_id):
+        """Get an approved voter record"""
+        return self.storage.get_voter(voter_id)
+    
+    def get_voter_demographics(self, voter_id):
+        """Get the analytics dimensions for a voter"""
+        return self.demographics_from_record(self.storage.get_voter(voter_id) or {})
+    
+    def demographics_from_record(self, voter):
+        """Get the analytics dimensions from a voter record"""
+        return {
+            'region': voter.get('region') or UNKNOWN,
+            'age_group': age_group_from_dob(voter.get('date_of_birth')),
+            'gender': voter.get('gender') or UNKNOWN
+        }
+    
+    def get_registration_counts(self):
+        """Get (analytics dimensions, count) for approved and active voters"""
+        # Storage counts by date of birth; folding into age groups leaves a few hundred cells
+        counts = Counter()
+        for fields, count in self.storage.registration_counts():
+            counts[tuple(self.demographics_from_record(fields).items())] += count
+        return [(dict(cell), count) for cell, count in counts.items()]
     
     def get_all_voters(self):
         """Get all registered voters"""
         voters_list = []
         
-        for voter_id, voter in self.voters.items():
+        for voter in self.storage.iter_voters():
+            voter_id = voter['voter_id']
             voters_list.append({
                 'voter_id': voter_id,
                 'name': voter['name'],
@@ -200,47 +271,75 @@ class VoterManager:
                 'registration_date': voter['registration_date'],
                 'approved': voter['approved'],
                 'active': voter['active'],
-                'has_voted': voter_id in self.voted_voters
+                'has_voted': self.storage.has_voted(voter_id)
             })
         
         return voters_list
     
     def get_pending_registrations(self):
         """Get all pending voter registrations"""
-        return list(self.pending_registrations.values())
+        return self.storage.iter_pending()
+    
+    def list_voters(self, status='approved', sort='registration_date', order='asc',
+                    cursor=None, limit=50, filters=None):
+        """Get one keyset-paginated page of approved or pending voters"""
+        if status not in ('approved', 'pending'):
+            raise ValueError(f"Unknown status: {status}")
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"Unknown order: {order}")
+        
+        # One extra row tells whether another page follows
+        voters = self.storage.list_voters(
+            approved=status == 'approved',
+            sort=sort,
+            descending=order == 'desc',
+            after=decode_cursor(cursor) if cursor else None,
+            limit=limit + 1,
+            filters=filters
+        )
+        
+        has_more = len(voters) > limit
+        voters = voters[:limit]
+        next_cursor = None
+        if has_more:
+            last = voters[-1]
+            next_cursor = encode_cursor([last[sort], last['voter_id']])
+        
+        return {
+            'voters': voters,
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        }
     
     def update_voter_profile(self, voter_id, updates):
         """Update voter profile information"""
-        if voter_id in self.voters:
-            # Only allow certain fields to be updated
-            allowed_fields = ['email', 'phone', 'address']
-            
-            for field in allowed_fields:
-                if field in updates:
-                    self.voters[voter_id][field] = updates[field]
-            
-            self.voters[voter_id]['last_updated'] = datetime.now().isoformat()
-            
+        # Only allow certain fields to be updated
+        allowed_fields = ['email', 'phone', 'address']
+        
+        changes = {field: updates[field] for field in allowed_fields if field in updates}
+        changes['last_updated'] = datetime.now().isoformat()
+        
+        if self.storage.update_voter(voter_id, changes):
             return {'success': True, 'message': 'Profile updated'}
         
         return {'success': False, 'message': 'Voter not found'}
     
     def deactivate_voter(self, voter_id):
         """Deactivate a voter account"""
-        if voter_id in self.voters:
-            self.voters[voter_id]['active'] = False
-            self.voters[voter_id]['deactivation_date'] = datetime.now().isoformat()
-            
+        if self.storage.update_voter(voter_id, {
+            'active': False,
+            'deactivation_date': datetime.now().isoformat()
+        }):
             return {'success': True, 'message': 'Voter deactivated'}
         
         return {'success': False, 'message': 'Voter not found'}
     
     def reactivate_voter(self, voter_id):
         """Reactivate a voter account"""
-        if voter_id in self.voters:
-            self.voters[voter_id]['active'] = True
-            self.voters[voter_id]['reactivation_date'] = datetime.now().isoformat()
-            
+        if self.storage.update_voter(voter_id, {
+            'active': True,
+            'reactivation_date': datetime.now().isoformat()
+        }):
             return {'success': True, 'message': 'Voter reactivated'}
         
         return {'success': False, 'message': 'Voter not found'}
@@ -256,67 +355,180 @@ class VoterManager:
         return self.feedback_storage
     
     def get_voter_statistics(self):
-        """Get voter statistics"""
-        total_voters = len(self.voters)
-        pending_voters = len(self.pending_registrations)
-        voted_count = len(self.voted_voters)
-        active_voters = sum(1 for v in self.voters.values() if v['active'])
+        """Get voter statistics from the maintained counters"""
+        counters = self.storage.get_counters()
+        total_voters = counters['registered']
+        voted_count = counters['voted']
         
         return {
             'total_registered': total_voters,
-            'pending_approval': pending_voters,
-            'active_voters': active_voters,
+            'pending_approval': counters['pending'],
+            'active_voters': counters['active'],
             'voted_count': voted_count,
             'turnout_percentage': (voted_count / total_voters * 100) if total_voters > 0 else 0
         }
     
+    def check_statistics(self):
+        """Recompute the statistics counters from storage and repair any drift"""
+        maintained, recomputed = self.storage.recount()
+        drift = {
+            name: recomputed[name] - maintained[name]
+            for name in recomputed if recomputed[name] != maintained[name]
+        }
+        
+        return {
+            'consistent': not drift,
+            'counters': recomputed,
+            'drift': drift
+        }
+    
+    def check_votes_recorded(self, voter_id_hashes):
+        """Check that every voter with a recorded vote, given by SHA-256 voter ID hash, is marked as voted"""
+        voted = {hashlib.sha256(voter_id.encode()).hexdigest() for voter_id in self.storage.iter_voted_ids()}
+        recorded = set(voter_id_hashes)
+        return {
+            'voted_voters': len(voted),
+            'recorded_voters': len(recorded),
+            'unmarked_voters': len(recorded - voted)
+        }
+    
     def export_voters(self, format='json'):
         """Export voter data"""
         if format == 'json':
-            return json.dumps(list(self.voters.values()), indent=4)
+            return json.dumps(self.storage.iter_voters(), indent=4)
         elif format == 'csv':
             csv_data = 'voter_id,name,email,phone,registration_date,approved,active,has_voted\n'
-            for voter_id, voter in self.voters.items():
-                has_voted = 'Yes' if voter_id in self.voted_voters else 'No'
+            for voter in self.storage.iter_voters():
+                voter_id = voter['voter_id']
+                has_voted = 'Yes' if self.storage.has_voted(voter_id) else 'No'
                 csv_data += f"{voter_id},{voter['name']},{voter['email']},{voter['phone']},{voter['registration_date']},{voter['approved']},{voter['active']},{has_voted}\n"
             return csv_data
         
         return None
     
-    def search_voters(self, query):
-        """Search voters by name, email, or voter ID"""
-        results = []
-        
-        query_lower = query.lower()
+    def start_search_index(self):
+        """Build the search index on a background thread, so no search request pays for it"""
+        thread = threading.Thread(target=self.build_search_index, name='search-index-build', daemon=True)
+        thread.start()
+        return thread
+    
+    def build_search_index(self):
+        """Build the search index unless it exists; searches wait for a build in progress"""
+        try:
+            with self.search_lock:
+                if self.search_index is None:
+                    self.load_search_index()
+        finally:
+            self.storage.release()
+    
+    def load_search_index(self):
+        """Index every approved voter from their searchable columns; the caller holds search_lock"""
+        # Version first: changes made while the voters are read are applied again next time
+        version = self.storage.change_version()
+        search_index = TrigramIndex()
+        for voter in self.storage.iter_searchable():
+            search_index.add(voter)
+        self.search_index, self.search_version = search_index, version
+    
+    def current_search_index(self):
+        """Get the search index, building it if needed and applying storage changes since"""
+        with self.search_lock:
+            if self.search_index is None:
+                self.load_search_index()
+            else:
+                self.search_version, changed = self.storage.changed_voters(self.search_version)
+                for voter in changed:
+                    self.search_index.add(voter)
+            return self.search_index
+    
+    def search_voters(self, query, limit=20, offset=0, active_only=False):
+        """Search voters by name, email, or voter ID, ranked and paginated"""
+        matches = self.current_search_index().search(query, limit, offset, active_only)
         
-        for voter_id, voter in self.voters.items():
-            if (query_lower in voter['name'].lower() or 
-                query_lower in voter['email'].lower() or 
-                query_lower in voter_id.lower()):
-                
-                results.append({
-                    'voter_id': voter_id,
-                    'name': voter['name'],
-                    'email': voter['email'],
-                    'phone': voter['phone']
-                })
+        results = []
+        for voter_id, score in matches['matches']:
+            voter = self.storage.get_voter(voter_id)
+            if not voter:
+                continue
+            
+            results.append({
+                'voter_id': voter_id,
+                'name': voter['name'],
+                'email': voter['email'],
+                'phone': voter['phone'],
+                'active': voter['active'],
+                'has_voted': self.storage.has_voted(voter_id),
+                'score': round(score, 3)
+            })
         
-        return results
+        return {
+            'results': results,
+            'total': matches['total'],
+            'truncated': matches['truncated'],
+            'limit': limit,
+            'offset': offset
+        }
     
     def validate_voter_eligibility(self, voter_id):
         """Validate if voter is eligible to vote"""
-        if voter_id not in self.voters:
+        voter = self.storage.get_voter(voter_id)
+        if not voter:
             return False, 'Voter not registered'
         
-        voter = self.voters[voter_id]
-        
         if not voter['approved']:
             return False, 'Voter registration not approved'
         
         if not voter['active']:
             return False, 'Voter account is inactive'
         
-        if voter_id in self.voted_voters:
+        if self.storage.has_voted(voter_id):
             return False, 'Voter has already voted'
         
         return True, 'Voter is eligible'
+
+
+def build_voter_record(voter_data, hashed_password, approved=False):
+    """Build a stored voter record from registration data"""
+    voter_id = voter_data['voter_id']
+    now = datetime.now().isoformat()
+    
+    voter_record = {
+        'voter_id': voter_id,
+        'name': voter_data['name'],
+        'email': voter_data['email'],
+        'phone': voter_data['phone'],
+        'password': hashed_password,
+        'national_id': voter_data['national_id'],
+        'address': voter_data.get('address', ''),
+        'date_of_birth': voter_data.get('date_of_birth', ''),
+        'region': voter_data.get('region', ''),
+        'gender': voter_data.get('gender', ''),
+        'registration_date': now,
+        'approved': approved,
+        'active': True,
+        'biometric_registered': False
+    }
+    
+    if approved:
+        voter_record['approval_date'] = now
+    
+    return voter_record
+
+
+def encode_cursor(position):
+    """Encode a (sort value, voter ID) position as an opaque page cursor"""
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a page cursor, raising ValueError if it was not issued by encode_cursor"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+    
+    # Every sortable column holds text, so both parts of a position are strings
+    if (not isinstance(position, list) or len(position) != 2
+            or not all(isinstance(value, str) for value in position)):
+        raise ValueError('Invalid cursor')
+    return tuple(position)
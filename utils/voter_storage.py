@@ -0,0 +1,922 @@
+"""
+Voter Storage Module
+In-memory and SQLite storage backends for VoterManager
+"""
+
+import heapq
+import json
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+
+# Record fields mirrored into indexed SQLite columns
+INDEXED_FIELDS = ('name', 'email', 'phone', 'national_id', 'region', 'registration_date',
+                  'approved', 'active')
+
+# Filters accepted when selecting pending registrations in bulk
+PENDING_FILTERS = ('region', 'registered_after', 'registered_before')
+
+# Fields a voter listing can be sorted by, each backed by an (approved, field) index
+LIST_SORT_FIELDS = ('registration_date', 'name', 'voter_id')
+
+# Filters accepted by voter listings
+LIST_FILTERS = ('active', 'has_voted', 'region')
+
+# Maintained statistics counters: approved, pending, approved and active, and voted voters
+COUNTERS = ('registered', 'pending', 'active', 'voted')
+
+# Record fields registered voters are counted by, for turnout denominators
+REGISTRATION_FIELDS = ('region', 'gender', 'date_of_birth')
+
+# Columns the voter search index is built from
+SEARCH_COLUMNS = ('voter_id', 'name', 'email', 'active')
+
+# Fields whose changes the voter search index has to pick up
+SEARCHABLE_FIELDS = frozenset({'name', 'email', 'approved', 'active'})
+
+# Voted flags are one bit per voter ordinal, packed 64 to a voted_words row; this is the
+# bit for voters v joined to their word w
+VOTED_BIT = '(COALESCE(w.bits, 0) >> (v.ordinal & 63)) & 1'
+WORD_MASK = (1 << 64) - 1
+
+# Summary fields returned by voter listings
+LIST_FIELDS = ('voter_id', 'name', 'email', 'phone', 'region', 'registration_date', 'approved', 'active')
+
+
+class MemoryVoterStorage:
+    """Process-local dict storage, lost on restart"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.voters = {}
+        self.pending_registrations = {}
+        self.voted_voters = set()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # (region, gender, date_of_birth) -> approved and active voters
+        self.registrations = Counter()
+        # voter_id -> change sequence number for approved voters, oldest change first
+        self.changes = OrderedDict()
+        self.change_seq = 0
+        # import ID -> (last row number written, IDs that already existed in that batch)
+        self.imports = {}
+
+    def voter_exists(self, voter_id):
+        """Check for an approved or pending voter"""
+        return voter_id in self.voters or voter_id in self.pending_registrations
+
+    def add_pending(self, voter_record):
+        """Store a new pending registration, False if the voter ID is taken"""
+        with self.lock:
+            if self.voter_exists(voter_record['voter_id']):
+                return False
+            self.pending_registrations[voter_record['voter_id']] = voter_record
+            self.counters['pending'] += 1
+            return True
+
+    def add_many(self, voter_records, progress=None):
+        """Store new voters in one step, returning the IDs that already existed
+
+        progress is an optional (import ID, row number) recorded with the batch; see import_progress.
+        """
+        with self.lock:
+            existing = {r['voter_id'] for r in voter_records if self.voter_exists(r['voter_id'])}
+            if progress:
+                self.imports[progress[0]] = (progress[1], existing)
+            for voter_record in voter_records:
+                if voter_record['voter_id'] in existing:
+                    continue
+                if voter_record['approved']:
+                    self.voters[voter_record['voter_id']] = voter_record
+                    self.note_change(voter_record['voter_id'])
+                    self.count_approval(voter_record, pending=False)
+                else:
+                    self.pending_registrations[voter_record['voter_id']] = voter_record
+                    self.counters['pending'] += 1
+            return existing
+
+    def import_progress(self, import_id):
+        """Get (last row number, IDs that already existed) of an import's last batch"""
+        return self.imports.get(import_id)
+
+    def get_voter(self, voter_id):
+        """Get an approved voter"""
+        return self.voters.get(voter_id)
+
+    def get_pending(self, voter_id):
+        """Get a pending registration"""
+        return self.pending_registrations.get(voter_id)
+
+    def approve(self, voter_id, approval_date):
+        """Move a pending registration to approved voters"""
+        with self.lock:
+            voter_record = self.pending_registrations.pop(voter_id, None)
+            if voter_record is None:
+                return None
+
+            voter_record['approved'] = True
+            voter_record['approval_date'] = approval_date
+            self.voters[voter_id] = voter_record
+            self.count_approval(voter_record)
+            self.note_change(voter_id)
+            return voter_record
+
+    def approve_many(self, approval_date, voter_ids=None, filters=None):
+        """Approve pending registrations by ID list or by filter, returning approved records"""
+        check_pending_filters(filters)
+
+        with self.lock:
+            if voter_ids is None:
+                voter_ids = [
+                    voter_id for voter_id, voter_record in self.pending_registrations.items()
+                    if matches_pending_filters(voter_record, filters)
+                ]
+
+            approved = []
+            for voter_id in voter_ids:
+                voter_record = self.pending_registrations.pop(voter_id, None)
+                if voter_record is None:
+                    continue
+
+                voter_record['approved'] = True
+                voter_record['approval_date'] = approval_date
+                self.voters[voter_id] = voter_record
+                self.count_approval(voter_record)
+                self.note_change(voter_id)
+                approved.append(voter_record)
+
+            return approved
+
+    def update_voter(self, voter_id, updates):
+        """Update fields of an approved voter"""
+        with self.lock:
+            voter_record = self.voters.get(voter_id)
+            if voter_record is None:
+                return False
+
+            was_active = voter_record['active']
+            voter_record.update(updates)
+            change = bool(voter_record['active']) - bool(was_active)
+            self.counters['active'] += change
+            self.registrations[registration_key(voter_record)] += change
+            if not SEARCHABLE_FIELDS.isdisjoint(updates):
+                self.note_change(voter_id)
+            return True
+
+    def note_change(self, voter_id):
+        """Give an approved voter the next change sequence number; the caller holds the lock"""
+        self.change_seq += 1
+        self.changes[voter_id] = self.change_seq
+        self.changes.move_to_end(voter_id)
+
+    def change_version(self):
+        """Get the sequence number of the latest change to a searchable voter field"""
+        return self.change_seq
+
+    def changed_voters(self, since):
+        """Get (version, approved voters whose searchable fields changed after version since)"""
+        with self.lock:
+            changed = []
+            for voter_id, seq in reversed(self.changes.items()):
+                if seq <= since:
+                    break
+                changed.append(self.voters[voter_id])
+            return self.change_seq, changed[::-1]
+
+    def count_approval(self, voter_record, pending=True):
+        """Count a just-approved record; pending=False for records added already approved"""
+        self.counters['pending'] -= 1 if pending else 0
+        self.counters['registered'] += 1
+        if voter_record['active']:
+            self.counters['active'] += 1
+            self.registrations[registration_key(voter_record)] += 1
+
+    def registration_counts(self):
+        """Get (demographic fields, count) for approved and active voters"""
+        with self.lock:
+            return [(dict(zip(REGISTRATION_FIELDS, key)), count)
+                    for key, count in self.registrations.items() if count > 0]
+
+    def iter_voters(self):
+        """Get all approved voters"""
+        return list(self.voters.values())
+
+    def iter_searchable(self):
+        """Yield the SEARCH_COLUMNS of approved voters"""
+        for voter_record in self.iter_voters():
+            yield {field: voter_record.get(field) for field in SEARCH_COLUMNS}
+
+    def iter_pending(self):
+        """Get all pending registrations"""
+        return list(self.pending_registrations.values())
+
+    def list_voters(self, approved=True, sort='registration_date', descending=False,
+                    after=None, limit=50, filters=None):
+        """Get one keyset page of voter summaries, ordered by (sort field, voter ID)"""
+        check_list_args(sort, filters)
+        filters = filters or {}
+        source = self.voters if approved else self.pending_registrations
+
+        def sort_key(voter_record):
+            return (sqlite_value(voter_record.get(sort)), voter_record['voter_id'])
+
+        def selected(voter_record):
+            if after is not None:
+                key = sort_key(voter_record)
+                if (key <= after) if not descending else (key >= after):
+                    return False
+            if 'active' in filters and voter_record['active'] != filters['active']:
+                return False
+            if 'has_voted' in filters and (voter_record['voter_id'] in self.voted_voters) != filters['has_voted']:
+                return False
+            if 'region' in filters and voter_record.get('region', '') != filters['region']:
+                return False
+            return True
+
+        with self.lock:
+            matching = (r for r in list(source.values()) if selected(r))
+            select = heapq.nlargest if descending else heapq.nsmallest
+            page = select(limit, matching, key=sort_key)
+
+        return [
+            dict({field: voter_record.get(field, '') for field in LIST_FIELDS},
+                 has_voted=voter_record['voter_id'] in self.voted_voters)
+            for voter_record in page
+        ]
+
+    def count_voters(self):
+        return len(self.voters)
+
+    def count_pending(self):
+        return len(self.pending_registrations)
+
+    def count_active(self):
+        return sum(1 for v in self.voters.values() if v['active'])
+
+    def has_voted(self, voter_id):
+        return voter_id in self.voted_voters
+
+    def mark_as_voted(self, voter_id):
+        """Atomically mark a voter, False if they were already marked"""
+        with self.lock:
+            if voter_id in self.voted_voters:
+                return False
+            self.voted_voters.add(voter_id)
+            self.counters['voted'] += 1
+            return True
+
+    def count_voted(self):
+        return len(self.voted_voters)
+
+    def iter_voted_ids(self):
+        """Get the IDs of every voter marked as voted"""
+        with self.lock:
+            return list(self.voted_voters)
+
+    def get_counters(self):
+        """Get the maintained statistics counters in O(1)"""
+        return dict(self.counters)
+
+    def release(self):
+        """Nothing to release; present so callers can treat both backends alike"""
+
+    def recount(self):
+        """Recompute the counters from the records, returning (maintained, recomputed)"""
+        with self.lock:
+            maintained = dict(self.counters)
+            self.counters = {
+                'registered': self.count_voters(),
+                'pending': self.count_pending(),
+                'active': self.count_active(),
+                'voted': self.count_voted()
+            }
+            return maintained, dict(self.counters)
+
+
+class SQLiteVoterStorage:
+    """SQLite storage in WAL mode, shared across restarts and worker processes"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS voters (
+            voter_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            national_id TEXT NOT NULL,
+            region TEXT NOT NULL DEFAULT '',
+            registration_date TEXT NOT NULL,
+            approved INTEGER NOT NULL DEFAULT 0,
+            active INTEGER NOT NULL DEFAULT 1,
+            record TEXT NOT NULL,
+            ordinal INTEGER
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_voters_email ON voters(email);
+        CREATE INDEX IF NOT EXISTS idx_voters_phone ON voters(phone);
+        CREATE INDEX IF NOT EXISTS idx_voters_national_id ON voters(national_id);
+        CREATE INDEX IF NOT EXISTS idx_voters_approved ON voters(approved, registration_date);
+        CREATE INDEX IF NOT EXISTS idx_voters_region ON voters(approved, region, registration_date);
+        CREATE INDEX IF NOT EXISTS idx_voters_name ON voters(approved, name);
+        CREATE INDEX IF NOT EXISTS idx_voters_listing_id ON voters(approved, voter_id);
+        CREATE TABLE IF NOT EXISTS voter_sequence (
+            next_ordinal INTEGER NOT NULL
+        );
+        CREATE TRIGGER IF NOT EXISTS advance_voter_ordinal AFTER INSERT ON voters BEGIN
+            UPDATE voter_sequence SET next_ordinal = next_ordinal + 1;
+        END;
+        CREATE TABLE IF NOT EXISTS voted_words (
+            word INTEGER PRIMARY KEY,
+            bits INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS voter_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS count_voter_insert AFTER INSERT ON voters BEGIN
+            UPDATE voter_counters SET value = value + CASE name
+                WHEN 'registered' THEN NEW.approved
+                WHEN 'pending' THEN 1 - NEW.approved
+                WHEN 'active' THEN NEW.approved AND NEW.active
+            END
+            WHERE name IN ('registered', 'pending', 'active');
+        END;
+        CREATE TRIGGER IF NOT EXISTS count_voter_update AFTER UPDATE OF approved, active ON voters
+        WHEN OLD.approved != NEW.approved OR OLD.active != NEW.active BEGIN
+            UPDATE voter_counters SET value = value + CASE name
+                WHEN 'registered' THEN NEW.approved - OLD.approved
+                WHEN 'pending' THEN OLD.approved - NEW.approved
+                WHEN 'active' THEN (NEW.approved AND NEW.active) - (OLD.approved AND OLD.active)
+            END
+            WHERE name IN ('registered', 'pending', 'active');
+        END;
+        CREATE TRIGGER IF NOT EXISTS count_voter_delete AFTER DELETE ON voters BEGIN
+            UPDATE voter_counters SET value = value - CASE name
+                WHEN 'registered' THEN OLD.approved
+                WHEN 'pending' THEN 1 - OLD.approved
+                WHEN 'active' THEN OLD.approved AND OLD.active
+            END
+            WHERE name IN ('registered', 'pending', 'active');
+        END;
+        CREATE TRIGGER IF NOT EXISTS count_voted_word_insert AFTER INSERT ON voted_words BEGIN
+            UPDATE voter_counters SET value = value + 1 WHERE name = 'voted';
+        END;
+        CREATE TRIGGER IF NOT EXISTS count_voted_word_update AFTER UPDATE OF bits ON voted_words BEGIN
+            UPDATE voter_counters SET value = value + 1 WHERE name = 'voted';
+        END;
+        CREATE TABLE IF NOT EXISTS registration_counts (
+            region TEXT NOT NULL,
+            gender TEXT NOT NULL,
+            date_of_birth TEXT NOT NULL,
+            voters INTEGER NOT NULL,
+            PRIMARY KEY (region, gender, date_of_birth)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS count_registration_insert AFTER INSERT ON voters
+        WHEN NEW.approved AND NEW.active BEGIN
+            INSERT INTO registration_counts VALUES (
+                NEW.region, COALESCE(json_extract(NEW.record, '$.gender'), ''),
+                COALESCE(json_extract(NEW.record, '$.date_of_birth'), ''), 1
+            ) ON CONFLICT DO UPDATE SET voters = voters + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS count_registration_update AFTER UPDATE OF approved, active ON voters
+        WHEN (OLD.approved AND OLD.active) != (NEW.approved AND NEW.active) BEGIN
+            INSERT INTO registration_counts VALUES (
+                NEW.region, COALESCE(json_extract(NEW.record, '$.gender'), ''),
+                COALESCE(json_extract(NEW.record, '$.date_of_birth'), ''),
+                (NEW.approved AND NEW.active) - (OLD.approved AND OLD.active)
+            ) ON CONFLICT DO UPDATE SET voters = voters + excluded.voters;
+        END;
+        CREATE TRIGGER IF NOT EXISTS count_registration_delete AFTER DELETE ON voters
+        WHEN OLD.approved AND OLD.active BEGIN
+            UPDATE registration_counts SET voters = voters - 1
+            WHERE region = OLD.region AND gender = COALESCE(json_extract(OLD.record, '$.gender'), '')
+            AND date_of_birth = COALESCE(json_extract(OLD.record, '$.date_of_birth'), '');
+        END;
+        CREATE TABLE IF NOT EXISTS import_progress (
+            import_id TEXT PRIMARY KEY,
+            row_number INTEGER NOT NULL,
+            existing TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS voter_changes (
+            voter_id TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_voter_changes_seq ON voter_changes(seq);
+        CREATE TRIGGER IF NOT EXISTS track_voter_insert AFTER INSERT ON voters WHEN NEW.approved BEGIN
+            INSERT OR REPLACE INTO voter_changes
+            VALUES (NEW.voter_id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM voter_changes));
+        END;
+        CREATE TRIGGER IF NOT EXISTS track_voter_update AFTER UPDATE OF name, email, approved, active ON voters
+        WHEN NEW.approved BEGIN
+            INSERT OR REPLACE INTO voter_changes
+            VALUES (NEW.voter_id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM voter_changes));
+        END;
+    """
+
+    # Voters get a dense ordinal as they are inserted; the trigger above advances the sequence
+    INSERT_VOTER = (
+        'INSERT INTO voters (voter_id, name, email, phone, national_id, region, '
+        'registration_date, approved, active, record, ordinal) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, (SELECT next_ordinal FROM voter_sequence)) '
+        'ON CONFLICT(voter_id) DO NOTHING'
+    )
+
+    def __init__(self, db_path, busy_timeout=5000, cached_statements=256, max_idle=8):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.max_idle = max_idle
+        self.local = threading.local()
+        # Released connections waiting for the next thread; threads that never release
+        # drop theirs with their thread-local storage, so nothing here outlives its thread
+        self.idle = []
+        self.idle_lock = threading.Lock()
+
+        conn = self.connection()
+        self.add_ordinals(conn)
+        counted = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'registration_counts'"
+        ).fetchone()
+        conn.executescript(self.SCHEMA)
+        conn.execute('INSERT INTO voter_sequence (next_ordinal) '
+                     'SELECT COALESCE(MAX(ordinal), -1) + 1 FROM voters '
+                     'WHERE NOT EXISTS (SELECT 1 FROM voter_sequence)')
+        self.convert_voted_voters(conn)
+
+        # Counters are kept by triggers in the same transaction as each write;
+        # a database created before they existed is seeded once
+        seeded = conn.execute('SELECT COUNT(*) FROM voter_counters').fetchone()[0]
+        if seeded != len(COUNTERS):
+            self.recount()
+        if not counted:
+            self.recount_registrations()
+        self.release()
+
+    def add_ordinals(self, conn):
+        """Number the voters of a database created before voters had ordinals"""
+        # Checked inside the write transaction so concurrently starting workers migrate once
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(voters)')]
+            if not columns or 'ordinal' in columns:
+                conn.execute('COMMIT')
+                return
+            conn.execute('ALTER TABLE voters ADD COLUMN ordinal INTEGER')
+            conn.execute(
+                'UPDATE voters SET ordinal = numbered.ordinal FROM ('
+                'SELECT voter_id, ROW_NUMBER() OVER (ORDER BY registration_date, voter_id) - 1 AS ordinal '
+                'FROM voters) AS numbered WHERE numbered.voter_id = voters.voter_id'
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def convert_voted_voters(self, conn):
+        """Move the voted flags of a database created before the bitmap into voted_words"""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'voted_voters'"
+            ).fetchone()
+            if not exists:
+                conn.execute('COMMIT')
+                return
+            words = {}
+            for (ordinal,) in conn.execute('SELECT v.ordinal FROM voted_voters w '
+                                           'JOIN voters v ON v.voter_id = w.voter_id'):
+                words[ordinal >> 6] = words.get(ordinal >> 6, 0) | 1 << (ordinal & 63)
+            # Emptied counters are recounted by __init__, so the word triggers' increments do not matter
+            conn.executemany('INSERT INTO voted_words (word, bits) VALUES (?, ?)',
+                             [(word, signed_word(bits)) for word, bits in words.items()])
+            conn.execute('DROP TABLE voted_voters')
+            conn.execute('DELETE FROM voter_counters')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def open_connection(self):
+        # Autocommit mode: every statement below is a single atomic write
+        conn = sqlite3.connect(
+            self.db_path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+        return conn
+
+    def connection(self):
+        """Get this thread's connection, reusing an idle one before opening a new one"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            with self.idle_lock:
+                conn = self.idle.pop() if self.idle else None
+            if conn is None:
+                conn = self.open_connection()
+            self.local.conn = conn
+        return conn
+
+    def release(self):
+        """Hand this thread's connection back to the idle pool, closing it if the pool is full"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            return
+        self.local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        with self.idle_lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """Close this thread's connection and every idle one"""
+        self.release()
+        with self.idle_lock:
+            for conn in self.idle:
+                conn.close()
+            self.idle = []
+
+    def fetch_record(self, sql, params):
+        """Run a statement returning at most one JSON record"""
+        # fetchall() steps the statement to completion so RETURNING writes commit
+        rows = self.connection().execute(sql, params).fetchall()
+        return json.loads(rows[0][0]) if rows else None
+
+    def voter_exists(self, voter_id):
+        """Check for an approved or pending voter"""
+        row = self.connection().execute(
+            'SELECT 1 FROM voters WHERE voter_id = ?', (voter_id,)
+        ).fetchone()
+        return row is not None
+
+    def add_pending(self, voter_record):
+        """Store a new pending registration, False if the voter ID is taken"""
+        cursor = self.connection().execute(
+            self.INSERT_VOTER,
+            (voter_record['voter_id'],) + column_values(voter_record) + (json.dumps(voter_record),)
+        )
+        return cursor.rowcount == 1
+
+    def add_many(self, voter_records, progress=None):
+        """Store new voters in one transaction, returning the IDs that already existed
+
+        progress is an optional (import ID, row number) committed with the batch; see import_progress.
+        """
+        conn = self.connection()
+        ids = [r['voter_id'] for r in voter_records]
+        existing = set()
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Chunked to stay under SQLite's host parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT voter_id FROM voters WHERE voter_id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                )
+                existing.update(row[0] for row in rows)
+
+            conn.executemany(
+                self.INSERT_VOTER,
+                [
+                    (r['voter_id'],) + column_values(r) + (json.dumps(r),)
+                    for r in voter_records if r['voter_id'] not in existing
+                ]
+            )
+            if progress:
+                conn.execute(
+                    'INSERT OR REPLACE INTO import_progress (import_id, row_number, existing) VALUES (?, ?, ?)',
+                    (progress[0], progress[1], json.dumps(sorted(existing)))
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        return existing
+
+    def import_progress(self, import_id):
+        """Get (last row number, IDs that already existed) of an import's last batch"""
+        row = self.connection().execute(
+            'SELECT row_number, existing FROM import_progress WHERE import_id = ?', (import_id,)
+        ).fetchone()
+        return (row[0], set(json.loads(row[1]))) if row else None
+
+    def get_voter(self, voter_id):
+        """Get an approved voter"""
+        return self.fetch_record(
+            'SELECT record FROM voters WHERE voter_id = ? AND approved = 1', (voter_id,)
+        )
+
+    def get_pending(self, voter_id):
+        """Get a pending registration"""
+        return self.fetch_record(
+            'SELECT record FROM voters WHERE voter_id = ? AND approved = 0', (voter_id,)
+        )
+
+    def approve(self, voter_id, approval_date):
+        """Move a pending registration to approved voters"""
+        return self.fetch_record(
+            "UPDATE voters SET approved = 1, "
+            "record = json_set(record, '$.approved', json('true'), '$.approval_date', ?) "
+            "WHERE voter_id = ? AND approved = 0 RETURNING record",
+            (approval_date, voter_id)
+        )
+
+    def approve_many(self, approval_date, voter_ids=None, filters=None):
+        """Approve pending registrations by ID list or by filter, returning approved records"""
+        conn = self.connection()
+        update = ("UPDATE voters SET approved = 1, "
+                  "record = json_set(record, '$.approved', json('true'), '$.approval_date', ?) "
+                  "WHERE approved = 0")
+        rows = []
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if voter_ids is None:
+                where, params = pending_filter_clause(filters)
+                rows = conn.execute(f'{update}{where} RETURNING record',
+                                    [approval_date] + params).fetchall()
+            else:
+                voter_ids = list(voter_ids)
+                for start in range(0, len(voter_ids), 500):
+                    chunk = voter_ids[start:start + 500]
+                    rows.extend(conn.execute(
+                        f"{update} AND voter_id IN ({', '.join('?' * len(chunk))}) RETURNING record",
+                        [approval_date] + chunk
+                    ).fetchall())
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        return [json.loads(row[0]) for row in rows]
+
+    def update_voter(self, voter_id, updates):
+        """Update fields of an approved voter in a single atomic statement"""
+        if not updates:
+            return self.voter_exists(voter_id)
+
+        json_paths = ', '.join('?, json(?)' for _ in updates)
+        json_params = []
+        for field, value in updates.items():
+            json_params.extend([f'$.{field}', json.dumps(value)])
+
+        indexed = [field for field in updates if field in INDEXED_FIELDS]
+        assignments = ''.join(f', {field} = ?' for field in indexed)
+        column_params = [sqlite_value(updates[field]) for field in indexed]
+
+        cursor = self.connection().execute(
+            f'UPDATE voters SET record = json_set(record, {json_paths}){assignments} '
+            'WHERE voter_id = ? AND approved = 1',
+            json_params + column_params + [voter_id]
+        )
+        return cursor.rowcount == 1
+
+    def iter_voters(self):
+        """Get all approved voters"""
+        rows = self.connection().execute('SELECT record FROM voters WHERE approved = 1')
+        return [json.loads(row[0]) for row in rows]
+
+    def iter_searchable(self):
+        """Yield the SEARCH_COLUMNS of approved voters, streamed without decoding records"""
+        rows = self.connection().execute(f"SELECT {', '.join(SEARCH_COLUMNS)} FROM voters WHERE approved = 1")
+        for row in rows:
+            yield dict(zip(SEARCH_COLUMNS, row))
+
+    def iter_pending(self):
+        """Get all pending registrations"""
+        rows = self.connection().execute('SELECT record FROM voters WHERE approved = 0')
+        return [json.loads(row[0]) for row in rows]
+
+    def change_version(self):
+        """Get the sequence number of the latest change to a searchable voter field"""
+        return self.connection().execute('SELECT COALESCE(MAX(seq), 0) FROM voter_changes').fetchone()[0]
+
+    def changed_voters(self, since):
+        """Get (version, approved voters whose searchable fields changed after version since)"""
+        # Writes are serialized, so sequence numbers commit in order and none is skipped
+        rows = self.connection().execute(
+            'SELECT c.seq, v.record FROM voter_changes c JOIN voters v ON v.voter_id = c.voter_id '
+            'WHERE c.seq > ? ORDER BY c.seq', (since,)
+        ).fetchall()
+        return (rows[-1][0] if rows else since), [json.loads(row[1]) for row in rows]
+
+    def list_voters(self, approved=True, sort='registration_date', descending=False,
+                    after=None, limit=50, filters=None):
+        """Get one keyset page of voter summaries, ordered by (sort field, voter ID)"""
+        check_list_args(sort, filters)
+        filters = filters or {}
+        direction = 'DESC' if descending else 'ASC'
+
+        # Secondary indexes of a WITHOUT ROWID table end in the primary key, so
+        # (approved, sort field, voter_id) is walked in order without a sort step
+        clauses = ['v.approved = ?']
+        params = [int(approved)]
+        # Sorting by voter ID needs no tie-breaker
+        key_columns = ['v.voter_id'] if sort == 'voter_id' else [f'v.{sort}', 'v.voter_id']
+        if after is not None:
+            clauses.append(f"({', '.join(key_columns)}) {'<' if descending else '>'} "
+                           f"({', '.join('?' * len(key_columns))})")
+            params.extend(after[-len(key_columns):])
+        if 'active' in filters:
+            clauses.append('v.active = ?')
+            params.append(int(filters['active']))
+        if 'has_voted' in filters:
+            clauses.append(f"{'' if filters['has_voted'] else 'NOT '}{VOTED_BIT}")
+        if 'region' in filters:
+            clauses.append('v.region = ?')
+            params.append(filters['region'])
+
+        columns = ', '.join(f'v.{field}' for field in LIST_FIELDS)
+        rows = self.connection().execute(
+            f'SELECT {columns}, {VOTED_BIT} FROM voters v '
+            'LEFT JOIN voted_words w ON w.word = v.ordinal >> 6 '
+            f"WHERE {' AND '.join(clauses)} "
+            f"ORDER BY {', '.join(f'{column} {direction}' for column in key_columns)} LIMIT ?",
+            params + [limit]
+        ).fetchall()
+
+        voters = []
+        for row in rows:
+            voter = dict(zip(LIST_FIELDS, row))
+            voter['approved'] = bool(voter['approved'])
+            voter['active'] = bool(voter['active'])
+            voter['has_voted'] = bool(row[-1])
+            voters.append(voter)
+        return voters
+
+    def count_voters(self):
+        return self.connection().execute('SELECT COUNT(*) FROM voters WHERE approved = 1').fetchone()[0]
+
+    def count_pending(self):
+        return self.connection().execute('SELECT COUNT(*) FROM voters WHERE approved = 0').fetchone()[0]
+
+    def count_active(self):
+        return self.connection().execute(
+            'SELECT COUNT(*) FROM voters WHERE approved = 1 AND active = 1'
+        ).fetchone()[0]
+
+    def has_voted(self, voter_id):
+        row = self.connection().execute(
+            f'SELECT {VOTED_BIT} FROM voters v JOIN voted_words w ON w.word = v.ordinal >> 6 '
+            'WHERE v.voter_id = ?', (voter_id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def mark_as_voted(self, voter_id):
+        """Atomically set a voter's voted bit, False if it was already set or the voter is unknown"""
+        # The upsert only touches the word when the bit is clear, so one statement is the test-and-set
+        cursor = self.connection().execute(
+            'INSERT INTO voted_words (word, bits) '
+            'SELECT ordinal >> 6, 1 << (ordinal & 63) FROM voters WHERE voter_id = ? '
+            'ON CONFLICT(word) DO UPDATE SET bits = bits | excluded.bits '
+            'WHERE bits & excluded.bits = 0',
+            (voter_id,)
+        )
+        return cursor.rowcount == 1
+
+    def iter_voted_ids(self):
+        """Get the IDs of every voter whose voted bit is set"""
+        rows = self.connection().execute(
+            f'SELECT v.voter_id FROM voters v JOIN voted_words w ON w.word = v.ordinal >> 6 '
+            f'WHERE {VOTED_BIT}'
+        )
+        return [row[0] for row in rows]
+
+    def count_voted(self):
+        """Count set bits across the voted words"""
+        rows = self.connection().execute('SELECT bits FROM voted_words')
+        return sum((bits & WORD_MASK).bit_count() for (bits,) in rows)
+
+    def registration_counts(self):
+        """Get (demographic fields, count) for approved and active voters"""
+        rows = self.connection().execute(
+            'SELECT region, gender, date_of_birth, voters FROM registration_counts WHERE voters > 0'
+        )
+        return [(dict(zip(REGISTRATION_FIELDS, row[:3])), row[3]) for row in rows]
+
+    def recount_registrations(self):
+        """Rebuild registration_counts from the voters, for databases created before it existed"""
+        # A full rebuild in one write transaction, so workers starting together cannot double count
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM registration_counts')
+            conn.execute(
+                "INSERT INTO registration_counts "
+                "SELECT region, COALESCE(json_extract(record, '$.gender'), ''), "
+                "COALESCE(json_extract(record, '$.date_of_birth'), ''), COUNT(*) "
+                "FROM voters WHERE approved = 1 AND active = 1 GROUP BY 1, 2, 3"
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def get_counters(self):
+        """Get the trigger-maintained statistics counters in O(1)"""
+        counters = dict.fromkeys(COUNTERS, 0)
+        counters.update(self.connection().execute('SELECT name, value FROM voter_counters'))
+        return counters
+
+    def recount(self):
+        """Recompute the counters from the tables, returning (maintained, recomputed)"""
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            maintained = dict.fromkeys(COUNTERS, 0)
+            maintained.update(conn.execute('SELECT name, value FROM voter_counters'))
+            recomputed = {
+                'registered': self.count_voters(),
+                'pending': self.count_pending(),
+                'active': self.count_active(),
+                'voted': self.count_voted()
+            }
+            conn.executemany(
+                'INSERT INTO voter_counters (name, value) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE SET value = excluded.value',
+                list(recomputed.items())
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        return maintained, recomputed
+
+
+def registration_key(voter_record):
+    """Get the REGISTRATION_FIELDS of a record as stored in registration_counts"""
+    return tuple(voter_record.get(field) or '' for field in REGISTRATION_FIELDS)
+
+
+def signed_word(bits):
+    """Convert 64 flag bits to the signed integer SQLite stores"""
+    return bits - (1 << 64) if bits >> 63 else bits
+
+
+def sqlite_value(value):
+    """Convert a record value for an indexed column"""
+    if isinstance(value, bool):
+        return int(value)
+    return '' if value is None else value
+
+
+def column_values(voter_record):
+    """Get the indexed column values of a record, in INDEXED_FIELDS order"""
+    return tuple(sqlite_value(voter_record.get(field)) for field in INDEXED_FIELDS)
+
+
+def check_list_args(sort, filters):
+    """Reject sort fields and filters a voter listing cannot use"""
+    if sort not in LIST_SORT_FIELDS:
+        raise ValueError(f"Unknown sort field: {sort}")
+
+    unknown = [key for key in (filters or {}) if key not in LIST_FILTERS]
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(unknown)}")
+
+
+def check_pending_filters(filters):
+    """Reject filter keys that cannot select pending registrations"""
+    unknown = [key for key in (filters or {}) if key not in PENDING_FILTERS]
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(unknown)}")
+
+
+def matches_pending_filters(voter_record, filters):
+    """Check a pending record against region and registration date filters"""
+    filters = filters or {}
+    check_pending_filters(filters)
+
+    if 'region' in filters and voter_record.get('region', '') != filters['region']:
+        return False
+    if 'registered_after' in filters and voter_record['registration_date'] < filters['registered_after']:
+        return False
+    if 'registered_before' in filters and voter_record['registration_date'] > filters['registered_before']:
+        return False
+    return True
+
+
+def pending_filter_clause(filters):
+    """Build the SQL conditions for pending registration filters"""
+    filters = filters or {}
+    check_pending_filters(filters)
+
+    clauses = []
+    params = []
+    if 'region' in filters:
+        clauses.append(' AND region = ?')
+        params.append(filters['region'])
+    if 'registered_after' in filters:
+        clauses.append(' AND registration_date >= ?')
+        params.append(filters['registered_after'])
+    if 'registered_before' in filters:
+        clauses.append(' AND registration_date <= ?')
+        params.append(filters['registered_before'])
+    return ''.join(clauses), params